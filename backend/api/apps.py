@@ -10,8 +10,24 @@ class ApiConfig(AppConfig):
         """Start background cleanup thread for expired FAISS indexes."""
         # Only run in the main process, not in manage.py commands
         import os
+        import sys
         if os.environ.get('RUN_MAIN') == 'true':
             self._start_cleanup_scheduler()
+        # Serving processes (runserver's reloaded child, gunicorn workers) precompute intent centroids
+        if os.environ.get('RUN_MAIN') == 'true' or not sys.argv[0].endswith('manage.py'):
+            self._warm_intent_classifier()
+
+    def _warm_intent_classifier(self):
+        def warm():
+            try:
+                from api.council.intent import INTENT_CLASSIFIER
+                from api.core.config import INTENT_CLASSIFIER_ENABLED
+                if INTENT_CLASSIFIER_ENABLED:
+                    INTENT_CLASSIFIER.warm()
+            except Exception as e:
+                print(f"[Intent] Warm-up failed, will retry on first query: {e}")
+
+        threading.Thread(target=warm, daemon=True, name="intent-warmup").start()
 
     def _start_cleanup_scheduler(self):
         """Run cleanup every 12 hours in a background daemon thread."""
@@ -0,0 +1,73 @@
+"""
+Content-addressed LLM response cache.
+Plugged into ChatOpenAI via LangChain's `cache=` hook. Entries are keyed by
+the serialized model + parameters (LangChain's llm_string: model, temperature,
+max_tokens, …) and a hash of the prompt, so any parameter change is a miss.
+Used for temperature-0 models by default; replaying a benchmark workload
+against a warm cache makes no network calls at all.
+"""
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+from api.cache.store import SQLiteCache, hash_key
+from api.core.metrics import record_cache
+from api.core.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_TTL_HOURS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_NONDETERMINISTIC,
+)
+
+
+class LLMResponseCache(BaseCache):
+    """LangChain cache backed by the shared SQLite TTL/LRU store."""
+
+    def __init__(self, name: str = "llm_responses", max_entries: int = 5000, ttl_hours: float = 0):
+        self._store = SQLiteCache(
+            name,
+            max_entries=max_entries,
+            default_ttl=ttl_hours * 3600 if ttl_hours else None,
+        )
+
+    def lookup(self, prompt: str, llm_string: str, record: bool = True) -> Optional[Sequence[Generation]]:
+        try:
+            value = self._store.get(hash_key(llm_string, prompt))
+        except Exception as e:
+            print(f"[LLMCache] Lookup failed: {e}")
+            value = None
+        if record:
+            record_cache("llm", value is not None)
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        try:
+            self._store.set(hash_key(llm_string, prompt), list(return_val))
+        except Exception as e:
+            print(f"[LLMCache] Store failed: {e}")
+
+    def clear(self, **kwargs: Any) -> None:
+        self._store.clear()
+
+
+_response_cache: Optional[LLMResponseCache] = None
+
+
+def cache_for(temperature: float) -> Optional[LLMResponseCache]:
+    """
+    Cache to attach to an LLM built at this temperature, or None to bypass.
+    Sampling models (temperature > 0) only use it when LLM_CACHE_NONDETERMINISTIC
+    is set, e.g. for replaying recorded benchmark runs.
+    """
+    global _response_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if temperature > 0 and not LLM_CACHE_NONDETERMINISTIC:
+        return None
+    if _response_cache is None:
+        _response_cache = LLMResponseCache(
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_hours=LLM_CACHE_TTL_HOURS,
+        )
+    return _response_cache
@@ -0,0 +1,43 @@
+"""
+Long-TTL cache for Exam Oracle predictions.
+Question-paper history changes at most once a semester, so a prediction is
+reused for every student asking about the same subject code and regulation
+until ORACLE_CACHE_TTL_DAYS have passed (or the prewarm_oracle command
+replaces it).
+"""
+from typing import Any, Dict, Optional
+
+from api.cache.store import SQLiteCache, hash_key
+from api.core.metrics import record_cache
+from api.core.config import (
+    ORACLE_CACHE_ENABLED,
+    ORACLE_CACHE_TTL_DAYS,
+    ORACLE_CACHE_MAX_ENTRIES,
+)
+
+_cache = SQLiteCache(
+    "oracle_predictions",
+    max_entries=ORACLE_CACHE_MAX_ENTRIES,
+    default_ttl=ORACLE_CACHE_TTL_DAYS * 86400,
+)
+
+
+def _key(subject_code: str, regulation: Optional[str]) -> str:
+    return hash_key(subject_code.upper(), (regulation or "any").upper())
+
+
+def lookup(subject_code: str, regulation: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Return the cached prediction plus its created_at timestamp, or None."""
+    if not ORACLE_CACHE_ENABLED or not subject_code:
+        return None
+    entry = _cache.get_entry(_key(subject_code, regulation))
+    record_cache("oracle", entry is not None)
+    if entry is None:
+        return None
+    return {**entry["value"], "created_at": entry["created_at"]}
+
+
+def store(subject_code: str, regulation: Optional[str], payload: Dict[str, Any]) -> None:
+    if not ORACLE_CACHE_ENABLED or not subject_code:
+        return
+    _cache.set(_key(subject_code, regulation), {"subject_code": subject_code, "regulation": regulation, **payload})
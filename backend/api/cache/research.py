@@ -0,0 +1,56 @@
+"""
+TTL cache for Research Mode answers.
+Popular topics are asked many times a day; a hit skips the arXiv / Scholar /
+Tavily fan-out and the RESEARCH_LLM call entirely.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+from api.cache.store import SQLiteCache, hash_key
+from api.core.metrics import record_cache
+from api.core.config import (
+    RESEARCH_CACHE_ENABLED,
+    RESEARCH_CACHE_TTL_HOURS,
+    RESEARCH_CACHE_MAX_ENTRIES,
+)
+
+_cache = SQLiteCache(
+    "research_answers",
+    max_entries=RESEARCH_CACHE_MAX_ENTRIES,
+    default_ttl=RESEARCH_CACHE_TTL_HOURS * 3600,
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", query).encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _key(normalized: str, deep: bool) -> str:
+    # Deep-research answers draw on full text, so they are cached separately
+    return hash_key("deep", normalized) if deep else hash_key(normalized)
+
+
+def lookup(query: str, deep: bool = False) -> Optional[Dict[str, Any]]:
+    """Return the cached payload plus its created_at timestamp, or None."""
+    if not RESEARCH_CACHE_ENABLED:
+        return None
+    normalized = normalize_query(query)
+    if not normalized:
+        return None
+    entry = _cache.get_entry(_key(normalized, deep))
+    record_cache("research", entry is not None)
+    if entry is None:
+        return None
+    return {**entry["value"], "created_at": entry["created_at"]}
+
+
+def store(query: str, payload: Dict[str, Any], deep: bool = False) -> None:
+    if not RESEARCH_CACHE_ENABLED:
+        return
+    normalized = normalize_query(query)
+    if normalized:
+        _cache.set(_key(normalized, deep), {"query": query, **payload})
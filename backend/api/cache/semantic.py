@@ -0,0 +1,103 @@
+"""
+Semantic answer cache for Student Mode.
+Near-identical questions about the same uploaded document reuse the final
+answer instead of re-running Planner → Scout → Analyst → Scribe → Critic.
+Entries are keyed by (namespace, query embedding) and tied to the index
+version on disk, so a re-ingested document never serves stale answers.
+"""
+import time
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.core.metrics import record_cache
+from api.core.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_MAX_ENTRIES,
+)
+
+_lock = threading.Lock()
+_entries: Dict[str, List[Dict[str, Any]]] = {}
+
+
+@lru_cache(maxsize=256)
+def _embed(query: str) -> Tuple[float, ...]:
+    from api.storage.faiss_store import _get_embeddings
+    vector = np.asarray(_get_embeddings().embed_query(query), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return tuple(vector / norm) if norm else tuple(vector)
+
+
+def _index_version(namespace: str) -> Optional[int]:
+    """mtime of the saved FAISS index — changes whenever the namespace is re-ingested"""
+    from api.storage.faiss_store import FAISS_INDEX_DIR
+    try:
+        return (FAISS_INDEX_DIR / namespace / "index.faiss").stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def lookup(namespace: str, query: str) -> Optional[Dict[str, Any]]:
+    """Return the closest cached answer above the similarity threshold, or None."""
+    if not ANSWER_CACHE_ENABLED or not namespace:
+        return None
+
+    version = _index_version(namespace)
+    with _lock:
+        entries = _entries.get(namespace, [])
+        if entries and entries[0]["index_version"] != version:
+            _entries.pop(namespace, None)
+            entries = []
+    if not entries or version is None:
+        record_cache("semantic", False)
+        return None
+
+    vector = np.asarray(_embed(query.strip().lower()), dtype=np.float32)
+    with _lock:
+        matrix = np.stack([e["vector"] for e in entries])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < ANSWER_CACHE_SIMILARITY:
+            record_cache("semantic", False)
+            return None
+        entry = entries[best]
+        entry["hits"] += 1
+    record_cache("semantic", True)
+    return {**entry, "similarity": float(scores[best])}
+
+
+def store(namespace: str, query: str, payload: Dict[str, Any]) -> None:
+    """Cache the final answer payload (answer, sources, grounding score, …) for a query."""
+    if not ANSWER_CACHE_ENABLED or not namespace:
+        return
+
+    version = _index_version(namespace)
+    if version is None:
+        return
+
+    vector = np.asarray(_embed(query.strip().lower()), dtype=np.float32)
+    entry = {
+        "query": query,
+        "vector": vector,
+        "index_version": version,
+        "created_at": time.time(),
+        "hits": 0,
+        **payload,
+    }
+    with _lock:
+        entries = [e for e in _entries.get(namespace, []) if e["index_version"] == version]
+        entries.append(entry)
+        if len(entries) > ANSWER_CACHE_MAX_ENTRIES:
+            entries = entries[-ANSWER_CACHE_MAX_ENTRIES:]
+        _entries[namespace] = entries
+
+
+def invalidate_namespace(namespace: str) -> None:
+    """Drop every cached answer for a namespace (re-ingest / delete)."""
+    with _lock:
+        removed = _entries.pop(namespace, None)
+    if removed:
+        print(f"[AnswerCache] Invalidated {len(removed)} answers for namespace '{namespace}'")
@@ -0,0 +1,108 @@
+"""
+On-disk cache for external research sources (arXiv, Google Scholar, SerpAPI, Tavily).
+Results are keyed by (source, normalized query, max results). Within the
+source's TTL an entry is served as-is; for SOURCE_CACHE_STALE_HOURS after that
+it is still served immediately while a background refresh fetches a new copy
+(stale-while-revalidate). Empty results and deadline-truncated scans are not
+stored, so a transient failure never sticks.
+"""
+import time
+import inspect
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from api.cache.store import SQLiteCache, hash_key
+from api.cache.research import normalize_query
+from api.core import metrics
+from api.core.config import (
+    SOURCE_CACHE_ENABLED,
+    SOURCE_CACHE_TTL_HOURS,
+    SOURCE_CACHE_STALE_HOURS,
+    SOURCE_CACHE_MAX_ENTRIES,
+)
+
+_cache = SQLiteCache("research_sources", max_entries=SOURCE_CACHE_MAX_ENTRIES)
+_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mars-source-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _record(source: str, result: str):
+    metrics.CACHE_REQUESTS.inc(cache=f"source_{source}", result=result)
+
+
+def _refresh(source: str, key: str, fetch: Callable, fresh_ttl: float):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            docs = fetch()
+            if docs:
+                _cache.set(key, docs, ttl=fresh_ttl + SOURCE_CACHE_STALE_HOURS * 3600)
+        except Exception as e:
+            print(f"[SourceCache] Background refresh of {source} failed: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _refresher.submit(run)
+
+
+def cached_search(source: str, max_arg: str = "max_results"):
+    """
+    Decorate a loader `fn(query, <max_arg>=..., **kwargs) -> List[Document]`.
+    Other keyword arguments (api keys, deadlines) do not affect the key; a
+    deadline-bounded call that returns fewer than max results may have been cut
+    short, so it is not stored.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not SOURCE_CACHE_ENABLED:
+                return fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            query = normalize_query(bound.arguments["query"])
+            if not query:
+                return fn(*args, **kwargs)
+            key = hash_key(source, query, bound.arguments.get(max_arg))
+            fresh_ttl = SOURCE_CACHE_TTL_HOURS.get(source, 24) * 3600
+
+            try:
+                entry = _cache.get_entry(key)
+            except Exception as e:
+                print(f"[SourceCache] Lookup failed: {e}")
+                entry = None
+
+            if entry is not None:
+                age = time.time() - entry["created_at"]
+                if age <= fresh_ttl:
+                    _record(source, "hit")
+                    return entry["value"]
+                # Stale but inside the grace window: answer now, refresh in the background
+                _record(source, "stale")
+                refresh_kwargs = {k: v for k, v in bound.arguments.items() if k != "deadline"}
+                _refresh(source, key, lambda: fn(**refresh_kwargs), fresh_ttl)
+                return entry["value"]
+
+            _record(source, "miss")
+            docs = fn(*args, **kwargs)
+            limit = bound.arguments.get(max_arg)
+            partial = bound.arguments.get("deadline") is not None and limit and len(docs) < limit
+            if docs and not partial:
+                try:
+                    _cache.set(key, docs, ttl=fresh_ttl + SOURCE_CACHE_STALE_HOURS * 3600)
+                except Exception as e:
+                    print(f"[SourceCache] Store failed: {e}")
+            return docs
+
+        return wrapper
+    return decorator
@@ -0,0 +1,187 @@
+"""
+Size-bounded, TTL-aware key/value store backed by SQLite.
+Each cache gets its own database file under settings.CACHE_DIR, so it
+survives restarts and is shared by every worker process on the host.
+"""
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+
+def hash_key(*parts: Any) -> str:
+    """Stable sha256 key from arbitrary parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class SQLiteCache:
+    """
+    Pickled values with a per-entry TTL. When the entry count exceeds
+    max_entries, expired rows go first, then the least recently used.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000, default_ttl: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._path: Optional[Path] = None
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._path is None:
+            with self._init_lock:
+                if self._path is None:
+                    from django.conf import settings
+                    cache_dir = Path(getattr(settings, "CACHE_DIR", os.path.join(settings.MEDIA_ROOT, "cache")))
+                    cache_dir.mkdir(parents=True, exist_ok=True)
+                    path = cache_dir / f"{self.name}.sqlite3"
+                    conn = sqlite3.connect(str(path), timeout=10)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS entries ("
+                        " key TEXT PRIMARY KEY,"
+                        " value BLOB NOT NULL,"
+                        " created_at REAL NOT NULL,"
+                        " expires_at REAL,"
+                        " accessed_at REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries (accessed_at)")
+                    conn.commit()
+                    conn.close()
+                    self._path = path
+        return sqlite3.connect(str(self._path), timeout=10)
+
+    def get_entry(self, key: str) -> Optional[dict]:
+        """Return {"value", "created_at", "expires_at"} or None if missing/expired."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, created_at, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at, expires_at = row
+            if expires_at is not None and expires_at < now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        finally:
+            conn.close()
+
+        try:
+            return {"value": pickle.loads(value), "created_at": created_at, "expires_at": expires_at}
+        except Exception as e:
+            print(f"[Cache:{self.name}] Dropping unreadable entry: {e}")
+            self.delete(key)
+            return None
+
+    def get(self, key: str) -> Any:
+        entry = self.get_entry(key)
+        return entry["value"] if entry else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, blob, now, expires_at, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def touch(self, keys) -> None:
+        """Mark entries as used now (for LRU eviction) without reading them."""
+        keys = list(keys)
+        if not keys:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?", [(now, k) for k in keys])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def keys(self) -> set:
+        """Keys of all unexpired entries."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT key FROM entries WHERE expires_at IS NULL OR expires_at >= ?", (time.time(),)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row[0] for row in rows}
+
+    def entries_since(self, since: float) -> list:
+        """(key, value, created_at, expires_at) of unexpired entries written after since, oldest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT key, value, created_at, expires_at FROM entries"
+                " WHERE created_at > ? AND (expires_at IS NULL OR expires_at >= ?) ORDER BY created_at",
+                (since, time.time()),
+            ).fetchall()
+        finally:
+            conn.close()
+        entries = []
+        for key, value, created_at, expires_at in rows:
+            try:
+                entries.append((key, pickle.loads(value), created_at, expires_at))
+            except Exception as e:
+                print(f"[Cache:{self.name}] Skipping unreadable entry: {e}")
+        return entries
+
+    def __len__(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        overflow = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN"
+                " (SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
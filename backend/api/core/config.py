@@ -20,3 +20,180 @@ GROQ_API_KEY_2 = os.getenv("GROQ_API_KEY_2")
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
+
+# Planner intent classifier (nearest centroid over fastembed embeddings); below these
+# thresholds the keyword rules decide. The defaults are a starting point for
+# all-MiniLM-L6-v2 (faiss_store.EMBED_MODEL); fit them to the deployed model with
+# `python manage.py calibrate_intents`, which scores api/council/intent_holdout.json
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.5"))
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.05"))
+
+# Skip the Analyst LLM call when retrieved context fits in this many tokens (0 disables)
+ANALYST_FAST_PATH_MAX_TOKENS = int(os.getenv("ANALYST_FAST_PATH_MAX_TOKENS", "1500"))
+
+# Local grounding pre-check: answers scoring at/above ACCEPT or at/below REJECT are
+# decided without the Critic LLM; only the band in between is sent to CRITIC_LLM
+GROUNDING_PRECHECK_ENABLED = os.getenv("GROUNDING_PRECHECK_ENABLED", "true").lower() == "true"
+GROUNDING_ACCEPT_SCORE = float(os.getenv("GROUNDING_ACCEPT_SCORE", "85"))
+GROUNDING_REJECT_SCORE = float(os.getenv("GROUNDING_REJECT_SCORE", "30"))
+GROUNDING_SENTENCE_SIMILARITY = float(os.getenv("GROUNDING_SENTENCE_SIMILARITY", "0.6"))
+GROUNDING_NGRAM_OVERLAP = float(os.getenv("GROUNDING_NGRAM_OVERLAP", "0.25"))
+
+# Semantic answer cache (Student Mode)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "200"))
+
+# Research Mode answer cache (SQLite, keyed on normalized query)
+RESEARCH_CACHE_ENABLED = os.getenv("RESEARCH_CACHE_ENABLED", "true").lower() == "true"
+RESEARCH_CACHE_TTL_HOURS = float(os.getenv("RESEARCH_CACHE_TTL_HOURS", "12"))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "500"))
+
+# External research source cache (arXiv / Scholar / SerpAPI / Tavily), TTLs in hours;
+# entries are served stale for SOURCE_CACHE_STALE_HOURS more while refreshing in the background
+SOURCE_CACHE_ENABLED = os.getenv("SOURCE_CACHE_ENABLED", "true").lower() == "true"
+SOURCE_CACHE_TTL_HOURS = {
+    "arxiv": float(os.getenv("ARXIV_CACHE_TTL_HOURS", "24")),
+    "scholar": float(os.getenv("SCHOLAR_CACHE_TTL_HOURS", "72")),
+    "serpapi": float(os.getenv("SERPAPI_CACHE_TTL_HOURS", "72")),
+    "tavily": float(os.getenv("TAVILY_CACHE_TTL_HOURS", "6")),
+}
+SOURCE_CACHE_STALE_HOURS = float(os.getenv("SOURCE_CACHE_STALE_HOURS", "24"))
+SOURCE_CACHE_MAX_ENTRIES = int(os.getenv("SOURCE_CACHE_MAX_ENTRIES", "5000"))
+# Estimated title Jaccard similarity above which two research results are the same paper
+DEDUP_TITLE_SIMILARITY = float(os.getenv("DEDUP_TITLE_SIMILARITY", "0.8"))
+# Long research documents are split into ~PASSAGE_TOKENS passages and reduced to the
+# ones most similar to the query (at most PASSAGE_MAX_PER_DOC passages are embedded per document)
+PASSAGE_SELECTION_ENABLED = os.getenv("PASSAGE_SELECTION_ENABLED", "true").lower() == "true"
+PASSAGE_TOKENS = int(os.getenv("PASSAGE_TOKENS", "120"))
+PASSAGE_MAX_PER_DOC = int(os.getenv("PASSAGE_MAX_PER_DOC", "80"))
+# Deep research: full text of the top arXiv papers goes into a shared FAISS corpus
+# (downloaded once per paper); each paper contributes its best full-text passages
+RESEARCH_DEEP_MAX_PAPERS = int(os.getenv("RESEARCH_DEEP_MAX_PAPERS", "3"))
+RESEARCH_DEEP_PASSAGES = int(os.getenv("RESEARCH_DEEP_PASSAGES", "4"))
+RESEARCH_CORPUS_MAX_PDF_MB = int(os.getenv("RESEARCH_CORPUS_MAX_PDF_MB", "30"))
+RESEARCH_CORPUS_DOWNLOAD_TIMEOUT_S = float(os.getenv("RESEARCH_CORPUS_DOWNLOAD_TIMEOUT_S", "30"))
+# Local research library: every retrieved paper / web document is embedded and kept for
+# RESEARCH_LIBRARY_TTL_DAYS; the scout searches it first and skips the external sources
+# when at least RESEARCH_LIBRARY_MIN_DOCS of the top RESEARCH_LIBRARY_K reach RESEARCH_LIBRARY_SIMILARITY
+RESEARCH_LIBRARY_ENABLED = os.getenv("RESEARCH_LIBRARY_ENABLED", "true").lower() == "true"
+RESEARCH_LIBRARY_TTL_DAYS = float(os.getenv("RESEARCH_LIBRARY_TTL_DAYS", "30"))
+RESEARCH_LIBRARY_MAX_DOCS = int(os.getenv("RESEARCH_LIBRARY_MAX_DOCS", "5000"))
+RESEARCH_LIBRARY_REFRESH_S = float(os.getenv("RESEARCH_LIBRARY_REFRESH_S", "60"))
+RESEARCH_LIBRARY_K = int(os.getenv("RESEARCH_LIBRARY_K", "8"))
+RESEARCH_LIBRARY_SIMILARITY = float(os.getenv("RESEARCH_LIBRARY_SIMILARITY", "0.55"))
+RESEARCH_LIBRARY_MIN_DOCS = int(os.getenv("RESEARCH_LIBRARY_MIN_DOCS", "5"))
+
+# Conversation memory: recent turns are kept verbatim within the "history" prompt
+# budget, older turns are folded into a rolling summary of MEMORY_SUMMARY_TOKENS
+# (cached per conversation prefix, refined by FAST_LLM in the background when
+# MEMORY_SUMMARY_LLM is on), and up to MEMORY_RELEVANT_TURNS older turns at
+# MEMORY_RELEVANT_SIMILARITY to the query are quoted back
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+MEMORY_SUMMARY_LLM = os.getenv("MEMORY_SUMMARY_LLM", "true").lower() == "true"
+MEMORY_SUMMARY_TTL_DAYS = float(os.getenv("MEMORY_SUMMARY_TTL_DAYS", "7"))
+MEMORY_RELEVANT_TURNS = int(os.getenv("MEMORY_RELEVANT_TURNS", "2"))
+MEMORY_RELEVANT_TOKENS = int(os.getenv("MEMORY_RELEVANT_TOKENS", "400"))
+MEMORY_RELEVANT_SIMILARITY = float(os.getenv("MEMORY_RELEVANT_SIMILARITY", "0.5"))
+MEMORY_HINT_TOKENS = int(os.getenv("MEMORY_HINT_TOKENS", "48"))
+
+# Studio artefact cache (keyed by generator, prompt version and packed-context hash)
+STUDIO_CACHE_ENABLED = os.getenv("STUDIO_CACHE_ENABLED", "true").lower() == "true"
+STUDIO_CACHE_MAX_ENTRIES = int(os.getenv("STUDIO_CACHE_MAX_ENTRIES", "600"))
+STUDIO_CACHE_TTL_HOURS = float(os.getenv("STUDIO_CACHE_TTL_HOURS", "0"))
+# Generated audio overviews kept on disk (oldest removed first)
+STUDIO_AUDIO_MAX_FILES = int(os.getenv("STUDIO_AUDIO_MAX_FILES", "500"))
+
+# Exam Oracle predictions, cached per subject code + regulation (question-paper history
+# changes once a semester). ORACLE_PREWARM_SUBJECTS is the default list for prewarm_oracle.
+ORACLE_CACHE_ENABLED = os.getenv("ORACLE_CACHE_ENABLED", "true").lower() == "true"
+ORACLE_CACHE_TTL_DAYS = float(os.getenv("ORACLE_CACHE_TTL_DAYS", "120"))
+ORACLE_CACHE_MAX_ENTRIES = int(os.getenv("ORACLE_CACHE_MAX_ENTRIES", "2000"))
+ORACLE_PREWARM_SUBJECTS = [s.strip() for s in os.getenv("ORACLE_PREWARM_SUBJECTS", "").split(",") if s.strip()]
+# Offline Oracle: predictions come from uploaded question papers once a subject has
+# ORACLE_LOCAL_MIN_PAPERS of them; questions at ORACLE_CLUSTER_SIMILARITY count as the same
+ORACLE_LOCAL_MIN_PAPERS = int(os.getenv("ORACLE_LOCAL_MIN_PAPERS", "2"))
+ORACLE_CLUSTER_SIMILARITY = float(os.getenv("ORACLE_CLUSTER_SIMILARITY", "0.85"))
+ORACLE_LOCAL_LLM_FORMAT = os.getenv("ORACLE_LOCAL_LLM_FORMAT", "false").lower() == "true"
+
+# LLM response cache (opt-in). Keyed by model, parameters and prompt hash;
+# only temperature-0 models use it unless LLM_CACHE_NONDETERMINISTIC is set
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_NONDETERMINISTIC = os.getenv("LLM_CACHE_NONDETERMINISTIC", "false").lower() == "true"
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# Latency budgets (seconds)
+REQUEST_LATENCY_BUDGET_S = float(os.getenv("REQUEST_LATENCY_BUDGET_S", "60"))
+# Below this much remaining budget, optional stages (Analyst LLM, Critic) are skipped
+DEADLINE_RESERVE_S = float(os.getenv("DEADLINE_RESERVE_S", "12"))
+STAGE_BUDGETS_S = {
+    "research_scout": float(os.getenv("RESEARCH_SCOUT_BUDGET_S", "15")),
+    "oracle_search": float(os.getenv("ORACLE_SEARCH_BUDGET_S", "15")),
+    "oracle": float(os.getenv("ORACLE_BUDGET_S", "25")),
+    "analyst": float(os.getenv("ANALYST_BUDGET_S", "15")),
+    "scribe": float(os.getenv("SCRIBE_BUDGET_S", "35")),
+    "critic": float(os.getenv("CRITIC_BUDGET_S", "10")),
+    "research_fulltext": float(os.getenv("RESEARCH_FULLTEXT_BUDGET_S", "20")),
+}
+# Per-source deadlines inside the research scout (each also capped by research_scout)
+RESEARCH_SOURCE_BUDGETS_S = {
+    "arXiv": float(os.getenv("ARXIV_BUDGET_S", "10")),
+    "Scholar": float(os.getenv("SCHOLAR_BUDGET_S", "6")),
+    "Web": float(os.getenv("WEB_SEARCH_BUDGET_S", "8")),
+}
+# HTTP timeout and retries for each OpenRouter request
+LLM_REQUEST_TIMEOUT_S = float(os.getenv("LLM_REQUEST_TIMEOUT_S", "45"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+
+# Per-key request scheduling across OPENROUTER_API_KEY + OPENROUTER_BACKUP_KEYS.
+# LLM_KEY_RPM > 0 adds a client-side token bucket per key (off by default);
+# a call waits at most LLM_KEY_MAX_WAIT_S for a key to come out of cooldown
+LLM_KEY_RPM = float(os.getenv("LLM_KEY_RPM", "0"))
+LLM_KEY_BURST = int(os.getenv("LLM_KEY_BURST", "10"))
+LLM_KEY_MAX_WAIT_S = float(os.getenv("LLM_KEY_MAX_WAIT_S", "5"))
+# Cooldown after a 429 without Retry-After, and after 401/403 (revoked or out of credit)
+LLM_KEY_COOLDOWN_S = float(os.getenv("LLM_KEY_COOLDOWN_S", "20"))
+LLM_KEY_AUTH_COOLDOWN_S = float(os.getenv("LLM_KEY_AUTH_COOLDOWN_S", "600"))
+
+# LLM admission control: global concurrency cap, per-priority queue sizes and waits
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "16"))
+LLM_QUEUE_LIMITS = {
+    "interactive": int(os.getenv("LLM_QUEUE_INTERACTIVE", "64")),
+    "batch": int(os.getenv("LLM_QUEUE_BATCH", "16")),
+}
+LLM_QUEUE_WAIT_S = {
+    "interactive": float(os.getenv("LLM_QUEUE_WAIT_INTERACTIVE_S", "20")),
+    "batch": float(os.getenv("LLM_QUEUE_WAIT_BATCH_S", "10")),
+}
+# Enforce LLM_MAX_CONCURRENT across all worker processes on the host (flock, POSIX only)
+LLM_LIMITER_CROSS_PROCESS = os.getenv("LLM_LIMITER_CROSS_PROCESS", "false").lower() == "true"
+
+# Shared HTTP pool for all OpenRouter clients
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "50"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Request tracing: "" (off), "jsonl" (local file) or "otlp" (OTLP/HTTP JSON collector).
+# The JSONL file rolls over to <path>.1 (one backup) once it reaches TRACE_JSONL_MAX_MB
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "").lower()
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+TRACE_JSONL_MAX_MB = float(os.getenv("TRACE_JSONL_MAX_MB", "50"))
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+OTLP_SERVICE_NAME = os.getenv("OTLP_SERVICE_NAME", "mars-backend")
+
+# Prompt token budgets (total prompt size per call site, in tokens)
+PROMPT_TOKEN_BUDGETS = {
+    "analyst": int(os.getenv("ANALYST_PROMPT_TOKENS", "5000")),
+    "analyst_output": int(os.getenv("ANALYST_OUTPUT_TOKENS", "2000")),
+    "scribe": int(os.getenv("SCRIBE_PROMPT_TOKENS", "5000")),
+    "scribe_research": int(os.getenv("RESEARCH_PROMPT_TOKENS", "9000")),
+    "research_source": int(os.getenv("RESEARCH_SOURCE_TOKENS", "600")),
+    "research_source_deep": int(os.getenv("RESEARCH_DEEP_SOURCE_TOKENS", "1500")),
+    "critic": int(os.getenv("CRITIC_PROMPT_TOKENS", "2500")),
+    "studio": int(os.getenv("STUDIO_PROMPT_TOKENS", "2000")),
+    "studio_audio": int(os.getenv("STUDIO_AUDIO_PROMPT_TOKENS", "1000")),
+    "history": int(os.getenv("HISTORY_PROMPT_TOKENS", "800")),
+}
@@ -0,0 +1,82 @@
+"""
+Request deadlines and per-stage time budgets.
+The request deadline (epoch seconds) travels in MARSState.deadline; each stage
+gets min(its own budget, time left on the request). External calls run on a
+shared worker pool so an overrunning call can be abandoned — its result is
+discarded and the pipeline moves on with what it has.
+"""
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, Callable, Optional
+
+from api.core.config import (
+    REQUEST_LATENCY_BUDGET_S,
+    DEADLINE_RESERVE_S,
+    STAGE_BUDGETS_S,
+)
+
+# Shared pool for deadline-bounded calls. Abandoned calls keep their worker
+# until the underlying client gives up, so it is sized well above normal load.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="mars-deadline")
+
+# Never hand a stage less than this, so a nearly-spent request still gets an answer
+MIN_STAGE_TIMEOUT_S = 2.0
+
+
+class StageTimeout(TimeoutError):
+    """An external call overran its stage budget."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} exceeded its {timeout:.1f}s budget")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def new_deadline(budget_s: float = REQUEST_LATENCY_BUDGET_S) -> float:
+    return time.time() + budget_s
+
+
+def remaining(state) -> Optional[float]:
+    """Seconds left on the request, or None if the request has no deadline."""
+    deadline = getattr(state, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def is_nearly_spent(state) -> bool:
+    """True when optional stages should be skipped to protect the deadline."""
+    left = remaining(state)
+    return left is not None and left < DEADLINE_RESERVE_S
+
+
+def stage_timeout(state, stage: str) -> float:
+    """Time budget for a stage: its own budget capped by what is left on the request."""
+    budget = STAGE_BUDGETS_S.get(stage, REQUEST_LATENCY_BUDGET_S)
+    left = remaining(state)
+    if left is not None:
+        budget = min(budget, left)
+    return max(budget, MIN_STAGE_TIMEOUT_S)
+
+
+def submit(fn: Callable, *args, **kwargs):
+    """Run fn on the shared deadline pool and return its Future (trace context is carried over)."""
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+def call_with_timeout(fn: Callable, timeout: float, *args, stage: str = "call", **kwargs) -> Any:
+    """Run fn with a hard wall-clock timeout; raises StageTimeout if it overruns."""
+    future = submit(fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
+        future.cancel()
+        print(f"[Deadline] {stage} abandoned after {timeout:.1f}s")
+        raise StageTimeout(stage, timeout)
+
+
+def invoke_llm(llm, prompt, state, stage: str):
+    """llm.invoke(prompt) bounded by the stage's time budget."""
+    return call_with_timeout(llm.invoke, stage_timeout(state, stage), prompt, stage=stage)
@@ -0,0 +1,61 @@
+"""
+Shared HTTP connection pool for every OpenRouter client.
+All ChatOpenAI instances (each role × primary and backup keys) reuse one
+keep-alive pool instead of opening their own, so concurrent requests share
+TLS sessions and sockets to the same host. HTTP/2 is used when the optional
+`h2` package is installed, multiplexing requests over a single connection.
+"""
+import httpx
+
+from api.core import metrics
+from api.core.config import (
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY_S,
+    HTTP2_ENABLED,
+    LLM_REQUEST_TIMEOUT_S,
+)
+
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("[HTTP] h2 not installed, using HTTP/1.1 keep-alive: pip install httpx[http2]")
+        return False
+
+
+LIMITS = httpx.Limits(
+    max_connections=HTTP_POOL_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+)
+
+SHARED_HTTP_CLIENT = httpx.Client(
+    http2=_http2_available(),
+    limits=LIMITS,
+    timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT_S, connect=10.0),
+)
+
+
+def pool_stats() -> dict:
+    """Connection counts for the shared pool (reads httpcore internals, best effort)."""
+    pool = getattr(getattr(SHARED_HTTP_CLIENT, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for c in connections if c.is_idle())
+    return {
+        "active": len(connections) - idle,
+        "idle": idle,
+        "max": HTTP_POOL_MAX_CONNECTIONS,
+    }
+
+
+def _collect_pool_metrics():
+    for state, value in pool_stats().items():
+        metrics.HTTP_POOL_CONNECTIONS.set(value, state=state)
+
+
+metrics.register_collector(_collect_pool_metrics)
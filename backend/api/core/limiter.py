@@ -0,0 +1,203 @@
+"""
+Admission control for LLM calls.
+Every KeyBalancedLLM.invoke takes a slot from LLM_LIMITER first. Slots are
+handed out by priority (interactive chat before Studio batch work), each
+priority has a bounded wait queue, and a caller that cannot be queued — or
+waits past its limit — gets Overloaded straight away so the view can answer
+503 with Retry-After instead of piling more requests onto OpenRouter.
+With LLM_LIMITER_CROSS_PROCESS the global cap is also enforced across worker
+processes on the host via lock files.
+"""
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from api.core import metrics
+from api.core.config import (
+    LLM_MAX_CONCURRENT,
+    LLM_QUEUE_LIMITS,
+    LLM_QUEUE_WAIT_S,
+    LLM_LIMITER_CROSS_PROCESS,
+)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Lower rank is served first
+PRIORITY_RANK = {INTERACTIVE: 0, BATCH: 1}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+class Overloaded(Exception):
+    """The LLM queue for this priority is full, or the wait for a slot ran out."""
+
+    def __init__(self, priority: str, retry_after: float):
+        super().__init__(f"LLM capacity exhausted for {priority} requests, retry in {retry_after:.0f}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run LLM calls made inside the block (and in threads it submits) at this priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _FileSlots:
+    """Host-wide slots: one flock-ed file per slot, shared by every worker process."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self._dir: Optional[Path] = None
+
+    def _lock_dir(self) -> Path:
+        if self._dir is None:
+            from django.conf import settings
+            cache_dir = Path(getattr(settings, "CACHE_DIR", os.path.join(settings.MEDIA_ROOT, "cache")))
+            path = cache_dir / "llm_slots"
+            path.mkdir(parents=True, exist_ok=True)
+            self._dir = path
+        return self._dir
+
+    def acquire(self, give_up_at: float) -> Optional[int]:
+        import fcntl
+        while True:
+            for i in range(self.count):
+                fd = os.open(str(self._lock_dir() / f"slot-{i}.lock"), os.O_CREAT | os.O_RDWR)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            if time.monotonic() >= give_up_at:
+                return None
+            time.sleep(0.05)
+
+    def release(self, fd: int):
+        import fcntl
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class ConcurrencyLimiter:
+    """
+    At most max_concurrent calls in flight. Waiters are served by priority,
+    FIFO within a priority; queue length and wait time are capped per priority.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        queue_limits: Dict[str, int],
+        max_wait_s: Dict[str, float],
+        cross_process: bool = False,
+    ):
+        self.max_concurrent = max_concurrent
+        self.queue_limits = queue_limits
+        self.max_wait_s = max_wait_s
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queues: Dict[str, deque] = {p: deque() for p in PRIORITY_RANK}
+        # Smoothed slot hold time, for Retry-After estimates
+        self._hold_ewma = 5.0
+        self._file_slots = None
+        if cross_process:
+            try:
+                import fcntl  # noqa: F401
+                self._file_slots = _FileSlots(max_concurrent)
+            except ImportError:
+                print("[Limiter] fcntl unavailable, cross-process limiting disabled")
+
+    def _head(self):
+        for p in sorted(self._queues, key=PRIORITY_RANK.get):
+            if self._queues[p]:
+                return self._queues[p][0]
+        return None
+
+    def retry_after(self, priority: str) -> float:
+        """Rough wait before a slot frees up for this priority, in seconds."""
+        ahead = sum(
+            len(q) for p, q in self._queues.items() if PRIORITY_RANK[p] <= PRIORITY_RANK[priority]
+        )
+        return max(1.0, self._hold_ewma * (ahead + 1) / self.max_concurrent)
+
+    def is_full(self, priority: str = INTERACTIVE) -> bool:
+        """True when a new call at this priority would be rejected immediately (admission check)."""
+        with self._cond:
+            return len(self._queues[priority]) >= self.queue_limits[priority]
+
+    def _reject(self, priority: str):
+        metrics.LLM_LIMITER_REJECTED.inc(priority=priority)
+        raise Overloaded(priority, self.retry_after(priority))
+
+    def _acquire_local(self, priority: str, give_up_at: float):
+        with self._cond:
+            if self._active < self.max_concurrent and self._head() is None:
+                self._active += 1
+                return
+            queue = self._queues[priority]
+            if len(queue) >= self.queue_limits[priority]:
+                self._reject(priority)
+            ticket = object()
+            queue.append(ticket)
+            metrics.LLM_LIMITER_QUEUED.inc(priority=priority)
+            try:
+                while not (self._active < self.max_concurrent and self._head() is ticket):
+                    left = give_up_at - time.monotonic()
+                    if left <= 0:
+                        self._reject(priority)
+                    self._cond.wait(left)
+                self._active += 1
+            finally:
+                queue.remove(ticket)
+                metrics.LLM_LIMITER_QUEUED.dec(priority=priority)
+                self._cond.notify_all()
+
+    def _release_local(self, held: float):
+        with self._cond:
+            self._active -= 1
+            self._hold_ewma = 0.2 * held + 0.8 * self._hold_ewma
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None):
+        """Hold one LLM slot for the duration of the block (priority defaults to the context's)."""
+        priority = priority or _priority.get()
+        started = time.monotonic()
+        give_up_at = started + self.max_wait_s[priority]
+        self._acquire_local(priority, give_up_at)
+        fd = None
+        if self._file_slots is not None:
+            fd = self._file_slots.acquire(give_up_at)
+            if fd is None:
+                self._release_local(0.0)
+                self._reject(priority)
+        acquired = time.monotonic()
+        metrics.LLM_LIMITER_WAIT.observe(acquired - started, priority=priority)
+        metrics.LLM_LIMITER_ACTIVE.inc()
+        try:
+            yield
+        finally:
+            metrics.LLM_LIMITER_ACTIVE.dec()
+            if fd is not None:
+                self._file_slots.release(fd)
+            self._release_local(time.monotonic() - acquired)
+
+
+LLM_LIMITER = ConcurrencyLimiter(
+    LLM_MAX_CONCURRENT,
+    LLM_QUEUE_LIMITS,
+    LLM_QUEUE_WAIT_S,
+    cross_process=LLM_LIMITER_CROSS_PROCESS,
+)
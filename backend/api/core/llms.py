@@ -1,13 +1,278 @@
 import os
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+
 from dotenv import load_dotenv
 load_dotenv()
 
+import openai
 from langchain_openai import ChatOpenAI
+from langchain_core.load import dumps
+from langchain_core.runnables import Runnable
 from api.core.config import (
     OPENROUTER_API_KEY,
     OPENROUTER_BASE_URL,
     OPENROUTER_BACKUP_KEYS,
+    LLM_REQUEST_TIMEOUT_S,
+    LLM_MAX_RETRIES,
+    LLM_KEY_RPM,
+    LLM_KEY_BURST,
+    LLM_KEY_MAX_WAIT_S,
+    LLM_KEY_COOLDOWN_S,
+    LLM_KEY_AUTH_COOLDOWN_S,
 )
+from api.core import metrics
+from api.core.tracing import TRACING_CALLBACK
+from api.core.metrics import METRICS_CALLBACK, record_cache
+from api.cache.llm import LLMResponseCache, cache_for
+from api.core.http import SHARED_HTTP_CLIENT
+from api.core.limiter import LLM_LIMITER
+
+# ========================================
+# API Key Scheduling
+# ========================================
+
+# Weight of the newest sample in the per-key latency average
+LATENCY_EWMA_ALPHA = 0.3
+
+
+class KeySlot:
+    """One API key: a token bucket, a cooldown, and latency / error stats."""
+
+    def __init__(self, index: int, api_key: str):
+        self.index = index
+        self.api_key = api_key
+        self.label = f"key{index}"  # never export the key itself
+        self.tokens = float(LLM_KEY_BURST)
+        self.refilled_at = time.monotonic()
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.latency_ewma: Optional[float] = None
+
+    def refill(self, now: float):
+        if LLM_KEY_RPM <= 0:
+            return
+        rate = LLM_KEY_RPM / 60.0
+        self.tokens = min(float(LLM_KEY_BURST), self.tokens + (now - self.refilled_at) * rate)
+        self.refilled_at = now
+
+    def ready_in(self, now: float) -> float:
+        """Seconds until this key may take a request (0 = now)."""
+        wait = max(self.cooldown_until - now, 0.0)
+        if LLM_KEY_RPM > 0 and self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / (LLM_KEY_RPM / 60.0))
+        return wait
+
+    def score(self) -> float:
+        """Lower is better: expected latency, scaled by load and recent errors."""
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        error_rate = self.errors / self.calls if self.calls else 0.0
+        return latency * (self.in_flight + 1) * (1 + error_rate)
+
+
+class KeyScheduler:
+    """
+    Spreads requests across every configured OpenRouter key.
+    With LLM_KEY_RPM set, each key has a token bucket (bursts of LLM_KEY_BURST);
+    otherwise only the provider limits apply. Keys that return 429 cool down for Retry-After seconds, keys rejected with 401/403 for
+    LLM_KEY_AUTH_COOLDOWN_S. Among ready keys the one with the best
+    latency × load × error score is picked.
+    """
+
+    def __init__(self, api_keys: List[str]):
+        self.slots = [KeySlot(i, key) for i, key in enumerate(api_keys)]
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude=(), max_wait: float = LLM_KEY_MAX_WAIT_S) -> Optional[KeySlot]:
+        """Reserve the best available key, waiting up to max_wait for one to free up."""
+        give_up_at = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [s for s in self.slots if s.index not in exclude]
+                if not candidates:
+                    return None
+                for slot in candidates:
+                    slot.refill(now)
+                ready = [s for s in candidates if s.ready_in(now) == 0]
+                if ready:
+                    slot = min(ready, key=KeySlot.score)
+                    if LLM_KEY_RPM > 0:
+                        slot.tokens -= 1
+                    slot.in_flight += 1
+                    return slot
+                wait = min(s.ready_in(now) for s in candidates)
+            if now + wait > give_up_at:
+                return None
+            time.sleep(min(wait, 1.0))
+
+    def release(self, slot: KeySlot, latency: Optional[float] = None, error: bool = False):
+        with self._lock:
+            slot.in_flight -= 1
+            slot.calls += 1
+            if error:
+                slot.errors += 1
+            if latency is not None:
+                slot.latency_ewma = latency if slot.latency_ewma is None else (
+                    LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * slot.latency_ewma
+                )
+        metrics.LLM_KEY_REQUESTS.inc(key=slot.label, status="error" if error else "ok")
+
+    def cool_down(self, slot: KeySlot, seconds: float, reason: str):
+        with self._lock:
+            slot.cooldown_until = max(slot.cooldown_until, time.monotonic() + seconds)
+        metrics.LLM_KEY_REQUESTS.inc(key=slot.label, status=reason)
+        print(f"[KeyScheduler] {slot.label} cooling down {seconds:.0f}s ({reason})")
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "key": s.label,
+                "calls": s.calls,
+                "errors": s.errors,
+                "error_rate": round(s.errors / s.calls, 3) if s.calls else 0.0,
+                "latency_ewma_s": round(s.latency_ewma, 3) if s.latency_ewma is not None else None,
+                "in_flight": s.in_flight,
+                "cooldown_s": round(max(s.cooldown_until - now, 0.0), 1),
+            } for s in self.slots]
+
+    def collect_metrics(self):
+        for entry in self.stats():
+            if entry["latency_ewma_s"] is not None:
+                metrics.LLM_KEY_LATENCY.set(entry["latency_ewma_s"], key=entry["key"])
+            metrics.LLM_KEY_COOLING.set(1 if entry["cooldown_s"] > 0 else 0, key=entry["key"])
+
+
+def _retry_after(error: Exception) -> float:
+    """Seconds from a 429's Retry-After header (delta or HTTP date), else the default cooldown."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    if value:
+        try:
+            return max(float(value), 1.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 1.0)
+            except (TypeError, ValueError):
+                pass
+    return LLM_KEY_COOLDOWN_S
+
+
+_api_keys = [OPENROUTER_API_KEY] + [
+    k.strip() for k in OPENROUTER_BACKUP_KEYS if k.strip() and k.strip() != OPENROUTER_API_KEY
+]
+KEY_SCHEDULER = KeyScheduler(_api_keys)
+metrics.register_collector(KEY_SCHEDULER.collect_metrics)
+
+
+_cache_key_warned = False
+
+
+class KeyBalancedLLM(Runnable):
+    """
+    One ChatOpenAI per key behind the shared KeyScheduler. A call that hits a
+    rate limit, auth failure or transient server/connection error is retried on
+    the next best key straight away; timeouts and request errors (400s) are
+    raised as-is. Each call holds an LLM_LIMITER slot for its whole duration,
+    except response-cache hits, which are answered from the cache directly.
+    Other chat-model methods (bind_tools, with_structured_output, …) are applied
+    to every per-key model and return a KeyBalancedLLM over the results.
+    """
+
+    def __init__(self, llms: List[Runnable], scheduler: KeyScheduler):
+        self.llms = llms
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        if name.startswith("_") or "llms" not in self.__dict__:
+            raise AttributeError(name)
+        attribute = getattr(self.llms[0], name)
+        if not callable(attribute):
+            return attribute
+
+        def per_key(*args, **kwargs):
+            results = [getattr(llm, name)(*args, **kwargs) for llm in self.llms]
+            if all(isinstance(r, Runnable) for r in results):
+                return KeyBalancedLLM(results, self.scheduler)
+            return results[0]
+        return per_key
+
+    def invoke(self, input, config=None, **kwargs):
+        cached = self._cached_response(input, kwargs)
+        if cached is not None:
+            return cached
+        with LLM_LIMITER.slot():
+            return self._invoke_balanced(input, config, **kwargs)
+
+    def _cached_response(self, input, kwargs):
+        """
+        The cached message for this call, or None. The key is built the way
+        BaseChatModel builds it for its own cache lookup; if a LangChain change
+        breaks that, the failure is logged and every call goes to the API.
+        """
+        global _cache_key_warned
+        llm = self.llms[0]
+        cache = getattr(llm, "cache", None)
+        if not isinstance(llm, ChatOpenAI) or not isinstance(cache, LLMResponseCache):
+            return None
+        try:
+            params = {k: v for k, v in kwargs.items() if k != "stop"}
+            llm_string = llm._get_llm_string(stop=kwargs.get("stop"), **params)
+            prompt = dumps(llm._convert_input(input).to_messages())
+        except Exception as e:
+            if not _cache_key_warned:
+                _cache_key_warned = True
+                print(f"[LLMCache] Cannot build cache keys, pre-scheduler cache check disabled: {e!r}")
+            return None
+        # A miss is recorded by the real call's own lookup; only hits are counted here
+        generations = cache.lookup(prompt, llm_string, record=False)
+        if not generations:
+            return None
+        record_cache("llm", True)
+        return generations[0].message
+
+    def _invoke_balanced(self, input, config=None, **kwargs):
+        tried = set()
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.llms):
+            slot = self.scheduler.acquire(exclude=tried)
+            if slot is None:
+                break
+            tried.add(slot.index)
+            started = time.perf_counter()
+            try:
+                result = self.llms[slot.index].invoke(input, config, **kwargs)
+            except openai.RateLimitError as e:
+                self.scheduler.release(slot, error=True)
+                self.scheduler.cool_down(slot, _retry_after(e), "rate_limited")
+                last_error = e
+            except (openai.AuthenticationError, openai.PermissionDeniedError) as e:
+                self.scheduler.release(slot, error=True)
+                self.scheduler.cool_down(slot, LLM_KEY_AUTH_COOLDOWN_S, "auth_failed")
+                last_error = e
+            except openai.APITimeoutError:
+                # The request may still be running upstream (or was abandoned by the
+                # deadline); trying the next key would only spend its quota too
+                self.scheduler.release(slot, latency=time.perf_counter() - started, error=True)
+                raise
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                self.scheduler.release(slot, latency=time.perf_counter() - started, error=True)
+                last_error = e
+            except Exception:
+                self.scheduler.release(slot, error=True)
+                raise
+            else:
+                self.scheduler.release(slot, latency=time.perf_counter() - started)
+                return result
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError("No OpenRouter API key available (all keys rate limited or cooling down)")
+
 
 # ========================================
 # Automatic LLM Failover Configuration
@@ -15,36 +280,32 @@ from api.core.config import (
 
 def create_resilient_llm(model_name: str, temperature: float, max_tokens: int):
     """
-    Creates an LLM instance with built-in fallbacks.
-    If the primary API key fails (e.g., rate limit or expired), it automatically
-    tries the backup keys in sequence.
+    Creates an LLM that load-balances across the primary and backup API keys.
+    Requests are spread by KEY_SCHEDULER; a key that is rate limited or fails
+    is cooled down and the call moves to the next key without waiting.
+    Deterministic models share the LLM response cache (see api/cache/llm.py);
+    the cache key ignores the API key, so a hit from any key serves them all.
+    Every instance sends through SHARED_HTTP_CLIENT's connection pool.
     """
-    primary_llm = ChatOpenAI(
-        model=model_name,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        openai_api_key=OPENROUTER_API_KEY,
-        openai_api_base=OPENROUTER_BASE_URL,
-    )
-    
-    # Create a list of backup LLMs using the working backup keys
-    backups = []
-    for key in OPENROUTER_BACKUP_KEYS:
-        key = key.strip()
-        if key and key != OPENROUTER_API_KEY:
-            backups.append(
-                ChatOpenAI(
-                    model=model_name,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    openai_api_key=key,
-                    openai_api_base=OPENROUTER_BASE_URL,
-                )
-            )
-            
-    if backups:
-        return primary_llm.with_fallbacks(backups)
-    return primary_llm
+    response_cache = cache_for(temperature)
+    # With several keys, rotating beats the client's own sleep-and-retry on 429s
+    max_retries = 0 if len(KEY_SCHEDULER.slots) > 1 else LLM_MAX_RETRIES
+    llms = [
+        ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            openai_api_key=slot.api_key,
+            openai_api_base=OPENROUTER_BASE_URL,
+            timeout=LLM_REQUEST_TIMEOUT_S,
+            max_retries=max_retries,
+            callbacks=[TRACING_CALLBACK, METRICS_CALLBACK],
+            cache=response_cache,
+            http_client=SHARED_HTTP_CLIENT,
+        )
+        for slot in KEY_SCHEDULER.slots
+    ]
+    return KeyBalancedLLM(llms, KEY_SCHEDULER)
 
 # ========================================
 # Base LLM for fast tasks (Planner, Analyst, Critic)
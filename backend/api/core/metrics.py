@@ -0,0 +1,255 @@
+"""
+In-process metrics with Prometheus text exposition (served at /api/metrics/).
+Counters, gauges and histograms with labels; no external dependency.
+Each worker process keeps its own registry — scrape every worker, or run a
+single worker per container, as with any non-multiprocess Prometheus client.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+# Callables run just before each scrape to refresh sampled gauges
+_collectors: List[Callable[[], None]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # bucket counts..., sum, count
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, state in self._values.items():
+                for bound, count in zip(self.buckets, state):
+                    le = (("le", _format_value(float(bound))),)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {int(count)}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {int(state[-1])}")
+        return lines
+
+
+def register_collector(fn: Callable[[], None]):
+    """Run fn before every scrape (for gauges sampled from live objects)."""
+    with _registry_lock:
+        _collectors.append(fn)
+
+
+def render_latest() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+        collectors = list(_collectors)
+    for collect in collectors:
+        try:
+            collect()
+        except Exception as e:
+            print(f"[Metrics] Collector failed: {e}")
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ─────────────────────────────────────────────
+# MARS metrics
+# ─────────────────────────────────────────────
+
+REQUEST_LATENCY = Histogram(
+    "mars_request_duration_seconds", "End-to-end chat request latency",
+    ["mode", "intent", "cache_hit"],
+)
+REQUEST_ERRORS = Counter(
+    "mars_request_errors_total", "Chat requests that failed with an exception", ["endpoint"],
+)
+AGENT_DURATION = Histogram(
+    "mars_agent_duration_seconds", "Per-agent execution time (from agent_logs)", ["agent", "status"],
+)
+LLM_CALLS = Counter("mars_llm_calls_total", "LLM calls by model and outcome", ["model", "status"])
+LLM_TOKENS = Counter("mars_llm_tokens_total", "LLM tokens by model and direction", ["model", "type"])
+LLM_LATENCY = Histogram("mars_llm_call_duration_seconds", "LLM call latency by model", ["model"])
+FAISS_LOAD = Histogram("mars_faiss_load_seconds", "FAISS index load time from disk")
+FAISS_SEARCH = Histogram("mars_faiss_search_seconds", "FAISS query embedding + similarity search time")
+CACHE_REQUESTS = Counter("mars_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+INGEST_DURATION = Histogram(
+    "mars_ingest_duration_seconds", "PDF ingest time (parse, chunk, embed, save)",
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+INGEST_PAGES = Counter("mars_ingest_pages_total", "Pages ingested")
+INGEST_CHUNKS = Counter("mars_ingest_chunks_total", "Chunks embedded and indexed")
+ACTIVE_STREAMS = Gauge("mars_active_sse_streams", "Currently open SSE chat streams")
+LLM_KEY_REQUESTS = Counter(
+    "mars_llm_key_requests_total", "OpenRouter requests per API key slot by outcome", ["key", "status"],
+)
+LLM_KEY_LATENCY = Gauge(
+    "mars_llm_key_latency_seconds", "Smoothed (EWMA) request latency per API key slot", ["key"],
+)
+LLM_KEY_COOLING = Gauge(
+    "mars_llm_key_cooling_down", "1 while an API key slot is cooling down after 429/auth errors", ["key"],
+)
+LLM_LIMITER_ACTIVE = Gauge("mars_llm_limiter_active", "LLM calls currently holding a limiter slot")
+LLM_LIMITER_QUEUED = Gauge("mars_llm_limiter_queued", "LLM calls waiting for a slot", ["priority"])
+LLM_LIMITER_REJECTED = Counter(
+    "mars_llm_limiter_rejected_total", "LLM calls rejected by admission control", ["priority"],
+)
+LLM_LIMITER_WAIT = Histogram("mars_llm_limiter_wait_seconds", "Time spent waiting for an LLM slot", ["priority"])
+HTTP_POOL_CONNECTIONS = Gauge(
+    "mars_http_pool_connections", "Connections in the shared LLM HTTP pool by state", ["state"],
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Counts LLM calls, tokens and latency by model."""
+
+    def __init__(self):
+        self._runs: Dict[object, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, serialized, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name", "llm")
+        with self._lock:
+            self._runs[run_id] = (model, time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            model, started = self._runs.pop(run_id, ("unknown", None))
+        if started is not None:
+            LLM_LATENCY.observe(time.perf_counter() - started, model=model)
+        LLM_CALLS.inc(model=model, status="ok")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, model=model, type="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens") or 0, model=model, type="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            model, _ = self._runs.pop(run_id, ("unknown", None))
+        LLM_CALLS.inc(model=model, status="error")
+
+
+METRICS_CALLBACK = MetricsCallbackHandler()
@@ -29,7 +29,10 @@ class MARSStateDict(TypedDict, total=False):
     user_query: str
     mode: Optional[str]
     namespace: Optional[str]
+    deep_research: bool
     chat_history: List[Dict[str, Any]]
+    memory_context: str
+    memory_hint: str
     intent: Optional[str]
     answer_type: Optional[str]
     retrieved_sources: List[Dict[str, Any]]
@@ -40,15 +43,22 @@ class MARSStateDict(TypedDict, total=False):
     grounding_score: Optional[float]
     papers_metadata: List[Dict[str, Any]]
     agent_logs: List[Dict[str, Any]]
+    deadline: Optional[float]
 
 
 class MARSState(BaseModel):
     user_query: str
     mode: Optional[str] = None
     namespace: Optional[str] = None
+    # Research Mode: pull the full text of the top arXiv papers into the shared corpus
+    deep_research: bool = False
 
     # Chat memory
     chat_history: List[ChatMessage] = Field(default_factory=list)
+    # Built by the Planner from chat_history (see api.council.memory): the prompt block
+    # of summary, relevant and recent turns, and the previous question for follow-up searches
+    memory_context: str = ""
+    memory_hint: str = ""
 
     # Intent tracking
     intent: Optional[str] = None
@@ -70,5 +80,8 @@ class MARSState(BaseModel):
     # Agent verbose logs
     agent_logs: List[AgentLog] = Field(default_factory=list)
 
+    # Request deadline (epoch seconds) — see api.core.deadline
+    deadline: Optional[float] = None
+
     class Config:
         extra = "allow"
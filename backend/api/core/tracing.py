@@ -0,0 +1,301 @@
+"""
+Lightweight per-request tracing.
+A trace is opened per chat request; nested spans (agents, FAISS load, query
+embedding, vector search, LLM calls, research sources, PDF export) attach to
+it through a context variable. Finished traces are exported to a local JSONL
+file or posted to an OTLP/HTTP (JSON) collector from a background thread.
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from api.core.config import (
+    TRACE_EXPORT,
+    TRACE_JSONL_PATH,
+    TRACE_JSONL_MAX_MB,
+    OTLP_ENDPOINT,
+    OTLP_SERVICE_NAME,
+)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("mars_span", default=None)
+
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def add(self, span: "Span"):
+        with self._lock:
+            if not self.closed:
+                self.spans.append(span)
+
+
+class Span:
+    def __init__(self, name: str, trace: Trace, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.attributes: Dict[str, Any] = dict(attributes)
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def error(self, exc: BaseException):
+        self.status = "error"
+        self.attributes["error"] = str(exc)[:500]
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.add(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 2),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned when no trace is active, so callers never need to check."""
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def error(self, exc: BaseException):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+@contextmanager
+def start_trace(name: str, trace_id: Optional[str] = None, **attributes):
+    """Open the root span of a request; the trace is exported when it closes."""
+    trace = Trace(trace_id or new_trace_id())
+    root = Span(name, trace, **attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.finish()
+        with trace._lock:
+            trace.closed = True
+        _export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Nested span under the current one; a no-op outside of a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+    child = Span(name, parent.trace, parent, **attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+# ─────────────────────────────────────────────
+# LLM calls (LangChain callback)
+# ─────────────────────────────────────────────
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records every chat-model call as a span with prompt/completion token counts."""
+
+    def __init__(self):
+        self._spans: Dict[Any, Span] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, run_id, serialized, kwargs):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name", "llm")
+        llm_span = Span("llm.call", parent.trace, parent, model=model,
+                        temperature=params.get("temperature"), max_tokens=params.get("max_tokens"))
+        with self._lock:
+            self._spans[run_id] = llm_span
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._open(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._open(run_id, serialized, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            llm_span = self._spans.pop(run_id, None)
+        if llm_span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        llm_span.set(
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            total_tokens=usage.get("total_tokens"),
+        )
+        llm_span.finish()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.error(error)
+            llm_span.finish()
+
+
+TRACING_CALLBACK = TracingCallbackHandler()
+
+
+# ─────────────────────────────────────────────
+# Export
+# ─────────────────────────────────────────────
+
+_export_queue: "queue.Queue[Trace]" = queue.Queue(maxsize=1000)
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def _export(trace: Trace):
+    global _worker_started
+    if TRACE_EXPORT not in ("jsonl", "otlp"):
+        return
+    if not _worker_started:
+        with _worker_lock:
+            if not _worker_started:
+                threading.Thread(target=_export_loop, daemon=True, name="trace-export").start()
+                _worker_started = True
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        print("[Tracing] Export queue full, dropping trace")
+
+
+def _export_loop():
+    while True:
+        trace = _export_queue.get()
+        try:
+            if TRACE_EXPORT == "otlp":
+                _export_otlp(trace)
+            else:
+                _export_jsonl(trace)
+        except Exception as e:
+            print(f"[Tracing] Export failed: {e}")
+
+
+def _jsonl_path() -> str:
+    if TRACE_JSONL_PATH:
+        return TRACE_JSONL_PATH
+    from django.conf import settings
+    return os.path.join(settings.DATA_DIR, "traces.jsonl")
+
+
+def _export_jsonl(trace: Trace):
+    path = _jsonl_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Size-capped: the full file replaces the single backup and a new one starts
+    try:
+        if TRACE_JSONL_MAX_MB > 0 and os.path.getsize(path) >= TRACE_JSONL_MAX_MB * 1024 * 1024:
+            os.replace(path, path + ".1")
+    except FileNotFoundError:
+        pass
+    with open(path, "a", encoding="utf-8") as f:
+        for s in trace.spans:
+            f.write(json.dumps(s.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _export_otlp(trace: Trace):
+    import requests
+
+    spans = []
+    for s in trace.spans:
+        otlp_span = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)}
+                for k, v in s.attributes.items() if v is not None
+            ],
+            "status": {"code": 2 if s.status == "error" else 1},
+        }
+        if s.parent_id:
+            otlp_span["parentSpanId"] = s.parent_id
+        spans.append(otlp_span)
+
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": OTLP_SERVICE_NAME}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "mars.tracing"}, "spans": spans}],
+        }]
+    }
+    requests.post(OTLP_ENDPOINT, json=payload, timeout=5)
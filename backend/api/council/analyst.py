@@ -1,9 +1,67 @@
 import time
-from api.core.state import MARSState, AgentLog
+from typing import List, Optional
+from api.core.state import MARSState, AgentLog, RetrievedSource
 from api.core.llms import ANALYST_LLM
+from api.core.config import ANALYST_FAST_PATH_MAX_TOKENS, PROMPT_TOKEN_BUDGETS
+from api.core.deadline import invoke_llm, is_nearly_spent
+from api.utils.tokens import count_tokens
+from api.utils.context import pack_texts, remaining_budget, truncate_to_tokens
+
+
+def build_source_context(sources: List[RetrievedSource], max_tokens: Optional[int] = None) -> str:
+    """
+    Joins retrieved sources into one context block, keeping page numbers.
+    With max_tokens, sources are packed in retrieval (relevance) order and trimmed on sentence boundaries.
+    """
+    headers = [
+        f"Source {i+1} (Page {s.page if s.page is not None else 'N/A'}):\n"
+        for i, s in enumerate(sources)
+    ]
+    contents = [s.content for s in sources]
+    if max_tokens is not None:
+        overhead = sum(count_tokens(h) + 3 for h in headers)
+        contents = pack_texts(contents, max(max_tokens - overhead, 0))
+    return "\n\n---\n\n".join(h + c for h, c in zip(headers, contents))
+
+
+def fits_fast_path(sources: List[RetrievedSource]) -> bool:
+    """True when the raw sources are small enough to hand straight to the Scribe"""
+    if ANALYST_FAST_PATH_MAX_TOKENS <= 0 or not sources:
+        return False
+    return count_tokens(build_source_context(sources)) <= ANALYST_FAST_PATH_MAX_TOKENS
 
 
 class AnalystAgent:
+    def fast_path(self, state: MARSState) -> MARSState:
+        """Passes the raw page-annotated sources to the Scribe without an LLM call"""
+        start = time.time()
+
+        context = build_source_context(state.retrieved_sources)
+        tokens = count_tokens(context)
+        state.refined_context = context
+
+        if is_nearly_spent(state):
+            reason = "deadline"
+            thinking = "Latency budget nearly spent — passing raw sources to Scribe"
+        else:
+            reason = "small_context"
+            thinking = f"Context is {tokens} tokens (budget {ANALYST_FAST_PATH_MAX_TOKENS}) — passing raw sources to Scribe"
+
+        state.agent_logs.append(AgentLog(
+            agent="Analyst", icon="assessment", status="skipped",
+            duration_ms=int((time.time() - start) * 1000),
+            thinking=thinking,
+            output_preview=f"Fast path: {len(state.retrieved_sources)} raw sources ({len(context)} chars)",
+            details={
+                "path": "fast",
+                "reason": reason,
+                "context_tokens": tokens,
+                "token_budget": ANALYST_FAST_PATH_MAX_TOKENS,
+                "sources_count": len(state.retrieved_sources),
+            }
+        ))
+        return state
+
     def run(self, state: MARSState) -> MARSState:
         """Organizes retrieved content, preserving page citations for structured output"""
         start = time.time()
@@ -20,20 +78,8 @@ class AnalystAgent:
         if state.intent in ["greeting", "feedback"]:
             return state
 
-        # Build context WITH page number metadata preserved
-        context = "\n\n---\n\n".join(
-            f"Source {i+1} (Page {s.page if s.page is not None else 'N/A'}):\n{s.content}"
-            for i, s in enumerate(state.retrieved_sources)
-        )
-
-        recent_history = ""
-        if len(state.chat_history) > 0:
-            recent_history = "\n".join(
-                f"{m.role.upper()}: {m.content}"
-                for m in state.chat_history[-4:]
-            )
-
-        prompt = f"""You are analyzing source material for a question-answering system.
+        def build_prompt(recent_history: str, context: str) -> str:
+            return f"""You are analyzing source material for a question-answering system.
 
 Recent Conversation:
 {recent_history if recent_history else "No prior conversation"}
@@ -54,9 +100,17 @@ Task:
 Analysis:
 """
 
+        # Instructions and question are paid for first, then conversation memory; sources get the rest
+        recent_history = state.memory_context
+        source_budget = remaining_budget(PROMPT_TOKEN_BUDGETS["analyst"], build_prompt(recent_history, ""))
+
+        # Build context WITH page number metadata preserved
+        context = build_source_context(state.retrieved_sources, max_tokens=source_budget)
+        prompt = build_prompt(recent_history, context)
+
         try:
-            response = ANALYST_LLM.invoke(prompt)
-            state.refined_context = response.content.strip()[:8000]
+            response = invoke_llm(ANALYST_LLM, prompt, state, "analyst")
+            state.refined_context = truncate_to_tokens(response.content.strip(), PROMPT_TOKEN_BUDGETS["analyst_output"])
 
             elapsed = int((time.time() - start) * 1000)
             state.agent_logs.append(AgentLog(
@@ -65,7 +119,9 @@ Analysis:
                 thinking=f"Analyzing {len(state.retrieved_sources)} sources for query: '{state.user_query[:80]}...'",
                 output_preview=f"Refined context: {len(state.refined_context)} chars from {len(state.retrieved_sources)} sources ({elapsed}ms)",
                 details={
+                    "path": "full",
                     "sources_count": len(state.retrieved_sources),
+                    "prompt_tokens": count_tokens(prompt),
                     "refined_length": len(state.refined_context),
                     "context_preview": state.refined_context[:300] + "..."
                 }
@@ -73,13 +129,13 @@ Analysis:
         except Exception as e:
             elapsed = int((time.time() - start) * 1000)
             print(f"[Analyst Error] {e}")
-            state.refined_context = context[:8000]
+            state.refined_context = truncate_to_tokens(context, PROMPT_TOKEN_BUDGETS["analyst_output"])
             state.agent_logs.append(AgentLog(
                 agent="Analyst", icon="assessment", status="error",
                 duration_ms=elapsed,
                 thinking=f"LLM analysis failed: {str(e)}. Falling back to raw context.",
-                output_preview=f"Fallback: Using raw sources ({len(context[:8000])} chars)",
-                details={"error": str(e)}
+                output_preview=f"Fallback: Using raw sources ({len(state.refined_context)} chars)",
+                details={"path": "full", "error": str(e)}
             ))
 
         return state
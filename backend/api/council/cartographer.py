@@ -2,6 +2,9 @@ import time
 import json
 from api.core.state import MARSState, AgentLog
 from api.core.llms import FAST_LLM  # Use faster model for JSON extraction
+from api.core.limiter import Overloaded
+from api.core.config import PROMPT_TOKEN_BUDGETS
+from api.utils.context import truncate_to_tokens
 
 class CartographerAgent:
     def run(self, state: MARSState) -> MARSState:
@@ -16,7 +19,7 @@ class CartographerAgent:
 You are an expert Educational Content Architect. Your goal is to transform the provided text into a highly structured study guide and a conceptual mind map.
 
 Source Material:
-{state.draft_answer[:6000]}
+{truncate_to_tokens(state.draft_answer, PROMPT_TOKEN_BUDGETS["studio"])}
 
 Requirements:
 1. **Core Concepts (Flashcards)**:
@@ -74,6 +77,9 @@ JSON Output:
                 }
             ))
 
+        except Overloaded:
+            raise
+
         except Exception as e:
             print(f"[Cartographer Error] {e}")
             state.agent_logs.append(AgentLog(
@@ -0,0 +1,99 @@
+"""
+Local nearest-centroid intent classifier for the Planner.
+Centroids are the normalised mean embeddings of the labelled examples in
+intent_examples.json, computed once with the fastembed model the FAISS index
+already uses. Classifying a query is one embedding plus a 5-row dot product.
+"""
+import json
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from api.core.config import INTENT_CLASSIFIER_ENABLED, INTENT_MIN_CONFIDENCE, INTENT_MIN_MARGIN
+
+EXAMPLES_PATH = Path(__file__).with_name("intent_examples.json")
+
+
+@dataclass
+class IntentPrediction:
+    label: str
+    confidence: float   # cosine similarity to the winning centroid
+    margin: float       # lead over the runner-up centroid
+    scores: Dict[str, float]
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= INTENT_MIN_CONFIDENCE and self.margin >= INTENT_MIN_MARGIN
+
+
+class IntentClassifier:
+    def __init__(self, examples_path: Path = EXAMPLES_PATH):
+        self.examples_path = examples_path
+        self._labels: Tuple[str, ...] = ()
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        from api.storage.faiss_store import _get_embeddings
+
+        with open(self.examples_path, encoding="utf-8") as f:
+            examples = json.load(f)
+        labels, texts = [], []
+        for label, items in examples.items():
+            labels.extend([label] * len(items))
+            texts.extend(items)
+
+        vectors = np.asarray(_get_embeddings().embed_documents(texts), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+        names = tuple(examples)
+        centroids = np.stack([
+            vectors[[i for i, l in enumerate(labels) if l == name]].mean(axis=0) for name in names
+        ])
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-8)
+        self._labels, self._centroids = names, centroids
+        print(f"[Intent] Centroids ready for {len(names)} intents from {len(texts)} examples")
+
+    def warm(self):
+        """Compute centroids now (called at startup so the first query pays nothing)."""
+        with self._lock:
+            if self._centroids is None:
+                self._build()
+
+    def classify(self, query: str) -> IntentPrediction:
+        self.warm()
+        vector = np.asarray(_embed_query(query.strip().lower()), dtype=np.float32)
+        scores = self._centroids @ vector
+        order = np.argsort(scores)[::-1]
+        best, second = order[0], order[1] if len(order) > 1 else order[0]
+        return IntentPrediction(
+            label=self._labels[best],
+            confidence=round(float(scores[best]), 3),
+            margin=round(float(scores[best] - scores[second]), 3),
+            scores={l: round(float(s), 3) for l, s in zip(self._labels, scores)},
+        )
+
+
+@lru_cache(maxsize=1024)
+def _embed_query(query: str) -> Tuple[float, ...]:
+    from api.storage.faiss_store import _get_embeddings
+    vector = np.asarray(_get_embeddings().embed_query(query), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return tuple(vector / norm) if norm else tuple(vector)
+
+
+INTENT_CLASSIFIER = IntentClassifier()
+
+
+def predict_intent(query: str) -> Optional[IntentPrediction]:
+    """Classifier prediction, or None when disabled or the model is unavailable."""
+    if not INTENT_CLASSIFIER_ENABLED or not query.strip():
+        return None
+    try:
+        return INTENT_CLASSIFIER.classify(query)
+    except Exception as e:
+        print(f"[Intent] Classifier unavailable, using rules: {e}")
+        return None
@@ -1,15 +1,108 @@
-from typing import List
+"""
+Token-budgeted conversation memory.
+Clients resend the whole chat history with every request. Instead of quoting
+its last few messages verbatim, the Planner builds one memory block per
+request:
+- recent messages, newest first, verbatim within the "history" prompt budget;
+- a rolling summary of everything older, cached per conversation prefix so
+  each request only folds in the messages that scrolled out since the last one
+  (an extractive summary is used immediately; FAST_LLM rewrites it in the
+  background for the next request);
+- the older turns most similar to the current query, quoted back.
+The Analyst and Scribe put the block in their prompts; the Scout uses the
+previous question to expand follow-up searches.
+"""
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+from api.cache.store import SQLiteCache, hash_key
 from api.core.state import MARSState, ChatMessage
+from api.utils.tokens import count_tokens
+from api.utils.context import pack_history, pack_texts, split_sentences, truncate_to_tokens
+from api.core.config import (
+    PROMPT_TOKEN_BUDGETS,
+    MEMORY_SUMMARY_TOKENS,
+    MEMORY_SUMMARY_LLM,
+    MEMORY_SUMMARY_TTL_DAYS,
+    MEMORY_RELEVANT_TURNS,
+    MEMORY_RELEVANT_TOKENS,
+    MEMORY_RELEVANT_SIMILARITY,
+    MEMORY_HINT_TOKENS,
+)
+
+SUMMARY_CACHE_ENTRIES = 5000
+# Per-message share of the extractive summary
+SUMMARY_LINE_TOKENS = {"user": 40, "assistant": 60}
+# Turn embeddings kept in memory (keyed by content hash) and the text embedded per turn
+TURN_VECTOR_CACHE = 2048
+EMBEDDED_CHARS = 1500
+
+_MARKDOWN = re.compile(r"^[#>\-\*\s]+|[*_`]+")
+
+
+@dataclass
+class ConversationMemory:
+    recent: str = ""
+    summary: str = ""
+    relevant: List[str] = field(default_factory=list)
+    hint: str = ""
+    stats: Dict = field(default_factory=dict)
+
+    def render(self) -> str:
+        """Prompt block; plain 'ROLE: content' lines when nothing was summarized."""
+        if not self.summary and not self.relevant:
+            return self.recent
+        sections = []
+        if self.summary:
+            sections.append(f"Summary of earlier conversation:\n{self.summary}")
+        if self.relevant:
+            sections.append("Relevant earlier exchanges:\n" + "\n\n".join(self.relevant))
+        if self.recent:
+            sections.append(f"Most recent messages:\n{self.recent}")
+        return "\n\n".join(sections)
+
+
+def _first_sentences(text: str, max_tokens: int) -> str:
+    # Headings carry no sentence terminator and would run into the first sentence
+    lines = [_MARKDOWN.sub("", line).strip() for line in (text or "").splitlines()
+             if not line.lstrip().startswith("#")]
+    plain = " ".join(line for line in lines if line)
+    sentences = split_sentences(plain)
+    return truncate_to_tokens(" ".join(sentences[:2]), max_tokens) if sentences else ""
+
+
+def _turns(messages: Sequence[ChatMessage]) -> List[str]:
+    """Group messages into exchanges: a user message plus the replies that follow it."""
+    turns: List[List[ChatMessage]] = []
+    for message in messages:
+        if message.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return ["\n".join(f"{m.role.upper()}: {m.content}" for m in turn) for turn in turns]
 
 
 class MemoryManager:
     """
-    Manages conversation context without LLM calls
-    Uses sliding window approach for efficiency
+    Builds the per-request conversation memory. Summaries live in a SQLiteCache
+    keyed by a hash chain over the summarized messages, so any worker can pick
+    up where the previous request of the same conversation stopped.
     """
 
     def __init__(self, max_turns: int = 10):
         self.max_turns = max_turns
+        self._summaries = SQLiteCache(
+            "conversation_summaries",
+            max_entries=SUMMARY_CACHE_ENTRIES,
+            default_ttl=MEMORY_SUMMARY_TTL_DAYS * 86400,
+        )
+        self._vectors: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refining = set()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mars-memory")
 
     def add_interaction(
         self,
@@ -25,13 +118,184 @@ class MemoryManager:
 
         return state
 
-    def get_recent_context(self, state: MARSState, num_turns: int = 3) -> str:
-        recent = state.chat_history[-(num_turns * 2):]
-        return "\n".join(
-            f"{msg.role.upper()}: {msg.content}"
-            for msg in recent
-        )
-
     def clear_history(self, state: MARSState) -> MARSState:
         state.chat_history = []
         return state
+
+    # ---------- building ----------
+
+    def build(self, state: MARSState) -> ConversationMemory:
+        messages = list(state.chat_history)
+        if not messages:
+            return ConversationMemory()
+
+        split = self._recent_split(messages, PROMPT_TOKEN_BUDGETS["history"])
+        older, recent = messages[:split], messages[split:]
+        memory = ConversationMemory(recent=pack_history(recent, PROMPT_TOKEN_BUDGETS["history"]))
+
+        previous_question = next((m.content for m in reversed(messages) if m.role == "user"), "")
+        memory.hint = truncate_to_tokens(previous_question, MEMORY_HINT_TOKENS)
+
+        summary_source = None
+        if older:
+            memory.summary, summary_source = self._summary(older)
+            try:
+                memory.relevant = self._relevant(state.user_query, older)
+            except Exception as e:
+                print(f"[Memory] Relevant-turn retrieval failed: {e}")
+
+        memory.stats = {
+            "messages": len(messages),
+            "recent_messages": len(recent),
+            "summarized_messages": len(older),
+            "summary_source": summary_source,
+            "relevant_turns": len(memory.relevant),
+            "history_tokens": sum(count_tokens(f"{m.role}: {m.content}") for m in messages),
+            "memory_tokens": count_tokens(memory.render()),
+        }
+        return memory
+
+    def _recent_split(self, messages: Sequence[ChatMessage], max_tokens: int) -> int:
+        """Index of the oldest message kept verbatim; the newest is always kept."""
+        used = 0
+        for i in range(len(messages) - 1, -1, -1):
+            used += count_tokens(f"{messages[i].role.upper()}: {messages[i].content}")
+            if used > max_tokens:
+                return min(i + 1, len(messages) - 1)
+        return 0
+
+    # ---------- rolling summary ----------
+
+    def _summary(self, older: Sequence[ChatMessage]) -> Tuple[str, str]:
+        """Summary of older; returns (summary, 'cache' | 'extended' | 'extractive')."""
+        chain, digest = [], "memory"
+        for message in older:
+            digest = hash_key(digest, message.role, message.content)
+            chain.append(digest)
+
+        entry = self._summaries.get(chain[-1])
+        if entry is not None:
+            if entry["method"] != "llm":
+                self._refine_async(chain[-1], "", older)
+            return entry["summary"], "cache"
+
+        # Longest summarized prefix of this conversation (usually the previous request's)
+        base, start = "", 0
+        for i in range(len(chain) - 2, -1, -1):
+            entry = self._summaries.get(chain[i])
+            if entry is not None:
+                base, start = entry["summary"], i + 1
+                break
+
+        summary = self._extractive(base, older[start:])
+        self._summaries.set(chain[-1], {"summary": summary, "method": "extractive"})
+        self._refine_async(chain[-1], base, older[start:])
+        return summary, "extended" if start else "extractive"
+
+    def _extractive(self, base: str, messages: Sequence[ChatMessage]) -> str:
+        """Append the opening sentences of each message; the oldest lines drop out first."""
+        lines = base.splitlines() if base else []
+        for message in messages:
+            text = _first_sentences(message.content, SUMMARY_LINE_TOKENS.get(message.role, 60))
+            if text:
+                lines.append(f"- {'User asked' if message.role == 'user' else 'Assistant'}: {text}")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > MEMORY_SUMMARY_TOKENS:
+            lines.pop(0)
+        return truncate_to_tokens("\n".join(lines), MEMORY_SUMMARY_TOKENS)
+
+    def _refine_async(self, key: str, base: str, messages: Sequence[ChatMessage]):
+        """Rewrite the summary with FAST_LLM off the request path (at batch priority)."""
+        if not MEMORY_SUMMARY_LLM or not messages:
+            return
+        with self._lock:
+            if key in self._refining:
+                return
+            self._refining.add(key)
+
+        def run():
+            from api.core.llms import FAST_LLM
+            from api.core.limiter import BATCH, llm_priority
+            try:
+                new_messages = pack_history(messages, MEMORY_SUMMARY_TOKENS * 4)
+                prompt = f"""Update the running summary of a conversation between a student and the MARS assistant.
+
+Current summary:
+{base if base else "(empty)"}
+
+New messages:
+{new_messages}
+
+Write the updated summary as short bullet points: topics covered, facts and definitions the assistant gave, documents or papers referred to, and anything the user said they want. Keep older points that still matter. At most {MEMORY_SUMMARY_TOKENS} tokens. Output only the bullets.
+"""
+                with llm_priority(BATCH):
+                    response = FAST_LLM.invoke(prompt)
+                summary = truncate_to_tokens(response.content.strip(), MEMORY_SUMMARY_TOKENS)
+                if summary:
+                    self._summaries.set(key, {"summary": summary, "method": "llm"})
+            except Exception as e:
+                print(f"[Memory] Summary refinement failed: {e}")
+            finally:
+                with self._lock:
+                    self._refining.discard(key)
+
+        self._writer.submit(run)
+
+    # ---------- relevant earlier turns ----------
+
+    def _turn_vectors(self, turns: Sequence[str]):
+        import numpy as np
+        from api.storage.faiss_store import _get_embeddings
+
+        keys = [hash_key(turn) for turn in turns]
+        with self._lock:
+            missing = [(k, t) for k, t in zip(keys, turns) if k not in self._vectors]
+        if missing:
+            vectors = np.asarray(
+                _get_embeddings().embed_documents([t[:EMBEDDED_CHARS] for _, t in missing]), dtype=np.float32
+            )
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+            with self._lock:
+                for (k, _), vector in zip(missing, vectors):
+                    self._vectors[k] = vector
+                while len(self._vectors) > TURN_VECTOR_CACHE:
+                    self._vectors.popitem(last=False)
+        with self._lock:
+            return np.stack([self._vectors.get(k) for k in keys])
+
+    def _relevant(self, query: str, older: Sequence[ChatMessage]) -> List[str]:
+        if MEMORY_RELEVANT_TURNS <= 0 or not query.strip():
+            return []
+        import numpy as np
+        from api.storage.faiss_store import _get_embeddings
+
+        turns = _turns(older)
+        matrix = self._turn_vectors(turns)
+        vector = np.asarray(_get_embeddings().embed_query(query), dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-8)
+        scores = matrix @ vector
+        best = [i for i in np.argsort(scores)[::-1][:MEMORY_RELEVANT_TURNS]
+                if scores[i] >= MEMORY_RELEVANT_SIMILARITY]
+        if not best:
+            return []
+        # Most similar first for packing, then back in conversation order
+        packed = pack_texts([turns[i] for i in best], MEMORY_RELEVANT_TOKENS,
+                            per_item=MEMORY_RELEVANT_TOKENS // len(best))
+        kept = sorted(best[:len(packed)])
+        by_index = dict(zip(best, packed))
+        return [by_index[i] for i in kept]
+
+
+MEMORY = MemoryManager()
+
+
+def load_memory(state: MARSState) -> Dict:
+    """Fill state.memory_context / state.memory_hint; returns stats for the Planner log."""
+    try:
+        memory = MEMORY.build(state)
+    except Exception as e:
+        # The plain recent window still works without the cache or embeddings
+        print(f"[Memory] Falling back to recent messages: {e}")
+        memory = ConversationMemory(recent=pack_history(state.chat_history, PROMPT_TOKEN_BUDGETS["history"]))
+    state.memory_context = memory.render()
+    state.memory_hint = memory.hint
+    return memory.stats
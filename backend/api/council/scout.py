@@ -1,6 +1,8 @@
 import time
 from api.core.state import MARSState, RetrievedSource, AgentLog
-from api.storage.faiss_store import load_faiss_index
+from api.storage.faiss_store import load_faiss_index, _get_embeddings
+from api.core.tracing import span
+from api.core.metrics import FAISS_LOAD, FAISS_SEARCH
 
 
 class StudentScoutAgent:
@@ -36,16 +38,21 @@ class StudentScoutAgent:
                 return state
 
         try:
-            vectorstore = load_faiss_index(state.namespace)
+            with span("faiss.load", namespace=state.namespace), FAISS_LOAD.time():
+                vectorstore = load_faiss_index(state.namespace)
 
-            if state.intent == "follow_up" and len(state.chat_history) > 0:
-                recent_context = state.chat_history[-1].content[:200]
-                search_query = f"{recent_context} {state.user_query}"
+            if state.intent == "follow_up" and state.memory_hint:
+                # Follow-ups ("and its types?") are searched together with the question they follow
+                search_query = f"{state.memory_hint} {state.user_query}"
             else:
                 search_query = state.user_query
 
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-            docs = retriever.invoke(search_query)
+            with FAISS_SEARCH.time():
+                with span("embed_query", chars=len(search_query)):
+                    query_vector = _get_embeddings().embed_query(search_query)
+                with span("vector_search", k=5) as search_span:
+                    docs = vectorstore.similarity_search_by_vector(query_vector, k=5)
+                    search_span.set(results=len(docs))
 
             state.retrieved_sources = [
                 RetrievedSource(
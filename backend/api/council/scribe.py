@@ -1,9 +1,41 @@
 import time
 from api.core.state import MARSState, AgentLog
 from api.core.llms import SCRIBE_LLM, RESEARCH_LLM
+from api.core.deadline import StageTimeout, invoke_llm
+from api.core.limiter import Overloaded
+from api.core.config import PROMPT_TOKEN_BUDGETS
+from api.utils.context import pack_texts, remaining_budget, truncate_to_tokens
 
 
 class ScribeAgent:
+    def _degraded_answer(self, state: MARSState) -> str:
+        """Answer built from the sources gathered so far when synthesis overruns the budget"""
+        if state.mode == "research":
+            answer = (
+                "⏱️ **Synthesis timed out.** Here are the sources gathered so far:\n\n"
+            )
+            for i, paper in enumerate(state.papers_metadata or [], 1):
+                title = paper.get('title', 'Untitled')
+                url = paper.get('url', '')
+                answer += f"**[{i}]** [{title}]({url})\n\n" if url else f"**[{i}]** {title}\n\n"
+                if paper.get('summary'):
+                    answer += f"> {paper['summary'][:300]}\n\n"
+            return answer
+        return (
+            "⏱️ **Answer generation timed out.** The most relevant passages from your document:\n\n"
+            f"{truncate_to_tokens(state.refined_context, 500)}"
+        )
+
+    def _log_timeout(self, state: MARSState, start: float, error: StageTimeout):
+        elapsed = int((time.time() - start) * 1000)
+        state.agent_logs.append(AgentLog(
+            agent="Scribe", icon="edit", status="degraded",
+            duration_ms=elapsed,
+            thinking=f"{error} — answering with the sources gathered so far",
+            output_preview=f"Degraded answer: {len(state.draft_answer)} chars ({elapsed}ms)",
+            details={"timeout_s": error.timeout, "mode": state.mode}
+        ))
+
     def run(self, state: MARSState) -> MARSState:
         """Generates final answer with inline citations and references"""
         start = time.time()
@@ -71,30 +103,13 @@ class ScribeAgent:
             return state
 
         # ===== BUILD CONVERSATION CONTEXT =====
-        conversation_context = ""
-        if len(state.chat_history) > 0:
-            conversation_context = "\n".join(
-                f"{m.role.upper()}: {m.content}"
-                for m in state.chat_history[-6:]
-            )
+        # Recent turns, rolling summary and relevant earlier turns, built by the Planner
+        conversation_context = state.memory_context
 
         # ===== RESEARCH MODE (Task 3: Improved alignment) =====
         if state.mode == "research":
-            source_references = ""
-            source_labels = []
-            for i, src in enumerate(state.retrieved_sources, 1):
-                source_type = "Source"
-                if hasattr(src, 'source'):
-                    if src.source == "arxiv":
-                        source_type = "arXiv Paper"
-                    elif src.source == "google_scholar":
-                        source_type = "Scholar Paper"
-                    elif src.source == "web":
-                        source_type = "Web Source"
-                source_references += f"\n[{i}] ({source_type}) {src.content[:2000]}...\n"
-                source_labels.append(source_type)
-
-            prompt = f"""You are MARS Research Assistant. Your task is to provide a focused, well-structured research analysis.
+            def build_prompt(source_references: str) -> str:
+                return f"""You are MARS Research Assistant. Your task is to provide a focused, well-structured research analysis.
 
 CRITICAL RULES:
 - Focus STRICTLY on what the user asked. Do NOT provide general background unless explicitly asked.
@@ -145,8 +160,41 @@ Use bullet points for lists, numbered steps for processes, and **bold** for key
 
 Do NOT add a References section — it is automatically appended."""
 
+            # Sources are packed in retrieval order: each capped per item, all within what the
+            # instructions and history leave of the research prompt budget
+            source_budget = remaining_budget(PROMPT_TOKEN_BUDGETS["scribe_research"], build_prompt(""))
+            contents = pack_texts(
+                [src.content for src in state.retrieved_sources],
+                max(source_budget - 12 * len(state.retrieved_sources), 0),
+                per_item=PROMPT_TOKEN_BUDGETS["research_source_deep" if state.deep_research else "research_source"],
+            )
+
+            # Sources that did not fit are left out of the References too, so every
+            # citation number points at text the model actually saw
+            sources_omitted = len(state.retrieved_sources) - len(contents)
+            if sources_omitted > 0:
+                state.retrieved_sources = state.retrieved_sources[:len(contents)]
+                if state.papers_metadata:
+                    state.papers_metadata = state.papers_metadata[:len(contents)]
+
+            source_references = ""
+            source_labels = []
+            for i, (src, content) in enumerate(zip(state.retrieved_sources, contents), 1):
+                source_type = "Source"
+                if hasattr(src, 'source'):
+                    if src.source == "arxiv":
+                        source_type = "arXiv Paper"
+                    elif src.source == "google_scholar":
+                        source_type = "Scholar Paper"
+                    elif src.source == "web":
+                        source_type = "Web Source"
+                source_references += f"\n[{i}] ({source_type}) {content}\n"
+                source_labels.append(source_type)
+
+            prompt = build_prompt(source_references)
+
             try:
-                response = RESEARCH_LLM.invoke(prompt)
+                response = invoke_llm(RESEARCH_LLM, prompt, state, "scribe")
                 answer = response.content
 
                 if state.papers_metadata or state.retrieved_sources:
@@ -198,10 +246,19 @@ Do NOT add a References section — it is automatically appended."""
                     details={
                         "answer_length": len(answer),
                         "papers_cited": len(state.papers_metadata or []),
+                        "sources_omitted": max(sources_omitted, 0),
                         "mode": "research"
                     }
                 ))
 
+            except StageTimeout as e:
+                state.draft_answer = self._degraded_answer(state)
+                self._log_timeout(state, start, e)
+
+            except Overloaded:
+                # No answer is possible — let the view reply 503 with Retry-After
+                raise
+
             except Exception as e:
                 elapsed = int((time.time() - start) * 1000)
                 print(f"[Scribe Error] {e}")
@@ -217,7 +274,8 @@ Do NOT add a References section — it is automatically appended."""
             return state
 
         # ===== STUDENT MODE (Task 4: Anti-hallucination, structured output) =====
-        prompt = f"""You are an expert University Professor answering a student's question STRICTLY from the provided textbook material.
+        def build_prompt(textbook_content: str) -> str:
+            return f"""You are an expert University Professor answering a student's question STRICTLY from the provided textbook material.
 
 CRITICAL RULES (MUST FOLLOW):
 1. Answer ONLY based on the provided textbook content. NEVER add external knowledge.
@@ -237,7 +295,7 @@ FORMATTING RULES (MUST FOLLOW):
 {("Recent Conversation:" + chr(10) + conversation_context) if conversation_context else ""}
 
 Textbook Content (with page numbers):
-{state.refined_context}
+{textbook_content}
 
 Student Question:
 {state.user_query}
@@ -281,8 +339,11 @@ Concrete examples from the text. If the text provides examples, use those. If no
 
 (3-5 bullet points, each starting with a bold keyword)"""
 
+        textbook_budget = remaining_budget(PROMPT_TOKEN_BUDGETS["scribe"], build_prompt(""))
+        prompt = build_prompt(truncate_to_tokens(state.refined_context, textbook_budget))
+
         try:
-            response = SCRIBE_LLM.invoke(prompt)
+            response = invoke_llm(SCRIBE_LLM, prompt, state, "scribe")
             state.draft_answer = response.content
 
             elapsed = int((time.time() - start) * 1000)
@@ -297,6 +358,11 @@ Concrete examples from the text. If the text provides examples, use those. If no
                     "mode": "student"
                 }
             ))
+        except StageTimeout as e:
+            state.draft_answer = self._degraded_answer(state)
+            self._log_timeout(state, start, e)
+        except Overloaded:
+            raise
         except Exception as e:
             elapsed = int((time.time() - start) * 1000)
             print(f"[Scribe Error] {e}")
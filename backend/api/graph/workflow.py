@@ -4,13 +4,24 @@ from api.core.state import MARSState, MARSStateDict
 from api.council.planner import PlannerAgent
 from api.council.scout import StudentScoutAgent
 from api.research.scout import ResearchScoutAgent
-from api.council.analyst import AnalystAgent
+from api.council.analyst import AnalystAgent, fits_fast_path
+from api.core.deadline import is_nearly_spent
+from api.core.tracing import span
 from api.council.scribe import ScribeAgent
 from api.council.critic import CriticAgent
 
 
 from api.research.oracle import OracleAgent
 
+
+def _node(name, run):
+    """Wraps an agent's run() as a graph node, with a trace span per execution"""
+    def node(state):
+        with span(f"agent.{name}"):
+            return run(MARSState(**state)).model_dump()
+    return node
+
+
 def build_graph():
     """
     Build the LangGraph workflow for MARS
@@ -25,15 +36,16 @@ def build_graph():
     critic = CriticAgent()
 
     workflow = StateGraph(MARSStateDict)
-    # Using lambda wrappers to handle conversions between TypedDict and Pydantic MARSState
+    # Node wrappers handle conversions between TypedDict and Pydantic MARSState
     # This prevents InvalidUpdateError by ensuring nodes return plain dicts.
-    workflow.add_node("planner", lambda state: planner.run(MARSState(**state)).model_dump())
-    workflow.add_node("student_scout", lambda state: student_scout.run(MARSState(**state)).model_dump())
-    workflow.add_node("research_scout", lambda state: research_scout.run(MARSState(**state)).model_dump())
-    workflow.add_node("oracle", lambda state: oracle.run(MARSState(**state)).model_dump())
-    workflow.add_node("analyst", lambda state: analyst.run(MARSState(**state)).model_dump())
-    workflow.add_node("scribe", lambda state: scribe.run(MARSState(**state)).model_dump())
-    workflow.add_node("critic", lambda state: critic.run(MARSState(**state)).model_dump())
+    workflow.add_node("planner", _node("planner", planner.run))
+    workflow.add_node("student_scout", _node("student_scout", student_scout.run))
+    workflow.add_node("research_scout", _node("research_scout", research_scout.run))
+    workflow.add_node("oracle", _node("oracle", oracle.run))
+    workflow.add_node("analyst", _node("analyst", analyst.run))
+    workflow.add_node("analyst_fast", _node("analyst_fast", analyst.fast_path))
+    workflow.add_node("scribe", _node("scribe", scribe.run))
+    workflow.add_node("critic", _node("critic", critic.run))
 
     workflow.set_entry_point("planner")
 
@@ -50,6 +62,12 @@ def build_graph():
             return "student_scout"
 
     def route_after_scout(state: MARSStateDict) -> str:
+        # Small contexts (or a nearly spent latency budget) skip the Analyst LLM call
+        current = MARSState(**state)
+        if current.retrieved_sources and is_nearly_spent(current):
+            return "analyst_fast"
+        if fits_fast_path(current.retrieved_sources):
+            return "analyst_fast"
         return "analyst"
 
     def route_after_oracle(state: MARSStateDict) -> str:
@@ -81,13 +99,13 @@ def build_graph():
     workflow.add_conditional_edges(
         "student_scout",
         route_after_scout,
-        {"analyst": "analyst"}
+        {"analyst": "analyst", "analyst_fast": "analyst_fast"}
     )
 
     workflow.add_conditional_edges(
         "research_scout",
         route_after_scout,
-        {"analyst": "analyst"}
+        {"analyst": "analyst", "analyst_fast": "analyst_fast"}
     )
 
     workflow.add_conditional_edges(
@@ -105,6 +123,8 @@ def build_graph():
         }
     )
 
+    workflow.add_edge("analyst_fast", "scribe")
+
     workflow.add_edge("critic", END)
 
     return workflow.compile()
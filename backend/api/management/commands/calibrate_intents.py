@@ -0,0 +1,74 @@
+"""
+Measure the Planner intent classifier against held-out queries and suggest
+INTENT_MIN_CONFIDENCE / INTENT_MIN_MARGIN for the configured embedding model.
+
+    python manage.py calibrate_intents [--holdout path/to/queries.json]
+
+The holdout file maps each intent to queries that are not in
+intent_examples.json, plus "none" for queries the classifier should not be
+confident about (complaints, formatting requests, noise); those must fall
+through to the keyword rules.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.core.config import INTENT_MIN_CONFIDENCE, INTENT_MIN_MARGIN
+from api.council.intent import INTENT_CLASSIFIER
+from api.storage.faiss_store import EMBED_MODEL
+
+DEFAULT_HOLDOUT = Path(__file__).resolve().parents[2] / "council" / "intent_holdout.json"
+
+
+class Command(BaseCommand):
+    help = "Score held-out queries against the intent centroids and suggest confidence / margin thresholds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--holdout", default=str(DEFAULT_HOLDOUT), help="JSON file of held-out queries per intent")
+
+    def handle(self, *args, **options):
+        with open(options["holdout"], encoding="utf-8") as f:
+            holdout = json.load(f)
+
+        rows = []  # (expected, predicted, confidence, margin)
+        for expected, queries in holdout.items():
+            for query in queries:
+                p = INTENT_CLASSIFIER.classify(query)
+                rows.append((expected, p.label, p.confidence, p.margin))
+
+        self.stdout.write(f"Model: {EMBED_MODEL}")
+        self.stdout.write(f"Current thresholds: confidence {INTENT_MIN_CONFIDENCE}, margin {INTENT_MIN_MARGIN}\n")
+        self.stdout.write(f"{'intent':<16}{'correct':>8}{'conf min':>10}{'conf p50':>10}{'margin min':>12}")
+        correct_conf, correct_margin = [], []
+        for intent in holdout:
+            if intent == "none":
+                continue
+            mine = [r for r in rows if r[0] == intent]
+            hits = [r for r in mine if r[1] == intent]
+            correct_conf += [r[2] for r in hits]
+            correct_margin += [r[3] for r in hits]
+            conf = [r[2] for r in hits] or [0.0]
+            self.stdout.write(
+                f"{intent:<16}{len(hits):>5}/{len(mine):<2}{min(conf):>10.3f}{float(np.median(conf)):>10.3f}"
+                f"{min([r[3] for r in hits] or [0.0]):>12.3f}"
+            )
+
+        none = [r for r in rows if r[0] == "none"]
+        for expected, label, conf, margin in none:
+            self.stdout.write(f"none → {label:<16} confidence {conf:.3f}  margin {margin:.3f}")
+
+        # Lowest thresholds that keep every "none" query below at least one of them,
+        # while letting most correctly classified held-out queries through
+        confidence = round(max([r[2] for r in none] or [0.0]) + 0.01, 2)
+        margin = round(float(np.percentile(correct_margin, 10)) if correct_margin else INTENT_MIN_MARGIN, 2)
+        wrong = [r for r in rows if r[0] != "none" and r[1] != r[0]]
+        passed = sum(c >= confidence and m >= margin for c, m in zip(correct_conf, correct_margin))
+        leaked = sum(r[2] >= confidence and r[3] >= margin for r in none + wrong)
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Suggested INTENT_MIN_CONFIDENCE={confidence} INTENT_MIN_MARGIN={margin}: "
+            f"{passed}/{len(correct_conf)} correct held-out queries classified, "
+            f"{leaked} wrong or 'none' queries still confident"
+        ))
@@ -0,0 +1,71 @@
+"""
+Pre-compute Exam Oracle predictions for popular subject codes.
+Meant for a cron job in off-peak hours, e.g.
+
+    0 3 * * 1  python manage.py prewarm_oracle CS3491 CS3401 --regulation R2021
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.cache import oracle as oracle_cache
+from api.core.config import ORACLE_PREWARM_SUBJECTS
+from api.core.limiter import BATCH, llm_priority
+from api.core.state import MARSState
+from api.research.oracle import OracleAgent, parse_subject
+from api.research.question_bank import find_subject_code
+
+
+class Command(BaseCommand):
+    help = "Pre-warm the Exam Oracle cache for a list of subject codes (default: ORACLE_PREWARM_SUBJECTS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("subjects", nargs="*", help="Subject codes, e.g. CS3491 MA3354")
+        parser.add_argument("--regulation", default=None, help="Regulation to predict for, e.g. R2021")
+        parser.add_argument("--force", action="store_true", help="Recompute even when a cached prediction exists")
+        parser.add_argument("--delay", type=float, default=2.0, help="Seconds to wait between subjects")
+
+    def handle(self, *args, **options):
+        subjects = options["subjects"] or ORACLE_PREWARM_SUBJECTS
+        if not subjects:
+            self.stderr.write("No subject codes given and ORACLE_PREWARM_SUBJECTS is empty.")
+            return
+
+        agent = OracleAgent()
+        warmed = skipped = failed = 0
+        for i, raw in enumerate(subjects):
+            if not find_subject_code(raw):
+                self.stderr.write(f"[Oracle] {raw!r}: not a subject code, skipping")
+                failed += 1
+                continue
+            subject_code, regulation = parse_subject(raw)
+            regulation = options["regulation"] or regulation
+
+            if not options["force"] and oracle_cache.lookup(subject_code, regulation) is not None:
+                self.stdout.write(f"[Oracle] {subject_code}: cached, skipping")
+                skipped += 1
+                continue
+
+            start = time.time()
+            try:
+                with llm_priority(BATCH):
+                    prediction, result_count, complete = agent.predict(
+                        subject_code, regulation, MARSState(user_query=raw, mode="student")
+                    )
+            except Exception as e:
+                self.stderr.write(f"[Oracle] {subject_code}: failed — {e}")
+                failed += 1
+                continue
+
+            if not complete:
+                self.stderr.write(f"[Oracle] {subject_code}: a search failed, prediction not cached")
+                failed += 1
+            else:
+                oracle_cache.store(subject_code, regulation, {"prediction": prediction, "search_results": result_count})
+                self.stdout.write(f"[Oracle] {subject_code}: warmed from {result_count} results ({time.time() - start:.1f}s)")
+                warmed += 1
+
+            if i < len(subjects) - 1 and options["delay"] > 0:
+                time.sleep(options["delay"])
+
+        self.stdout.write(self.style.SUCCESS(f"Oracle prewarm done: {warmed} warmed, {skipped} cached, {failed} failed"))
@@ -0,0 +1,62 @@
+# Generated by Django 4.2 on 2026-10-19 09:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_faissdocument_file_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_code', models.CharField(db_index=True, max_length=16)),
+                ('regulation', models.CharField(blank=True, default='', max_length=16)),
+                ('session', models.CharField(blank=True, default='', max_length=32)),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('file_hash', models.CharField(max_length=64, unique=True)),
+                ('question_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-year', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_code', models.CharField(db_index=True, max_length=16)),
+                ('part', models.CharField(max_length=1)),
+                ('text', models.TextField()),
+                ('marks', models.IntegerField(blank=True, null=True)),
+                ('frequency', models.IntegerField(default=0)),
+                ('years', models.JSONField(default=list)),
+                ('sessions', models.JSONField(default=list)),
+                ('regulations', models.JSONField(default=list)),
+                ('last_year', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-frequency', '-last_year'],
+                'indexes': [models.Index(fields=['subject_code', 'part'], name='api_cluster_subject_part_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExamQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part', models.CharField(max_length=1)),
+                ('number', models.CharField(blank=True, max_length=8)),
+                ('marks', models.IntegerField(blank=True, null=True)),
+                ('text', models.TextField()),
+                ('paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='api.questionpaper')),
+            ],
+        ),
+    ]
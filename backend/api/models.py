@@ -30,3 +30,55 @@ class FAISSDocument(models.Model):
     @property
     def is_expired(self):
         return timezone.now() > self.expires_at
+
+
+class QuestionPaper(models.Model):
+    """A past exam question paper uploaded for the offline Exam Oracle."""
+    subject_code = models.CharField(max_length=16, db_index=True)
+    regulation = models.CharField(max_length=16, blank=True, default="")
+    session = models.CharField(max_length=32, blank=True, default="")    # e.g. "Nov/Dec 2022"
+    year = models.IntegerField(null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    # The same PDF uploaded twice must not count its questions twice
+    file_hash = models.CharField(max_length=64, unique=True)
+    question_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-year', '-created_at']
+
+    def __str__(self):
+        return f"{self.subject_code} {self.session or self.year or ''} ({self.question_count} questions)"
+
+
+class ExamQuestion(models.Model):
+    """One question extracted from a QuestionPaper."""
+    paper = models.ForeignKey(QuestionPaper, on_delete=models.CASCADE, related_name="questions")
+    part = models.CharField(max_length=1)                  # A, B or C
+    number = models.CharField(max_length=8, blank=True)    # e.g. "11(a)"
+    marks = models.IntegerField(null=True, blank=True)
+    text = models.TextField()
+
+    def __str__(self):
+        return f"{self.paper.subject_code} Part {self.part} Q{self.number}"
+
+
+class QuestionCluster(models.Model):
+    """Near-duplicate questions of one subject, precomputed for instant predictions."""
+    subject_code = models.CharField(max_length=16, db_index=True)
+    part = models.CharField(max_length=1)
+    text = models.TextField()                             # representative wording
+    marks = models.IntegerField(null=True, blank=True)
+    frequency = models.IntegerField(default=0)            # distinct papers it appeared in
+    years = models.JSONField(default=list)
+    sessions = models.JSONField(default=list)
+    regulations = models.JSONField(default=list)
+    last_year = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-frequency', '-last_year']
+        indexes = [models.Index(fields=['subject_code', 'part'], name='api_cluster_subject_part_idx')]
+
+    def __str__(self):
+        return f"{self.subject_code} Part {self.part} ×{self.frequency}: {self.text[:60]}"
@@ -1,7 +1,9 @@
 from typing import List
 from langchain_core.documents import Document
+from api.cache.sources import cached_search
 
 
+@cached_search("arxiv", max_arg="max_docs")
 def load_research_papers(query: str, max_docs: int = 5) -> List[Document]:
     """
     Load research papers from arXiv with comprehensive metadata.
@@ -0,0 +1,207 @@
+"""
+Shared full-text corpus of arXiv papers for deep research.
+PDFs are downloaded concurrently, parsed and chunked by the same path as
+uploaded documents (faiss_store.split_pdf / build_vectorstore), and merged
+into one persistent FAISS index keyed by arXiv id. A paper is downloaded at
+most once; later queries retrieve its passages straight from the index.
+The corpus lives outside FAISS_INDEX_DIR so the upload cleanup never expires it.
+"""
+import os
+import json
+import time
+import fcntl
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from langchain_core.documents import Document
+
+from api.core.http import SHARED_HTTP_CLIENT
+from api.research.dedup import arxiv_id_of
+from api.core.config import RESEARCH_CORPUS_MAX_PDF_MB, RESEARCH_CORPUS_DOWNLOAD_TIMEOUT_S
+
+CORPUS_DIR = Path(settings.MEDIA_ROOT) / "research_corpus"
+
+
+class ResearchCorpus:
+    def __init__(self, root: Path = CORPUS_DIR):
+        self.root = root
+        self.index_dir = root / "index"
+        self.manifest_path = root / "manifest.json"
+        self._lock = threading.Lock()
+        self._store = None
+        self._store_mtime = 0.0
+        self._inflight: Dict[str, object] = {}
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mars-arxiv-pdf")
+
+    # ── Manifest & index ────────────────────────────
+
+    def manifest(self) -> Dict[str, dict]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _file_lock(self):
+        """Exclusive lock across worker processes for index writes."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        handle = open(self.root / ".lock", "w")
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _load_store(self):
+        """The on-disk index, reloaded when another process has written a newer one."""
+        from api.storage.faiss_store import FAISS, _get_embeddings
+
+        try:
+            mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._store is None or mtime > self._store_mtime:
+                self._store = FAISS.load_local(str(self.index_dir), _get_embeddings(), allow_dangerous_deserialization=True)
+                self._store_mtime = mtime
+            return self._store
+
+    def _add(self, arxiv_id: str, chunks: List[Document], info: dict):
+        from api.storage.faiss_store import FAISS, _get_embeddings, build_vectorstore
+
+        new_store = build_vectorstore(chunks)   # embed outside the lock
+        handle = self._file_lock()
+        try:
+            manifest = self.manifest()
+            if arxiv_id in manifest:
+                return
+            if self.index_dir.exists():
+                store = FAISS.load_local(str(self.index_dir), _get_embeddings(), allow_dangerous_deserialization=True)
+                store.merge_from(new_store)
+            else:
+                store = new_store
+
+            # Write the new index beside the old one, then swap directories
+            tmp_dir = Path(tempfile.mkdtemp(dir=self.root, prefix="index-"))
+            store.save_local(str(tmp_dir))
+            old_dir = self.root / "index.old"
+            if self.index_dir.exists():
+                os.replace(self.index_dir, old_dir)
+            os.replace(tmp_dir, self.index_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+            manifest[arxiv_id] = {**info, "chunks": len(chunks), "added_at": int(time.time())}
+            tmp_manifest = self.manifest_path.with_suffix(".tmp")
+            with open(tmp_manifest, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_manifest, self.manifest_path)
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    # ── Ingest ──────────────────────────────────────
+
+    def _download(self, pdf_url: str) -> str:
+        """Stream the PDF to a temp file, refusing anything over the size cap."""
+        max_bytes = RESEARCH_CORPUS_MAX_PDF_MB * 1024 * 1024
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f, SHARED_HTTP_CLIENT.stream(
+                "GET", pdf_url, follow_redirects=True, timeout=RESEARCH_CORPUS_DOWNLOAD_TIMEOUT_S
+            ) as response:
+                response.raise_for_status()
+                size = 0
+                for block in response.iter_bytes(64 * 1024):
+                    size += len(block)
+                    if size > max_bytes:
+                        raise ValueError(f"PDF larger than {RESEARCH_CORPUS_MAX_PDF_MB} MB")
+                    f.write(block)
+            return path
+        except Exception:
+            os.unlink(path)
+            raise
+
+    def _ingest_one(self, arxiv_id: str, paper: Document):
+        from api.storage.faiss_store import split_pdf
+
+        start = time.time()
+        pdf_url = paper.metadata.get("pdf_url") or f"https://arxiv.org/pdf/{arxiv_id}"
+        try:
+            path = self._download(pdf_url)
+            try:
+                pages, chunks, _ = split_pdf(path)
+            finally:
+                os.unlink(path)
+            info = {
+                "title": paper.metadata.get("title", ""),
+                "url": paper.metadata.get("url", ""),
+                "pdf_url": pdf_url,
+                "pages": len(pages),
+            }
+            for chunk in chunks:
+                chunk.metadata = {
+                    "arxiv_id": arxiv_id,
+                    "title": info["title"],
+                    "url": info["url"],
+                    "page": chunk.metadata.get("page"),
+                    "source": "arxiv_fulltext",
+                }
+            self._add(arxiv_id, chunks, info)
+            print(f"[Corpus] Added arXiv {arxiv_id}: {len(pages)} pages, {len(chunks)} chunks ({time.time() - start:.1f}s)")
+        finally:
+            with self._lock:
+                self._inflight.pop(arxiv_id, None)
+
+    def ensure(self, papers: Sequence[Document], timeout: float) -> dict:
+        """
+        Make sure the papers' full text is in the corpus, waiting up to timeout
+        seconds for downloads. Downloads that overrun keep going in the
+        background and are available to later queries.
+        Returns {"cached": [...], "added": [...], "pending": [...], "failed": [...]} of arXiv ids.
+        """
+        manifest = self.manifest()
+        report = {"cached": [], "added": [], "pending": [], "failed": []}
+        futures = {}
+        for paper in papers:
+            arxiv_id = arxiv_id_of(paper)
+            if not arxiv_id or arxiv_id in futures:
+                continue
+            if arxiv_id in manifest:
+                report["cached"].append(arxiv_id)
+                continue
+            with self._lock:
+                future = self._inflight.get(arxiv_id)
+                if future is None:
+                    future = self._pool.submit(self._ingest_one, arxiv_id, paper)
+                    self._inflight[arxiv_id] = future
+            futures[arxiv_id] = future
+
+        if futures:
+            wait(futures.values(), timeout=max(timeout, 0))
+        for arxiv_id, future in futures.items():
+            if not future.done():
+                report["pending"].append(arxiv_id)
+            elif future.exception() is not None:
+                print(f"[Corpus] arXiv {arxiv_id} not ingested: {future.exception()}")
+                report["failed"].append(arxiv_id)
+            else:
+                report["added"].append(arxiv_id)
+        return report
+
+    # ── Retrieval ───────────────────────────────────
+
+    def search(self, query: str, k: int, arxiv_ids: Optional[Sequence[str]] = None) -> List[Document]:
+        """Most similar full-text chunks, optionally restricted to some papers."""
+        store = self._load_store()
+        if store is None:
+            return []
+        if arxiv_ids is not None:
+            if not arxiv_ids:
+                return []
+            return store.similarity_search(query, k=k, filter={"arxiv_id": list(arxiv_ids)}, fetch_k=max(k * 20, 100))
+        return store.similarity_search(query, k=k)
+
+
+RESEARCH_CORPUS = ResearchCorpus()
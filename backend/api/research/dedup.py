@@ -0,0 +1,153 @@
+"""
+Cross-source paper deduplication for Research Mode.
+The same paper often comes back from arXiv, Google Scholar and the web. Two
+documents are the same paper when they share an arXiv id or DOI, have the
+same normalized title, or their titles' MinHash signatures estimate a
+Jaccard similarity above TITLE_SIMILARITY. Duplicates are merged into one
+document that keeps the richest content and the union of useful metadata.
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from api.core.config import DEDUP_TITLE_SIMILARITY as TITLE_SIMILARITY
+
+NUM_PERM = 64
+_PRIME = (1 << 61) - 1
+# Fixed (a, b) pairs so signatures are stable across processes
+_PERMUTATIONS = [
+    (1 + (zlib.crc32(f"a{i}".encode()) * 2654435761) % (_PRIME - 1), zlib.crc32(f"b{i}".encode()))
+    for i in range(NUM_PERM)
+]
+
+# Which copy supplies the content when merging: arXiv abstracts beat Scholar snippets beat web pages
+SOURCE_PRIORITY = {"arxiv": 0, "google_scholar": 1, "web": 2}
+# Metadata worth carrying over from the other copies
+MERGE_FIELDS = ("pdf_url", "arxiv_id", "venue", "publisher", "Published", "Summary", "year", "authors")
+
+_ARXIV_ID = re.compile(r"arxiv\.org/(?:abs|pdf)/([0-9]{4}\.[0-9]{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/[0-9]{7})", re.I)
+_DOI = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>]+)", re.I)
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).split())
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature over character 3-gram shingles."""
+    shingles = {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+    hashes = [zlib.crc32(s.encode()) for s in shingles]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def arxiv_id_of(doc: Document) -> Optional[str]:
+    """Version-less arXiv id from metadata or an arxiv.org URL, if any."""
+    arxiv_id = doc.metadata.get("arxiv_id")
+    if not arxiv_id:
+        match = _ARXIV_ID.search(doc.metadata.get("url", "") or "") or _ARXIV_ID.search(doc.metadata.get("pdf_url", "") or "")
+        arxiv_id = match.group(1) if match else None
+    # Version suffixes (v1, v2 …) refer to the same paper
+    return re.sub(r"v\d+$", "", arxiv_id.lower()) if arxiv_id else None
+
+
+def _doi(doc: Document) -> Optional[str]:
+    # Page text is not searched: web pages and abstracts often cite other papers' DOIs
+    for text in (doc.metadata.get("doi", ""), doc.metadata.get("url", "")):
+        match = _DOI.search(text or "")
+        if match:
+            return match.group(1).rstrip(".,;)").lower()
+    return None
+
+
+def paper_key(doc: Document) -> Optional[str]:
+    """Stable identity for a paper: arXiv id, DOI, normalized title or URL, in that order."""
+    arxiv_id = arxiv_id_of(doc)
+    if arxiv_id:
+        return f"arxiv:{arxiv_id}"
+    doi = _doi(doc)
+    if doi:
+        return f"doi:{doi}"
+    title = normalize_title(doc.metadata.get("title", ""))
+    if len(title) > 10:
+        return f"title:{title}"
+    url = doc.metadata.get("url")
+    return f"url:{url}" if url else None
+
+
+def _citations(doc: Document) -> int:
+    try:
+        return int(doc.metadata.get("citations") or doc.metadata.get("cited_by") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _merge(group: List[Document]) -> Document:
+    group = sorted(group, key=lambda d: SOURCE_PRIORITY.get(d.metadata.get("source"), 99))
+    primary = group[0]
+    metadata = dict(primary.metadata)
+    content = primary.page_content
+    for other in group[1:]:
+        for field in MERGE_FIELDS:
+            if not metadata.get(field) and other.metadata.get(field):
+                metadata[field] = other.metadata[field]
+        if not metadata.get("url") and other.metadata.get("url"):
+            metadata["url"] = other.metadata["url"]
+    # Scholar carries the citation count even when arXiv supplies the content
+    # (scholarly reports it as "citations", SerpAPI as "cited_by")
+    citations = max(_citations(d) for d in group)
+    if citations:
+        metadata["citations"] = citations
+    metadata["merged_sources"] = list(dict.fromkeys(d.metadata.get("source", "unknown") for d in group))
+    return Document(page_content=content, metadata=metadata)
+
+
+def dedupe_documents(documents: List[Document]) -> Tuple[List[Document], int]:
+    """
+    Merge documents that describe the same paper. Returns (documents, duplicates
+    merged); order follows each paper's first appearance.
+    """
+    parent = list(range(len(documents)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(j)] = find(i)
+
+    keys: Dict[str, int] = {}
+    titles: List[Tuple[int, str, Tuple[int, ...]]] = []
+    for i, doc in enumerate(documents):
+        title = normalize_title(doc.metadata.get("title", ""))
+        arxiv_id, doi = arxiv_id_of(doc), _doi(doc)
+        for key in (f"arxiv:{arxiv_id}" if arxiv_id else None,
+                    f"doi:{doi}" if doi else None,
+                    f"title:{title}" if len(title) > 10 else None):
+            if key is None:
+                continue
+            if key in keys:
+                union(keys[key], i)
+            else:
+                keys[key] = i
+        if len(title) > 10:
+            signature = minhash(title)
+            for j, _, other in titles:
+                if find(i) != find(j) and similarity(signature, other) >= TITLE_SIMILARITY:
+                    union(j, i)
+            titles.append((i, title, signature))
+
+    # Dicts keep insertion order, so groups come out in first-appearance order
+    groups: Dict[int, List[Document]] = {}
+    for i, doc in enumerate(documents):
+        groups.setdefault(find(i), []).append(doc)
+    merged = [_merge(group) if len(group) > 1 else group[0] for group in groups.values()]
+    return merged, len(documents) - len(merged)
@@ -0,0 +1,165 @@
+"""
+Local research library: every paper and web document the Research Scout
+retrieves, embedded and kept on disk so later queries can be answered
+without the arXiv / Scholar / Tavily fan-out.
+Documents are stored one row per paper (keyed by dedup.paper_key, so a paper
+seen again replaces its old copy and its age restarts) in a SQLiteCache with
+a TTL and an entry cap; search hits refresh a row's last use, so the cap
+evicts the least recently used rows. Each worker keeps the vectors in memory
+as one matrix and picks up rows written by other workers every
+RESEARCH_LIBRARY_REFRESH_S.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from api.cache.store import SQLiteCache
+from api.research.dedup import paper_key
+from api.utils.context import truncate_to_tokens
+from api.core.config import (
+    RESEARCH_LIBRARY_ENABLED,
+    RESEARCH_LIBRARY_TTL_DAYS,
+    RESEARCH_LIBRARY_MAX_DOCS,
+    RESEARCH_LIBRARY_REFRESH_S,
+    RESEARCH_LIBRARY_SIMILARITY,
+    RESEARCH_LIBRARY_MIN_DOCS,
+)
+
+# Stored content is capped; embedded text is the title plus the part the scout actually used
+STORED_TOKENS = 3000
+EMBEDDED_CHARS = 2000
+# Rows are stamped when written but become visible when committed (SQLite may
+# hold a writer for its 10 s busy timeout), so each sync re-reads this window
+SYNC_OVERLAP_S = 60
+
+
+@dataclass
+class LibraryHit:
+    document: Document
+    similarity: float
+
+
+@lru_cache(maxsize=256)
+def _embed_query(query: str) -> Tuple[float, ...]:
+    from api.storage.faiss_store import _get_embeddings
+    vector = np.asarray(_get_embeddings().embed_query(query), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return tuple(vector / norm) if norm else tuple(vector)
+
+
+class ResearchLibrary:
+    def __init__(self):
+        self._store = SQLiteCache(
+            "research_library",
+            max_entries=RESEARCH_LIBRARY_MAX_DOCS,
+            default_ttl=RESEARCH_LIBRARY_TTL_DAYS * 86400,
+        )
+        self._lock = threading.Lock()
+        self._rows: Dict[str, dict] = {}        # key → {"document", "vector", "expires_at"}
+        self._keys: List[str] = []
+        self._matrix = None
+        self._synced_until = 0.0
+        self._synced_at = 0.0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mars-library")
+
+    def _sync(self, force: bool = False):
+        """Pull rows written since the last sync and drop rows evicted or expired on disk."""
+        now = time.time()
+        if not force and now - self._synced_at < RESEARCH_LIBRARY_REFRESH_S:
+            return
+        new_rows = self._store.entries_since(self._synced_until - SYNC_OVERLAP_S)
+        live = self._store.keys()
+        with self._lock:
+            for key, value, created_at, expires_at in new_rows:
+                self._rows[key] = {**value, "expires_at": expires_at}
+                self._synced_until = max(self._synced_until, created_at)
+            for key in [k for k, row in self._rows.items() if k not in live or (row["expires_at"] or now + 1) < now]:
+                del self._rows[key]
+            self._keys = list(self._rows)
+            self._matrix = (np.stack([self._rows[k]["vector"] for k in self._keys]).astype(np.float32)
+                            if self._keys else None)
+            self._synced_at = now
+
+    def search(self, query: str, k: int) -> List[LibraryHit]:
+        """The k stored documents most similar to the query."""
+        if not RESEARCH_LIBRARY_ENABLED:
+            return []
+        self._sync()
+        with self._lock:
+            if self._matrix is None:
+                return []
+            vector = np.asarray(_embed_query(query.strip().lower()), dtype=np.float32)
+            scores = self._matrix @ vector
+            order = np.argsort(scores)[::-1][:k]
+            hits = []
+            for i in order:
+                row = self._rows[self._keys[i]]
+                document = Document(
+                    page_content=row["content"],
+                    metadata={**row["metadata"], "from_library": True},
+                )
+                hits.append(LibraryHit(document=document, similarity=round(float(scores[i]), 3)))
+            used = [self._keys[i] for i in order if scores[i] >= RESEARCH_LIBRARY_SIMILARITY]
+        if used:
+            self._writer.submit(self._touch, used)
+        return hits
+
+    def _touch(self, keys: List[str]):
+        try:
+            self._store.touch(keys)
+        except Exception as e:
+            print(f"[Library] Could not record use: {e}")
+
+    def covers(self, hits: Sequence[LibraryHit]) -> bool:
+        """True when enough stored documents are relevant to skip the external sources."""
+        return sum(h.similarity >= RESEARCH_LIBRARY_SIMILARITY for h in hits) >= RESEARCH_LIBRARY_MIN_DOCS
+
+    def _add(self, documents: Sequence[Document], used: Sequence[Document]):
+        from api.storage.faiss_store import _get_embeddings
+
+        rows = []
+        for doc, used_doc in zip(documents, used):
+            key = paper_key(doc)
+            if not key or doc.metadata.get("from_library") or not doc.page_content:
+                continue
+            text = f"{doc.metadata.get('title', '')}\n{used_doc.page_content}"[:EMBEDDED_CHARS]
+            rows.append((key, doc, text))
+        if not rows:
+            return
+        vectors = np.asarray(_get_embeddings().embed_documents([text for _, _, text in rows]), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+        for (key, doc, _), vector in zip(rows, vectors):
+            metadata = {k: v for k, v in doc.metadata.items() if k not in ("from_library", "passages_selected", "passages_total")}
+            self._store.set(key, {
+                "content": truncate_to_tokens(doc.page_content, STORED_TOKENS),
+                "metadata": metadata,
+                # float16 halves the row size; similarity ranking is unaffected
+                "vector": vector.astype(np.float16),
+            })
+        self._sync(force=True)
+        print(f"[Library] Stored {len(rows)} research documents ({len(self._keys)} in library)")
+
+    def add_async(self, documents: Sequence[Document], used: Sequence[Document]):
+        """
+        Embed and store documents in the background. used holds what the scout
+        kept of each document (e.g. selected passages) and is what gets embedded.
+        """
+        if not RESEARCH_LIBRARY_ENABLED:
+            return
+
+        def run():
+            try:
+                self._add(documents, used)
+            except Exception as e:
+                print(f"[Library] Store failed: {e}")
+
+        self._writer.submit(run)
+
+
+RESEARCH_LIBRARY = ResearchLibrary()
@@ -1,33 +1,66 @@
+import re
 import time
+from concurrent.futures import wait
+from typing import Optional, Tuple
+
 from api.core.state import MARSState, AgentLog
 from api.core.llms import FAST_LLM
+from api.core.deadline import StageTimeout, invoke_llm, stage_timeout, submit
+from api.core.limiter import Overloaded
+from api.cache import oracle as oracle_cache
+from api.research.question_bank import find_subject_code, local_prediction, format_with_llm
 from langchain_community.tools.tavily_search import TavilySearchResults
 
+_REGULATION = re.compile(r"\b(?:R\s?-?|regulation\s*)(20\d\d)\b", re.I)
+
+
+def parse_subject(query: str) -> Tuple[str, Optional[str]]:
+    """(subject code, regulation) from a query; the whole query stands in when no code is found."""
+    regulation = _REGULATION.search(query)
+    subject_code = find_subject_code(query) or " ".join(query.split())
+    return subject_code, f"R{regulation.group(1)}" if regulation else None
+
+
 class OracleAgent:
-    def run(self, state: MARSState) -> MARSState:
-        """Predicts Exam Questions based on Subject Code with Year/Regulation Metadata"""
-        start = time.time()
-        
-        subject_code = state.user_query
-        
-        # 1. Faster Search
-        search = TavilySearchResults(max_results=5)
-        
-        try:
+    def search_queries(self, subject_code: str, regulation: Optional[str]) -> list:
+        regulations = regulation or "R2021 R2017"
+        return [
             # Enhanced Queries for Last 5 Years (2020-2025)
-            query_1 = f"Anna University {subject_code} question papers 2020 2021 2022 2023 2024 regulation R2021 R2017"
-            results_1 = search.invoke(query_1)
-            
-            query_2 = f"Engtree {subject_code} important questions last 5 years frequency regulation"
-            results_2 = search.invoke(query_2)
-            
-            combined_results = str(results_1) + "\n" + str(results_2)
-            
-            # 2. Synthesize Prediction with Metadata
-            prompt = f"""
+            f"Anna University {subject_code} question papers 2020 2021 2022 2023 2024 regulation {regulations}",
+            f"Engtree {subject_code} important questions last 5 years frequency regulation",
+        ]
+
+    def predict(self, subject_code: str, regulation: Optional[str], state: MARSState) -> Tuple[str, int, bool]:
+        """
+        Run both searches concurrently within one oracle_search budget, then synthesize.
+        Returns (prediction, search results used, complete) — complete is False when
+        a search failed or overran and the prediction rests on the other alone.
+        """
+        search = TavilySearchResults(max_results=5)
+        timeout = stage_timeout(state, "oracle_search")
+        futures = [submit(search.invoke, q) for q in self.search_queries(subject_code, regulation)]
+        done, _ = wait(futures, timeout=timeout)
+
+        results, error = [], None
+        for future in futures:
+            if future not in done:
+                future.cancel()
+                error = StageTimeout("oracle_search", timeout)
+            elif future.exception() is not None:
+                error = future.exception()
+            else:
+                results.append(future.result())
+        if not results:
+            raise error
+
+        combined_results = "\n".join(str(r) for r in results)
+
+        # Synthesize Prediction with Metadata
+        prompt = f"""
 You are an Exam Pattern Oracle for Anna University students.
 Subject: {subject_code}
 Time Range: Last 5 Years (2020-2025)
+Regulation: {regulation or "Any (R2021 / R2017)"}
 
 Search Results:
 {combined_results}
@@ -55,15 +88,76 @@ Output Format:
 ## Disclaimer
 Predictions based on last 5 years historical data.
 """
-            response = FAST_LLM.invoke(prompt)
-            state.draft_answer = response.content
-            
+        response = invoke_llm(FAST_LLM, prompt, state, "oracle")
+        return response.content, sum(len(r) for r in results), error is None
+
+    def run(self, state: MARSState) -> MARSState:
+        """Predicts Exam Questions based on Subject Code with Year/Regulation Metadata"""
+        start = time.time()
+
+        subject_code, regulation = parse_subject(state.user_query)
+        # Free-text subjects ("compiler design questions") are searched but never
+        # used as question-bank or cache keys
+        has_code = bool(find_subject_code(state.user_query))
+
+        # Uploaded question papers give counted frequencies in milliseconds — prefer them
+        local = None
+        if has_code:
+            try:
+                local = local_prediction(subject_code, regulation)
+            except Exception as e:
+                print(f"[Oracle] Question bank unavailable: {e}")
+        if local is not None:
+            prediction, stats = local
+            state.draft_answer = format_with_llm(prediction, state)
+            state.agent_logs.append(AgentLog(
+                agent="Oracle", icon="tips_and_updates", status="completed",
+                duration_ms=int((time.time() - start) * 1000),
+                thinking=f"Predicted {subject_code} from {stats['papers']} uploaded question papers ({stats['clusters']} question clusters)",
+                output_preview=state.draft_answer[:100],
+                details={"source": "question_bank", "subject_code": subject_code, "regulation": regulation, **stats}
+            ))
+            return state
+
+        cached = None
+        if has_code:
+            try:
+                cached = oracle_cache.lookup(subject_code, regulation)
+            except Exception as e:
+                print(f"[Oracle] Cache lookup failed: {e}")
+        if cached is not None:
+            age_days = int((time.time() - cached["created_at"]) / 86400)
+            state.draft_answer = cached["prediction"]
             state.agent_logs.append(AgentLog(
                 agent="Oracle", icon="tips_and_updates", status="completed",
                 duration_ms=int((time.time() - start) * 1000),
-                thinking=f"Predicted exam pattern for {subject_code} using {len(results_1)+len(results_2)} search results",
-                output_preview=state.draft_answer[:100]
+                thinking=f"Served cached prediction for {subject_code} ({regulation or 'any regulation'}), {age_days} days old",
+                output_preview=state.draft_answer[:100],
+                details={"cache": "oracle", "subject_code": subject_code, "regulation": regulation, "age_days": age_days}
+            ))
+            return state
+
+        try:
+            prediction, result_count, complete = self.predict(subject_code, regulation, state)
+            state.draft_answer = prediction
+
+            state.agent_logs.append(AgentLog(
+                agent="Oracle", icon="tips_and_updates", status="completed" if complete else "degraded",
+                duration_ms=int((time.time() - start) * 1000),
+                thinking=f"Predicted exam pattern for {subject_code} using {result_count} search results",
+                output_preview=state.draft_answer[:100],
+                details={"subject_code": subject_code, "regulation": regulation, "complete": complete}
             ))
+            # Only predictions built from both searches for a real subject code are reused
+            if complete and has_code:
+                try:
+                    oracle_cache.store(subject_code, regulation, {"prediction": prediction, "search_results": result_count})
+                except Exception as e:
+                    print(f"[Oracle] Cache store failed: {e}")
+
+        except Overloaded:
+            # The view answers 503 with Retry-After
+            raise
 
         except Exception as e:
             print(f"[Oracle Error] {e}")
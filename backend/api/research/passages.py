@@ -0,0 +1,92 @@
+"""
+Query-aware passage selection for long research documents.
+Web pages arrive as full raw content, mostly navigation and preamble. Documents
+longer than their token budget are split into passages on sentence
+boundaries, every passage from every document is embedded in one batch with
+the local fastembed model, and each document is reduced to its passages most
+similar to the query, kept in reading order.
+"""
+from typing import List, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from api.utils.context import split_sentences, truncate_to_tokens
+from api.utils.tokens import count_tokens
+from api.core.config import PASSAGE_SELECTION_ENABLED, PASSAGE_TOKENS, PASSAGE_MAX_PER_DOC
+
+PASSAGE_SEPARATOR = "\n\n…\n\n"
+
+
+def split_passages(text: str, passage_tokens: int = PASSAGE_TOKENS, limit: int = PASSAGE_MAX_PER_DOC) -> List[str]:
+    """Group consecutive sentences into passages of about passage_tokens tokens."""
+    passages: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in split_sentences(text):
+        sentence = " ".join(sentence.split())
+        cost = count_tokens(sentence)
+        if current and size + cost > passage_tokens:
+            passages.append(" ".join(current))
+            if len(passages) >= limit:
+                return passages
+            current, size = [], 0
+        current.append(truncate_to_tokens(sentence, passage_tokens) if cost > passage_tokens else sentence)
+        size += min(cost, passage_tokens)
+    if current:
+        passages.append(" ".join(current))
+    return passages[:limit]
+
+
+def select_passages(query: str, documents: Sequence[Document], max_tokens: int) -> List[Document]:
+    """
+    Reduce each document longer than max_tokens to its most query-relevant
+    passages. Shorter documents are returned unchanged; if the embedding model
+    is unavailable long documents fall back to a head cut.
+    """
+    if not PASSAGE_SELECTION_ENABLED:
+        return list(documents)
+
+    long_docs = {i: split_passages(doc.page_content) for i, doc in enumerate(documents)
+                 if doc.page_content and count_tokens(doc.page_content) > max_tokens}
+    long_docs = {i: passages for i, passages in long_docs.items() if len(passages) > 1}
+    if not long_docs:
+        return list(documents)
+
+    try:
+        from api.storage.faiss_store import _get_embeddings
+        embeddings = _get_embeddings()
+        all_passages = [p for passages in long_docs.values() for p in passages]
+        vectors = np.asarray(embeddings.embed_documents(all_passages), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+        query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-8)
+        scores = vectors @ query_vector
+    except Exception as e:
+        print(f"[Passages] Embedding unavailable, keeping document heads: {e}")
+        return list(documents)
+
+    selected = list(documents)
+    separator_tokens = count_tokens(PASSAGE_SEPARATOR)
+    offset = 0
+    for i, passages in long_docs.items():
+        doc_scores = scores[offset:offset + len(passages)]
+        offset += len(passages)
+
+        keep, remaining = [], max_tokens
+        for j in np.argsort(doc_scores)[::-1]:
+            cost = count_tokens(passages[j]) + (separator_tokens if keep else 0)
+            if cost > remaining:
+                continue
+            keep.append(j)
+            remaining -= cost
+        if not keep:
+            continue
+
+        doc = documents[i]
+        metadata = {**doc.metadata, "passages_selected": len(keep), "passages_total": len(passages)}
+        selected[i] = Document(
+            page_content=PASSAGE_SEPARATOR.join(passages[j] for j in sorted(keep)),
+            metadata=metadata,
+        )
+    return selected
@@ -0,0 +1,329 @@
+"""
+Offline Exam Oracle built from uploaded past question papers.
+Each PDF goes through the same PyMuPDF / OCR loader as document uploads, the
+Anna University layout (PART A / B / C, numbered questions, (a) Or (b)
+alternatives) is split into individual questions, and near-duplicate
+questions of a subject are clustered by embedding. Cluster frequencies
+(distinct papers), years and sessions are stored in QuestionCluster, so a
+prediction is a table read plus Markdown rendering.
+"""
+import os
+import re
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from api.core.config import (
+    ORACLE_CLUSTER_SIMILARITY,
+    ORACLE_LOCAL_MIN_PAPERS,
+    ORACLE_LOCAL_LLM_FORMAT,
+)
+
+_PART = re.compile(r"PART\s*[-–—:]?\s*([ABC])\b(?:[^\n]*?\(\s*\d+\s*[x×X*]\s*(\d+)\s*=)?", re.I)
+_NUMBER = re.compile(r"(?m)^\s*(\d{1,2})\s*[.)]\s*")
+_ALTERNATIVE = re.compile(r"(?:^|\s)\(\s*([ab])\s*\)\s+")
+_OR_LINE = re.compile(r"(?mi)^\s*or\s*$")
+_MARKS = re.compile(r"\s\(\s*\d{1,2}\s*\)(?=\s|$)")
+_INSTRUCTION = re.compile(r"(?i)answer\s+all\s+questions\.?")
+
+# Anna University subject codes: 2-3 letters + 4 digits (CS3491, MA3151, GE 3151).
+# Upper case as printed, or a lower-case code typed as one word ("cs3491")
+_SUBJECT_CODE = re.compile(r"\b(?:([A-Z]{2,3})\s?-?(\d{4})|([a-z]{2,3})(\d{4}))\b")
+# Words that precede a year in headers and queries ("APRIL/MAY 2023", "questions for 2024")
+_NOT_SUBJECT = {
+    "JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC",
+    "THE", "FOR", "IN", "OF", "ON", "TO", "BY", "AT", "AS", "IS", "AND", "OR", "ALL", "ANY",
+    "SEM", "REG", "AU", "UG", "PG", "BE", "ME", "YR", "UP", "SO",
+    # Subject nicknames students put before a year ("predict for OS 2021")
+    "OS", "AI", "ML", "DL", "DS", "CN", "CD", "SE", "CG", "CC", "WT", "IP", "EM", "NLP", "IOT",
+    "OOP", "DAA", "DSA", "TOC", "COA", "DBS", "DB", "CV", "EVS", "PQT", "BEE",
+}
+_REGULATION = re.compile(r"\bRegulations?\s*[-:]?\s*(20\d\d)\b|\bR\s?-?(20\d\d)\b", re.I)
+_SESSION = re.compile(
+    r"\b(JANUARY|FEBRUARY|MARCH|APRIL|MAY|JUNE|JULY|AUGUST|SEPTEMBER|OCTOBER|NOVEMBER|DECEMBER)"
+    r"\s*/\s*(JANUARY|FEBRUARY|MARCH|APRIL|MAY|JUNE|JULY|AUGUST|SEPTEMBER|OCTOBER|NOVEMBER|DECEMBER)\s*,?\s*(20\d\d)\b",
+    re.I,
+)
+
+MIN_QUESTION_CHARS = 15
+DEFAULT_MARKS = {"A": 2, "B": 13, "C": 15}
+
+
+@dataclass
+class ExtractedQuestion:
+    part: str
+    number: str
+    marks: Optional[int]
+    text: str
+
+
+def _clean(text: str) -> str:
+    text = _MARKS.sub(" ", " " + text)
+    text = _INSTRUCTION.sub(" ", text)
+    return " ".join(text.split()).strip(" .;:-")
+
+
+def extract_questions(text: str) -> List[ExtractedQuestion]:
+    """Split the text of an Anna University question paper into individual questions."""
+    headers = list(_PART.finditer(text))
+    if headers:
+        sections = [
+            (m.group(1).upper(), int(m.group(2)) if m.group(2) else None,
+             text[m.end():headers[i + 1].start() if i + 1 < len(headers) else len(text)])
+            for i, m in enumerate(headers)
+        ]
+    else:
+        sections = [("A", None, text)]
+
+    questions = []
+    for part, marks, body in sections:
+        marks = marks or DEFAULT_MARKS.get(part)
+        body = _OR_LINE.sub(" ", body)
+        starts = list(_NUMBER.finditer(body))
+        for i, m in enumerate(starts):
+            segment = body[m.end():starts[i + 1].start() if i + 1 < len(starts) else len(body)]
+            number = m.group(1)
+            alternatives = list(_ALTERNATIVE.finditer(segment)) if part != "A" else []
+            if len(alternatives) >= 2:
+                # "(a) ... Or (b) ..." — each alternative is asked as its own question
+                for j, alt in enumerate(alternatives):
+                    end = alternatives[j + 1].start() if j + 1 < len(alternatives) else len(segment)
+                    chunk = _clean(re.sub(r"(?i)\s+or\s*$", "", segment[alt.end():end]))
+                    if len(chunk) >= MIN_QUESTION_CHARS:
+                        questions.append(ExtractedQuestion(part, f"{number}({alt.group(1)})", marks, chunk))
+            else:
+                chunk = _clean(segment)
+                if len(chunk) >= MIN_QUESTION_CHARS:
+                    questions.append(ExtractedQuestion(part, number, marks, chunk))
+    return questions
+
+
+def find_subject_code(text: str) -> str:
+    """First plausible subject code in text (e.g. "CS3491"), or "" when there is none."""
+    for match in _SUBJECT_CODE.finditer(text or ""):
+        letters = (match.group(1) or match.group(3)).upper()
+        if letters not in _NOT_SUBJECT:
+            return f"{letters}{match.group(2) or match.group(4)}"
+    return ""
+
+
+def detect_paper_metadata(text: str) -> dict:
+    """Subject code, regulation, session and year from the paper's header."""
+    head = text[:3000]
+    regulation = _REGULATION.search(head)
+    session = _SESSION.search(head)
+    return {
+        "subject_code": find_subject_code(head),
+        "regulation": f"R{regulation.group(1) or regulation.group(2)}" if regulation else "",
+        "session": f"{session.group(1)[:3].title()}/{session.group(2)[:3].title()} {session.group(3)}" if session else "",
+        "year": int(session.group(3)) if session else None,
+    }
+
+
+# ─────────────────────────────────────────────
+# Ingest
+# ─────────────────────────────────────────────
+
+def ingest_question_paper(file_obj, subject_code: str = "", regulation: str = "",
+                          session: str = "", year: Optional[int] = None) -> dict:
+    """
+    Extract and store the questions of one uploaded paper, then rebuild the
+    subject's clusters. Form values override what is detected in the PDF.
+    Returns a summary dict; duplicate uploads are reported, not re-counted.
+    """
+    from django.db import transaction
+    from api.models import QuestionPaper, ExamQuestion
+    from api.storage.faiss_store import load_pdf_pages
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in file_obj.chunks(chunk_size=8192 * 1024):
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        existing = QuestionPaper.objects.filter(file_hash=digest.hexdigest()).first()
+        if existing:
+            return {"paper_id": existing.id, "subject_code": existing.subject_code,
+                    "questions": existing.question_count, "duplicate": True}
+
+        pages = load_pdf_pages(tmp_path)
+    finally:
+        os.unlink(tmp_path)
+
+    text = "\n".join(p.page_content for p in pages)
+    detected = detect_paper_metadata(text)
+    subject_code = (subject_code or detected["subject_code"]).upper().replace(" ", "")
+    if not subject_code:
+        raise ValueError("Could not detect a subject code; please provide subject_code")
+    questions = extract_questions(text)
+    if not questions:
+        raise ValueError("No questions could be extracted from this paper")
+
+    with transaction.atomic():
+        paper = QuestionPaper.objects.create(
+            subject_code=subject_code,
+            regulation=(regulation or detected["regulation"]).upper(),
+            session=session or detected["session"],
+            year=year or detected["year"],
+            filename=getattr(file_obj, "name", "paper.pdf"),
+            file_hash=digest.hexdigest(),
+            question_count=len(questions),
+        )
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(paper=paper, part=q.part, number=q.number, marks=q.marks, text=q.text)
+            for q in questions
+        ])
+
+    clusters = rebuild_clusters(subject_code)
+    print(f"[QuestionBank] {subject_code} {paper.session or paper.year}: {len(questions)} questions, {clusters} clusters")
+    return {
+        "paper_id": paper.id,
+        "subject_code": subject_code,
+        "regulation": paper.regulation,
+        "session": paper.session,
+        "year": paper.year,
+        "questions": len(questions),
+        "clusters": clusters,
+        "duplicate": False,
+    }
+
+
+def rebuild_clusters(subject_code: str) -> int:
+    """
+    Greedy single-pass clustering of a subject's questions: each question joins
+    the most similar cluster of the same part above ORACLE_CLUSTER_SIMILARITY
+    (running mean centroid), otherwise starts a new one.
+    """
+    from django.db import transaction
+    from api.models import ExamQuestion, QuestionCluster
+    from api.storage.faiss_store import _get_embeddings
+
+    questions = list(
+        ExamQuestion.objects.filter(paper__subject_code=subject_code)
+        .select_related("paper").order_by("paper__year", "paper_id", "id")
+    )
+    if not questions:
+        QuestionCluster.objects.filter(subject_code=subject_code).delete()
+        return 0
+
+    vectors = np.asarray(_get_embeddings().embed_documents([q.text for q in questions]), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+
+    clusters = []   # {"part", "sum", "members": [index]}
+    for i, question in enumerate(questions):
+        candidates = [c for c in clusters if c["part"] == question.part]
+        best, best_score = None, ORACLE_CLUSTER_SIMILARITY
+        for cluster in candidates:
+            centroid = cluster["sum"] / np.linalg.norm(cluster["sum"])
+            score = float(centroid @ vectors[i])
+            if score >= best_score:
+                best, best_score = cluster, score
+        if best is None:
+            clusters.append({"part": question.part, "sum": vectors[i].copy(), "members": [i]})
+        else:
+            best["sum"] += vectors[i]
+            best["members"].append(i)
+
+    rows = []
+    for cluster in clusters:
+        members = [questions[i] for i in cluster["members"]]
+        centroid = cluster["sum"] / np.linalg.norm(cluster["sum"])
+        # The wording closest to the centroid represents the cluster
+        representative = members[int(np.argmax(vectors[cluster["members"]] @ centroid))]
+        papers = {m.paper_id: m.paper for m in members}
+        years = sorted({p.year for p in papers.values() if p.year})
+        rows.append(QuestionCluster(
+            subject_code=subject_code,
+            part=cluster["part"],
+            text=representative.text,
+            marks=representative.marks,
+            frequency=len(papers),
+            years=years,
+            sessions=sorted({p.session for p in papers.values() if p.session},
+                            key=lambda s: (s[-4:], s)),
+            regulations=sorted({p.regulation for p in papers.values() if p.regulation}),
+            last_year=years[-1] if years else None,
+        ))
+
+    with transaction.atomic():
+        QuestionCluster.objects.filter(subject_code=subject_code).delete()
+        QuestionCluster.objects.bulk_create(rows)
+    return len(rows)
+
+
+# ─────────────────────────────────────────────
+# Predict
+# ─────────────────────────────────────────────
+
+def paper_count(subject_code: str, regulation: Optional[str] = None) -> int:
+    from api.models import QuestionPaper
+    papers = QuestionPaper.objects.filter(subject_code=subject_code)
+    if regulation:
+        papers = papers.filter(regulation=regulation)
+    return papers.count()
+
+
+def _question_line(rank: int, cluster) -> str:
+    when = ", ".join(cluster.sessions) or ", ".join(str(y) for y in cluster.years) or "Unknown"
+    regulation = ", ".join(cluster.regulations) or "N/A"
+    times = "time" if cluster.frequency == 1 else "times"
+    return (f"{rank}. **{cluster.text}**\n"
+            f"   - Years: {when} | Frequency: {cluster.frequency} {times} | Regulation: {regulation}")
+
+
+def local_prediction(subject_code: str, regulation: Optional[str] = None, top: int = 10) -> Optional[Tuple[str, dict]]:
+    """
+    Markdown prediction from the precomputed clusters, in the same layout as the
+    web Oracle, or None when fewer than ORACLE_LOCAL_MIN_PAPERS papers are on file.
+    """
+    from api.models import QuestionCluster
+
+    papers = paper_count(subject_code, regulation)
+    if papers < ORACLE_LOCAL_MIN_PAPERS:
+        return None
+
+    clusters = list(QuestionCluster.objects.filter(subject_code=subject_code))
+    if regulation:
+        clusters = [c for c in clusters if regulation in c.regulations]
+    part_a = [c for c in clusters if c.part == "A"][:top]
+    part_bc = [c for c in clusters if c.part in ("B", "C")][:top]
+    if not part_a and not part_bc:
+        return None
+
+    years = sorted({y for c in clusters for y in c.years})
+    span_text = f"{years[0]}–{years[-1]}" if years else "all years on file"
+    lines = [f"# Exam Predictor: {subject_code} (Question Bank, {papers} papers, {span_text})", ""]
+    if part_a:
+        lines += ["## Part A (2-Marks) - Top 10"] + [_question_line(i, c) for i, c in enumerate(part_a, 1)] + [""]
+    if part_bc:
+        lines += ["## Part B & C (13/15-Marks) - Top 10"] + [_question_line(i, c) for i, c in enumerate(part_bc, 1)] + [""]
+    lines += ["## Disclaimer",
+              f"Frequencies are counted from {papers} uploaded question papers"
+              f"{' for ' + regulation if regulation else ''}; near-identical wordings are grouped together."]
+    return "\n".join(lines), {"papers": papers, "clusters": len(clusters), "years": years}
+
+
+def format_with_llm(prediction: str, state) -> str:
+    """Optional LLM polish of the table; the counted facts are kept verbatim, and any failure keeps the raw table."""
+    if not ORACLE_LOCAL_LLM_FORMAT:
+        return prediction
+    from api.core.llms import FAST_LLM
+    from api.core.deadline import invoke_llm
+    from api.core.limiter import Overloaded
+    try:
+        response = invoke_llm(FAST_LLM, (
+            "Tidy the wording of the exam questions below (fix OCR errors, spacing and capitalisation). "
+            "Keep every question, its order, years, frequency and regulation exactly as given, "
+            "and keep the Markdown layout.\n\n" + prediction
+        ), state, "oracle")
+        return response.content or prediction
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"[QuestionBank] LLM formatting skipped: {e}")
+        return prediction
@@ -1,11 +1,14 @@
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 import time
+from api.cache.sources import cached_search
 
 
-def search_google_scholar(query: str, max_results: int = 5) -> List[Document]:
+@cached_search("scholar")
+def search_google_scholar(query: str, max_results: int = 5, deadline: Optional[float] = None) -> List[Document]:
     """
     Search Google Scholar using scholarly library (free).
+    deadline (time.monotonic()) stops the scan early and returns the results so far.
     """
     try:
         from scholarly import scholarly
@@ -21,6 +24,9 @@ def search_google_scholar(query: str, max_results: int = 5) -> List[Document]:
         for result in search_query:
             if count >= max_results:
                 break
+            if deadline is not None and time.monotonic() >= deadline:
+                print(f"[Google Scholar] Deadline reached, returning {count} results")
+                break
 
             try:
                 title = result.get('bib', {}).get('title', 'Untitled')
@@ -62,6 +68,10 @@ def search_google_scholar(query: str, max_results: int = 5) -> List[Document]:
                     )
                 )
                 count += 1
+                if count >= max_results:
+                    break
+                if deadline is not None and time.monotonic() + 0.5 >= deadline:
+                    break
                 time.sleep(0.5)
             except Exception as e:
                 print(f"[Google Scholar] Error processing result: {e}")
@@ -74,6 +84,7 @@ def search_google_scholar(query: str, max_results: int = 5) -> List[Document]:
         return []
 
 
+@cached_search("serpapi")
 def search_google_scholar_serpapi(query: str, max_results: int = 5, api_key: str = None) -> List[Document]:
     """
     Alternative: Search Google Scholar using SerpAPI (requires API key).
@@ -1,13 +1,69 @@
 import time
 import os
 from typing import List
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait, FIRST_COMPLETED
 from langchain_core.documents import Document
 
 from api.core.state import MARSState, RetrievedSource, AgentLog
 from api.research.arxiv_loader import load_research_papers
 from api.research.scholar_loader import search_google_scholar, search_google_scholar_serpapi
 from api.research.web_loader import search_with_tavily
+from api.research.dedup import dedupe_documents, arxiv_id_of
+from api.research.passages import select_passages
+from api.research.corpus import RESEARCH_CORPUS
+from api.research.library import RESEARCH_LIBRARY
+from api.core.deadline import stage_timeout, submit
+from api.core.tracing import span
+from api.core.config import (
+    PROMPT_TOKEN_BUDGETS,
+    RESEARCH_SOURCE_BUDGETS_S,
+    RESEARCH_DEEP_MAX_PAPERS,
+    RESEARCH_DEEP_PASSAGES,
+    RESEARCH_LIBRARY_K,
+    RESEARCH_LIBRARY_SIMILARITY,
+)
+from api.utils.context import truncate_to_tokens
+
+
+def _paper_metadata(doc: Document, index: int) -> dict:
+    """Citation metadata for one (possibly merged) paper, shaped by its primary source."""
+    meta = doc.metadata
+    source_type = meta.get("source", "web")
+    if source_type == "web":
+        metadata = {
+            "index": index,
+            "title": meta.get("title", "Web Article"),
+            "authors": "Web Source",
+            "year": "2025",
+            "url": meta.get("url", ""),
+            "summary": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
+            "source_type": "web"
+        }
+    else:
+        metadata = {
+            "index": index,
+            "title": meta.get("title", "Untitled"),
+            "authors": meta.get("authors", "Unknown Authors"),
+            "year": meta.get("year", "N/A"),
+            "url": meta.get("url", ""),
+            "summary": meta.get("Summary", "")[:500],
+            "source_type": source_type,
+        }
+        if source_type == "arxiv":
+            metadata["published"] = meta.get("Published", "")
+        if source_type == "google_scholar":
+            metadata["citations"] = meta.get("citations", 0)
+            metadata["venue"] = meta.get("venue", "")
+
+    # Fields a merged paper picked up from its other copies
+    for field in ("pdf_url", "citations", "venue"):
+        if meta.get(field) and field not in metadata:
+            metadata[field] = meta[field]
+    if source_type == "arxiv":
+        metadata.setdefault("pdf_url", "")
+    if meta.get("merged_sources"):
+        metadata["merged_sources"] = meta["merged_sources"]
+    return metadata
 
 
 class ResearchScoutAgent:
@@ -23,104 +79,74 @@ class ResearchScoutAgent:
             return state
 
         query = state.user_query
-        
-        # Define parallel tasks
-        def get_arxiv():
-            try: return load_research_papers(query, max_docs=5)
-            except: return []
+        if state.intent == "follow_up" and state.memory_hint:
+            # Follow-ups are searched together with the question they follow
+            query = f"{state.memory_hint} {query}"
 
-        def get_scholar():
-            try:
-                if self.use_serpapi_scholar:
-                    from api.core.config import SERPAPI_API_KEY
-                    return search_google_scholar_serpapi(query, max_results=5, api_key=SERPAPI_API_KEY)
-                return search_google_scholar(query, max_results=5)
-            except: return []
+        # Local library first: when it already holds enough relevant documents
+        # the external sources are skipped entirely
+        try:
+            library_hits = RESEARCH_LIBRARY.search(query, k=RESEARCH_LIBRARY_K)
+        except Exception as e:
+            print(f"[Research Scout] Library search failed: {e}")
+            library_hits = []
+        library_docs = [h.document for h in library_hits if h.similarity >= RESEARCH_LIBRARY_SIMILARITY]
+        local_only = RESEARCH_LIBRARY.covers(library_hits)
 
-        def get_web():
-            try: return search_with_tavily(query, max_results=5)
-            except: return []
-
-        # Execute in parallel
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_arxiv = executor.submit(get_arxiv)
-            future_scholar = executor.submit(get_scholar)
-            future_web = executor.submit(get_web)
-
-            arxiv_papers = future_arxiv.result()
-            scholar_papers = future_scholar.result()
-            web_docs = future_web.result()
-
-        documents: List[Document] = []
-        state.papers_metadata = []
-        source_index = 1
-        search_log = []
-
-        # Process ArXiv
-        if arxiv_papers:
-            documents.extend(arxiv_papers)
-            for paper in arxiv_papers:
-                metadata = {
-                    "index": source_index,
-                    "title": paper.metadata.get("title", "Untitled"),
-                    "authors": paper.metadata.get("authors", "Unknown Authors"),
-                    "year": paper.metadata.get("year", "N/A"),
-                    "url": paper.metadata.get("url", ""),
-                    "published": paper.metadata.get("Published", ""),
-                    "summary": paper.metadata.get("Summary", "")[:500],
-                    "source_type": "arxiv",
-                    "pdf_url": paper.metadata.get("pdf_url", "")
-                }
-                state.papers_metadata.append(metadata)
-                source_index += 1
-            search_log.append(f"arXiv: {len(arxiv_papers)} papers")
-        else:
-            search_log.append("arXiv: No results")
-
-        # Process Scholar
-        if scholar_papers:
-            documents.extend(scholar_papers)
-            for paper in scholar_papers:
-                metadata = {
-                    "index": source_index,
-                    "title": paper.metadata.get("title", "Untitled"),
-                    "authors": paper.metadata.get("authors", "Unknown Authors"),
-                    "year": paper.metadata.get("year", "N/A"),
-                    "url": paper.metadata.get("url", ""),
-                    "summary": paper.metadata.get("Summary", "")[:500],
-                    "source_type": "google_scholar",
-                    "citations": paper.metadata.get("citations", 0),
-                    "venue": paper.metadata.get("venue", "")
-                }
-                state.papers_metadata.append(metadata)
-                source_index += 1
-            search_log.append(f"Scholar: {len(scholar_papers)} papers")
+        if local_only:
+            results, source_ms, timed_out = {}, {}, []
         else:
-            search_log.append("Scholar: No results")
-
-        # Process Web
-        if web_docs:
-            documents.extend(web_docs)
-            for doc in web_docs:
-                metadata = {
-                    "index": source_index,
-                    "title": doc.metadata.get("title", "Web Article"),
-                    "authors": "Web Source",
-                    "year": "2025",
-                    "url": doc.metadata.get("url", ""),
-                    "summary": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
-                    "source_type": "web"
-                }
-                state.papers_metadata.append(metadata)
-                source_index += 1
-            search_log.append(f"Web: {len(web_docs)} results")
-        else:
-            search_log.append("Web: No results")
+            results, source_ms, timed_out = self._fetch_sources(state, query)
+
+        def collect(name):
+            return results.get(name, [])
+
+        arxiv_papers = collect("arXiv")
+        scholar_papers = collect("Scholar")
+        web_docs = collect("Web")
+
+        search_log = [f"Library: {len(library_docs)} relevant documents"
+                      + (f" (best similarity {library_hits[0].similarity})" if library_hits else "")]
+        if local_only:
+            search_log.append("External sources skipped: local library covers this query")
+        for name, docs, unit in (("arXiv", arxiv_papers, "papers"), ("Scholar", scholar_papers, "papers"), ("Web", web_docs, "results")):
+            if docs:
+                search_log.append(f"{name}: {len(docs)} {unit}")
+            elif not local_only:
+                search_log.append(f"{name}: Timed out" if name in timed_out else f"{name}: No results")
+
+        # The same paper often comes back from several sources; merge the copies
+        # so it is cited once with the best metadata from each
+        raw_documents, duplicates = dedupe_documents(arxiv_papers + scholar_papers + web_docs + library_docs)
+        if duplicates:
+            search_log.append(f"Merged {duplicates} duplicate papers across sources")
+
+        # Long pages (raw web content) are cut down to the passages closest to the
+        # query rather than their opening characters
+        documents = select_passages(query, raw_documents, PROMPT_TOKEN_BUDGETS["research_source"])
+        reduced = [d for d in documents if "passages_selected" in d.metadata]
+        if reduced:
+            search_log.append(f"Selected query-relevant passages from {len(reduced)} long documents")
+
+        # Newly fetched documents join the library for later queries (embedded off the request path)
+        RESEARCH_LIBRARY.add_async(raw_documents, documents)
+
+        source_budget = PROMPT_TOKEN_BUDGETS["research_source"]
+        fulltext = {}
+        if state.deep_research:
+            documents, fulltext = self._attach_full_text(state, query, documents)
+            source_budget = PROMPT_TOKEN_BUDGETS["research_source_deep"]
+            search_log.append(
+                f"Full text: {len(fulltext.get('cached', []))} from corpus, {len(fulltext.get('added', []))} downloaded"
+                + (f", {len(fulltext['pending'])} still downloading" if fulltext.get("pending") else "")
+            )
+
+        state.papers_metadata = [_paper_metadata(doc, index) for index, doc in enumerate(documents, start=1)]
 
         # Filter and Truncate
         state.retrieved_sources = [
             RetrievedSource(
-                content=doc.page_content[:2500],
+                content=truncate_to_tokens(doc.page_content, source_budget),
                 source=doc.metadata.get("source", "research"),
                 page=None,
                 url=doc.metadata.get("url")
@@ -131,15 +157,123 @@ class ResearchScoutAgent:
 
         elapsed = int((time.time() - start) * 1000)
         state.agent_logs.append(AgentLog(
-            agent="Research Scout", icon="search", status="completed",
+            agent="Research Scout", icon="search", status="degraded" if timed_out else "completed",
             duration_ms=elapsed,
-            thinking=f"Parallel search for: '{query[:80]}...'\n" + "\n".join(search_log),
+            thinking=f"{'Library search' if local_only else 'Parallel search'} for: '{query[:80]}...'\n" + "\n".join(search_log),
             output_preview=f"Found {len(state.retrieved_sources)} sources ({elapsed}ms)",
             details={
                 "total_sources": len(state.retrieved_sources),
                 "search_log": search_log,
+                "timed_out": timed_out,
+                "source_ms": source_ms,
+                "duplicates_merged": duplicates,
+                "library_docs": len(library_docs),
+                "external_skipped": local_only,
+                "deep_research": state.deep_research,
+                "fulltext": fulltext,
                 "duration_ms": elapsed
             }
         ))
 
         return state
+
+    def _fetch_sources(self, state: MARSState, query: str):
+        """Query arXiv, Scholar and the web in parallel; returns (results, source_ms, timed_out)."""
+        # Define parallel tasks
+        def get_arxiv():
+            with span("research.arxiv") as s:
+                try: docs = load_research_papers(query, max_docs=5)
+                except: docs = []
+                s.set(results=len(docs))
+                return docs
+
+        def get_scholar(deadline):
+            with span("research.scholar", serpapi=self.use_serpapi_scholar) as s:
+                try:
+                    if self.use_serpapi_scholar:
+                        from api.core.config import SERPAPI_API_KEY
+                        docs = search_google_scholar_serpapi(query, max_results=5, api_key=SERPAPI_API_KEY)
+                    else:
+                        # scholarly paces itself between results; stop in time to hand back a partial list
+                        docs = search_google_scholar(query, max_results=5, deadline=deadline - 0.5)
+                except: docs = []
+                s.set(results=len(docs))
+                return docs
+
+        def get_web():
+            with span("research.tavily") as s:
+                try: docs = search_with_tavily(query, max_results=5)
+                except: docs = []
+                s.set(results=len(docs))
+                return docs
+
+        # Execute in parallel; each source has its own deadline (capped by the stage
+        # budget), results are taken as they arrive, and sources that overrun are
+        # abandoned so the scout proceeds with whatever arrived in time
+        stage_budget = stage_timeout(state, "research_scout")
+        started = time.monotonic()
+        deadlines = {
+            name: started + min(RESEARCH_SOURCE_BUDGETS_S.get(name, stage_budget), stage_budget)
+            for name in ("arXiv", "Scholar", "Web")
+        }
+        futures = {
+            "arXiv": submit(get_arxiv),
+            "Scholar": submit(get_scholar, deadlines["Scholar"]),
+            "Web": submit(get_web),
+        }
+        results, source_ms, timed_out = {}, {}, []
+        pending = dict(futures)
+        while pending:
+            now = time.monotonic()
+            for name in [n for n in pending if deadlines[n] <= now]:
+                pending.pop(name).cancel()
+                timed_out.append(name)
+                print(f"[Research Scout] {name} exceeded its {deadlines[name] - started:.1f}s budget, continuing without it")
+            if not pending:
+                break
+            next_deadline = min(deadlines[n] for n in pending)
+            done, _ = wait(pending.values(), timeout=next_deadline - now, return_when=FIRST_COMPLETED)
+            for name in [n for n, f in pending.items() if f in done]:
+                results[name] = pending.pop(name).result()
+                source_ms[name] = int((time.monotonic() - started) * 1000)
+        return results, source_ms, timed_out
+
+    def _attach_full_text(self, state: MARSState, query: str, documents: List[Document]):
+        """
+        Deep research: ingest the top arXiv papers into the shared corpus (papers
+        already there are not downloaded again) and append each paper's most
+        relevant full-text passages to its abstract.
+        """
+        papers = [d for d in documents if arxiv_id_of(d)][:RESEARCH_DEEP_MAX_PAPERS]
+        if not papers:
+            return documents, {}
+
+        with span("research.fulltext", papers=len(papers)) as s:
+            try:
+                report = RESEARCH_CORPUS.ensure(papers, stage_timeout(state, "research_fulltext"))
+                ready = report["cached"] + report["added"]
+                chunks = RESEARCH_CORPUS.search(query, k=RESEARCH_DEEP_PASSAGES * len(ready), arxiv_ids=ready)
+            except Exception as e:
+                print(f"[Research Scout] Full-text corpus unavailable: {e}")
+                return documents, {"error": str(e)}
+            s.set(**{name: len(ids) for name, ids in report.items()}, passages=len(chunks))
+
+        by_paper = {}
+        for chunk in chunks:
+            passages = by_paper.setdefault(chunk.metadata.get("arxiv_id"), [])
+            if len(passages) < RESEARCH_DEEP_PASSAGES:
+                passages.append(chunk)
+
+        enriched = []
+        for doc in documents:
+            passages = by_paper.get(arxiv_id_of(doc))
+            if passages:
+                excerpts = "\n\n".join(
+                    f"(p. {(c.metadata.get('page') or 0) + 1}) {c.page_content.strip()}" for c in passages
+                )
+                doc = Document(
+                    page_content=f"{doc.page_content}\n\nFull-text excerpts:\n\n{excerpts}",
+                    metadata={**doc.metadata, "fulltext_passages": len(passages)},
+                )
+            enriched.append(doc)
+        return enriched, report
@@ -1,8 +1,10 @@
 from typing import List
 from langchain_core.documents import Document
 import os
+from api.cache.sources import cached_search
 
 
+@cached_search("tavily")
 def search_with_tavily(query: str, max_results: int = 5) -> List[Document]:
     """
     Search web using Tavily API
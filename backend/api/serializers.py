@@ -10,6 +10,10 @@ class ChatRequestSerializer(serializers.Serializer):
         required=False,
         default=list
     )
+    # Skip the answer caches and fetch fresh results
+    bypass_cache = serializers.BooleanField(required=False, default=False)
+    # Research Mode: also read the full text of the top arXiv papers
+    deep_research = serializers.BooleanField(required=False, default=False)
 
 
 class ChatResponseSerializer(serializers.Serializer):
@@ -25,6 +29,7 @@ class ChatResponseSerializer(serializers.Serializer):
         child=serializers.DictField(),
         required=False
     )
+    cache_hit = serializers.BooleanField(required=False)
 
 
 class UploadRequestSerializer(serializers.Serializer):
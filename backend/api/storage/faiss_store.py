@@ -74,6 +74,65 @@ def _extract_text_ocr(pdf_path: str) -> list:
     print(f"[FAISS] OCR completed in {time.time()-start:.1f}s")
     return docs
 
+def load_pdf_pages(pdf_path: str) -> list:
+    """
+    Page Documents via PyMuPDF, falling back to OCR when no page has usable
+    text (scanned PDFs). Shared by document uploads and question papers.
+    """
+    docs = PyMuPDFLoader(pdf_path).load()
+    print(f"[FAISS] PyMuPDF loaded {len(docs)} pages")
+    if not any(len(d.page_content.strip()) > 30 for d in docs):
+        print("[FAISS] No valid text found via PyMuPDF. Falling back to OCR...")
+        docs = _extract_text_ocr(pdf_path)
+    return docs
+
+
+def split_pdf(pdf_path: str):
+    """
+    Load a PDF (see load_pdf_pages) and chunk it.
+    Returns (pages, chunks, chunk_size).
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    # 1. Load PDF (OCR fallback for scanned PDFs)
+    docs = load_pdf_pages(pdf_path)
+
+    # 2. Chunk — use RecursiveCharacterTextSplitter for better results on large docs
+    chunk_size = 1500 if len(docs) > 50 else 1000
+    chunk_overlap = 100 if len(docs) > 50 else 50
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        length_function=len,
+    )
+    chunks = splitter.split_documents(docs)
+
+    valid_chunks = [c for c in chunks if len(c.page_content.strip()) > 30]
+    if not valid_chunks:
+        raise ValueError("No valid text found in document, even after OCR.")
+
+    return docs, valid_chunks, chunk_size
+
+
+def build_vectorstore(chunks: list) -> FAISS:
+    """Embed chunks into a new FAISS store, in batches for large documents."""
+    embeddings = _get_embeddings()
+
+    BATCH = 500
+    if len(chunks) <= BATCH:
+        return FAISS.from_documents(chunks, embeddings)
+    # Build in batches to avoid memory issues
+    vectorstore = FAISS.from_documents(chunks[:BATCH], embeddings)
+    for i in range(BATCH, len(chunks), BATCH):
+        batch = chunks[i:i + BATCH]
+        batch_vs = FAISS.from_documents(batch, embeddings)
+        vectorstore.merge_from(batch_vs)
+        print(f"[FAISS] Indexed batch {i // BATCH + 1}/{(len(chunks) + BATCH - 1) // BATCH}")
+    return vectorstore
+
+
 def ingest_pdf(file_obj, namespace: str) -> Dict[str, Any]:
     """
     Parse PDF, chunk, embed locally via sentence-transformers, and save FAISS index.
@@ -81,8 +140,10 @@ def ingest_pdf(file_obj, namespace: str) -> Dict[str, Any]:
     """
     import tempfile
     import os
-    from langchain_community.document_loaders import PyMuPDFLoader
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from api.core.metrics import INGEST_DURATION, INGEST_PAGES, INGEST_CHUNKS
+    import time
+
+    ingest_start = time.time()
 
     # Save uploaded file to a temp path — handle both InMemory and Temporary uploads
     suffix = ".pdf"
@@ -101,56 +162,20 @@ def ingest_pdf(file_obj, namespace: str) -> Dict[str, Any]:
         file_size_mb = os.path.getsize(tmp_path) / (1024 * 1024)
         print(f"[FAISS] Processing file: {getattr(file_obj, 'name', 'unknown.pdf')} ({file_size_mb:.1f} MB)")
 
-        # 1. Load PDF
-        loader = PyMuPDFLoader(tmp_path)
-        docs = loader.load()
-        print(f"[FAISS] PyMuPDF loaded {len(docs)} pages")
-
-        # 2. Chunk — use RecursiveCharacterTextSplitter for better results on large docs
-        chunk_size = 1500 if len(docs) > 50 else 1000
-        chunk_overlap = 100 if len(docs) > 50 else 50
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
-        chunks = splitter.split_documents(docs)
-
-        valid_chunks = [c for c in chunks if len(c.page_content.strip()) > 30]
-        
-        # --- OCR Fallback ---
-        if not valid_chunks:
-            print("[FAISS] No valid text found via PyMuPDF. Falling back to OCR...")
-            docs = _extract_text_ocr(tmp_path)
-            chunks = splitter.split_documents(docs)
-            valid_chunks = [c for c in chunks if len(c.page_content.strip()) > 30]
-
-            if not valid_chunks:
-                raise ValueError("No valid text found in document, even after OCR.")
-
+        # 1-2. Load & chunk (OCR fallback for scanned PDFs)
+        docs, valid_chunks, chunk_size = split_pdf(tmp_path)
         print(f"[FAISS] Generated {len(valid_chunks)} text chunks (chunk_size={chunk_size})")
 
         # 3. Embed & build FAISS — process in batches for large docs
-        embeddings = _get_embeddings()
-        
-        BATCH = 500
-        if len(valid_chunks) <= BATCH:
-            vectorstore = FAISS.from_documents(valid_chunks, embeddings)
-        else:
-            # Build in batches to avoid memory issues
-            vectorstore = FAISS.from_documents(valid_chunks[:BATCH], embeddings)
-            for i in range(BATCH, len(valid_chunks), BATCH):
-                batch = valid_chunks[i:i + BATCH]
-                batch_vs = FAISS.from_documents(batch, embeddings)
-                vectorstore.merge_from(batch_vs)
-                print(f"[FAISS] Indexed batch {i // BATCH + 1}/{(len(valid_chunks) + BATCH - 1) // BATCH}")
+        vectorstore = build_vectorstore(valid_chunks)
 
         # 4. Save to disk
         index_path = str(FAISS_INDEX_DIR / namespace)
         vectorstore.save_local(index_path)
         print(f"[FAISS] Saved index for namespace '{namespace}' → {index_path}")
+
+        from api.cache.semantic import invalidate_namespace
+        invalidate_namespace(namespace)
         
         # 4.5 Save PDF permanently to media/uploads
         import shutil
@@ -183,6 +208,9 @@ def ingest_pdf(file_obj, namespace: str) -> Dict[str, Any]:
         except Exception as db_err:
             print(f"[FAISS] Warning: Could not save DB record: {db_err}")
 
+        INGEST_DURATION.observe(time.time() - ingest_start)
+        INGEST_PAGES.inc(len(docs))
+        INGEST_CHUNKS.inc(len(valid_chunks))
         return result
     finally:
         os.unlink(tmp_path)
@@ -221,9 +249,12 @@ def search_documents(namespace: str, query: str, k: int = 5) -> List[Dict[str, s
 # ─────────────────────────────────────────────
 
 def delete_namespace(namespace: str) -> bool:
-    """Delete FAISS index, PDF file, and DB record."""
+    """Delete FAISS index, PDF file, DB record, and cached answers."""
     import shutil
-    
+    from api.cache.semantic import invalidate_namespace
+
+    invalidate_namespace(namespace)
+
     # 1. Delete index
     index_path = FAISS_INDEX_DIR / namespace
     deleted = False
@@ -296,6 +327,10 @@ def cleanup_old_indexes(max_age_hours: int = 48):
             if age > timedelta(hours=max_age_hours):
                 os.unlink(f)
 
+    from api.cache.semantic import invalidate_namespace
+    for namespace in deleted:
+        invalidate_namespace(namespace)
+
     if deleted:
         print(f"[FAISS] Auto-cleanup: removed {len(deleted)} old indexes → {deleted}")
     return deleted
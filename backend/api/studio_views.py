@@ -2,34 +2,97 @@
 Studio views — NotebookLM-style content generation endpoints.
 Uses the project's Gemini Flash LLM (via OpenRouter) for high-quality generation.
 TTS audio still uses HuggingFace Inference API.
+Each generator is a plain function (context → payload) so the single-artefact
+views and the batch endpoint share the same prompts and parsing.
 """
 import os
+import re
 import json
+import time
+import io
+import contextvars
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import StreamingHttpResponse, HttpResponse, FileResponse
 
 from api.core.llms import STUDIO_LLM
+from api.cache.store import SQLiteCache, hash_key
+from api.core.metrics import record_cache
+from api.core.limiter import BATCH, Overloaded, llm_priority
+from api.core.config import (
+    PROMPT_TOKEN_BUDGETS,
+    STUDIO_CACHE_ENABLED,
+    STUDIO_CACHE_MAX_ENTRIES,
+    STUDIO_CACHE_TTL_HOURS,
+    STUDIO_AUDIO_MAX_FILES,
+)
+from api.utils.context import truncate_to_tokens
 
 HF_API_TOKEN = os.getenv("HF_API_TOKEN", "")
 HF_API_URL = "https://router.huggingface.co/hf-inference/models"
 TTS_MODEL = "facebook/mms-tts-eng"
 
 
+class StudioError(Exception):
+    """A generator failed in a way the client should see (message + HTTP status)."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Bump a generator's version whenever its prompt or parsing changes, so stale artefacts are not served
+PROMPT_VERSIONS = {
+    "study_guide": 1,
+    "briefing": 1,
+    "flashcards": 1,
+    "key_topics": 1,
+    "faq": 1,
+    "audio": 2,
+}
+# Token budget each generator packs its context to (the cache key hashes the packed text)
+CONTEXT_BUDGETS = {"audio": "studio_audio"}
+
+_artifact_cache = SQLiteCache(
+    "studio_artifacts",
+    max_entries=STUDIO_CACHE_MAX_ENTRIES,
+    default_ttl=STUDIO_CACHE_TTL_HOURS * 3600 if STUDIO_CACHE_TTL_HOURS else None,
+)
+
+
+def pack_context(context: str, budget: str = "studio") -> str:
+    """Source material trimmed on sentence boundaries to the generator's token budget"""
+    return truncate_to_tokens(context, PROMPT_TOKEN_BUDGETS[budget])
+
+
+def generate(prompt: str):
+    """STUDIO_LLM call queued behind interactive chat in the LLM limiter"""
+    with llm_priority(BATCH):
+        return STUDIO_LLM.invoke(prompt)
+
+
+def overloaded_response(error: Overloaded) -> Response:
+    response = Response(
+        {"error": "Studio is busy right now, please retry shortly.", "retry_after": int(error.retry_after + 0.5)},
+        status=503,
+    )
+    response["Retry-After"] = str(int(error.retry_after + 0.5))
+    return response
+
+
 # ─────────────────────────────────────────────
 # Study Guide
 # ─────────────────────────────────────────────
-class StudioStudyGuideView(APIView):
-    def post(self, request):
-        context = request.data.get("context", "").strip()
-        if not context:
-            return Response({"error": "No context provided"}, status=400)
-
-        prompt = f"""You are an expert academic tutor creating a comprehensive study guide.
+def study_guide(context: str) -> dict:
+    prompt = f"""You are an expert academic tutor creating a comprehensive study guide.
 
 Source Material:
-{context[:6000]}
+{pack_context(context)}
 
 Create a detailed study guide with these EXACT sections:
 
@@ -51,26 +114,18 @@ Generate 5 practice questions with brief answers.
 
 Use markdown formatting. Be thorough but concise."""
 
-        try:
-            response = STUDIO_LLM.invoke(prompt)
-            return Response({"content": response.content})
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+    response = generate(prompt)
+    return {"content": response.content}
 
 
 # ─────────────────────────────────────────────
 # Briefing Document
 # ─────────────────────────────────────────────
-class StudioBriefingView(APIView):
-    def post(self, request):
-        context = request.data.get("context", "").strip()
-        if not context:
-            return Response({"error": "No context provided"}, status=400)
-
-        prompt = f"""Create a professional executive briefing document from this content.
+def briefing(context: str) -> dict:
+    prompt = f"""Create a professional executive briefing document from this content.
 
 Source Material:
-{context[:6000]}
+{pack_context(context)}
 
 Format with these EXACT sections:
 
@@ -91,26 +146,18 @@ What aspects are NOT covered that might be important.
 
 Be concise and professional. Use markdown formatting."""
 
-        try:
-            response = STUDIO_LLM.invoke(prompt)
-            return Response({"content": response.content})
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+    response = generate(prompt)
+    return {"content": response.content}
 
 
 # ─────────────────────────────────────────────
 # Flashcards (NotebookLM-style)
 # ─────────────────────────────────────────────
-class StudioFlashcardsView(APIView):
-    def post(self, request):
-        context = request.data.get("context", "").strip()
-        if not context:
-            return Response({"error": "No context provided"}, status=400)
-
-        prompt = f"""You are generating study flashcards from academic content.
+def flashcards(context: str) -> dict:
+    prompt = f"""You are generating study flashcards from academic content.
 
 Source Material:
-{context[:6000]}
+{pack_context(context)}
 
 Generate exactly 10 flashcards as a JSON array. Each flashcard must have:
 - "question": A clear, specific question testing understanding
@@ -123,41 +170,37 @@ Cover the most important concepts from the material.
 Respond ONLY with a valid JSON array, no other text:
 [{{"question": "...", "answer": "...", "difficulty": "..."}}, ...]"""
 
-        try:
-            response = STUDIO_LLM.invoke(prompt)
-            content = response.content.strip()
-
-            # Extract JSON from response
-            json_start = content.find('[')
-            json_end = content.rfind(']') + 1
-            if json_start != -1 and json_end > json_start:
-                flashcards = json.loads(content[json_start:json_end])
-            else:
-                flashcards = json.loads(content)
-
-            if not isinstance(flashcards, list) or len(flashcards) == 0:
-                return Response({"error": "Could not generate flashcards"}, status=400)
-
-            return Response({"flashcards": flashcards})
-        except json.JSONDecodeError:
-            return Response({"error": "Failed to parse flashcard data"}, status=500)
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+    response = generate(prompt)
+    content = response.content.strip()
+
+    # Extract JSON from response
+    try:
+        json_start = content.find('[')
+        json_end = content.rfind(']') + 1
+        if json_start != -1 and json_end > json_start:
+            cards = json.loads(content[json_start:json_end])
+        else:
+            cards = json.loads(content)
+    except json.JSONDecodeError:
+        raise StudioError("Failed to parse flashcard data", 500)
+
+    if not isinstance(cards, list) or len(cards) == 0:
+        raise StudioError("Could not generate flashcards", 400)
+
+    return {"flashcards": cards}
 
 
 # ─────────────────────────────────────────────
 # Key Topics
 # ─────────────────────────────────────────────
-class StudioKeyTopicsView(APIView):
-    def post(self, request):
-        context = request.data.get("context", "").strip()
-        if not context:
-            return Response({"error": "No context provided"}, status=400)
+KEY_TOPICS_FALLBACK = {"topics": ["Unable to extract topics"], "entities": []}
+
 
-        prompt = f"""Extract the key topics and concepts from this academic content.
+def key_topics(context: str) -> dict:
+    prompt = f"""Extract the key topics and concepts from this academic content.
 
 Source Material:
-{context[:6000]}
+{pack_context(context)}
 
 Return a JSON object with:
 - "main_topic": The primary subject
@@ -167,43 +210,36 @@ Return a JSON object with:
 Respond ONLY with valid JSON:
 {{"main_topic": "...", "topics": ["...", "..."], "entities": ["...", "..."]}}"""
 
-        try:
-            response = STUDIO_LLM.invoke(prompt)
-            content = response.content.strip()
-
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                data = json.loads(content[json_start:json_end])
-            else:
-                data = json.loads(content)
-
-            topics = data.get("topics", [])
-            entities = data.get("entities", [])
-            main_topic = data.get("main_topic", "")
-
-            return Response({
-                "main_topic": main_topic,
-                "topics": topics,
-                "entities": entities
-            })
-        except Exception as e:
-            return Response({"topics": ["Unable to extract topics"], "entities": []}, status=200)
+    try:
+        response = generate(prompt)
+        content = response.content.strip()
+
+        json_start = content.find('{')
+        json_end = content.rfind('}') + 1
+        if json_start != -1 and json_end > json_start:
+            data = json.loads(content[json_start:json_end])
+        else:
+            data = json.loads(content)
+
+        return {
+            "main_topic": data.get("main_topic", ""),
+            "topics": data.get("topics", []),
+            "entities": data.get("entities", []),
+        }
+    except Overloaded:
+        raise
+    except Exception:
+        return dict(KEY_TOPICS_FALLBACK)
 
 
 # ─────────────────────────────────────────────
 # FAQ Generation (NEW)
 # ─────────────────────────────────────────────
-class StudioFAQView(APIView):
-    def post(self, request):
-        context = request.data.get("context", "").strip()
-        if not context:
-            return Response({"error": "No context provided"}, status=400)
-
-        prompt = f"""Generate a comprehensive FAQ from this academic content.
+def faq(context: str) -> dict:
+    prompt = f"""Generate a comprehensive FAQ from this academic content.
 
 Source Material:
-{context[:6000]}
+{pack_context(context)}
 
 Create exactly 10 frequently asked questions with detailed answers.
 Each answer should be 2-4 sentences and grounded in the source material.
@@ -214,33 +250,25 @@ Return as a JSON array:
 Cover: definitions, processes, comparisons, applications, and common misconceptions.
 Respond ONLY with the JSON array."""
 
-        try:
-            response = STUDIO_LLM.invoke(prompt)
-            content = response.content.strip()
+    response = generate(prompt)
+    content = response.content.strip()
 
-            json_start = content.find('[')
-            json_end = content.rfind(']') + 1
-            if json_start != -1 and json_end > json_start:
-                faqs = json.loads(content[json_start:json_end])
-            else:
-                faqs = json.loads(content)
+    json_start = content.find('[')
+    json_end = content.rfind(']') + 1
+    if json_start != -1 and json_end > json_start:
+        faqs = json.loads(content[json_start:json_end])
+    else:
+        faqs = json.loads(content)
 
-            return Response({"faqs": faqs})
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+    return {"faqs": faqs}
 
 
 # ─────────────────────────────────────────────
 # Audio Overview (TTS — HuggingFace model)
 # ─────────────────────────────────────────────
-class StudioAudioView(APIView):
-    def post(self, request):
-        context = request.data.get("context", "").strip()
-        if not context:
-            return Response({"error": "No context provided"}, status=400)
-
-        # Step 1: Use Gemini to create a short spoken-word audio script
-        script_prompt = f"""Create an intelligent, concise audio summary of the content below in exactly 3 to 4 short sentences.
+def audio_overview(context: str) -> dict:
+    # Step 1: Use Gemini to create a short spoken-word audio script
+    script_prompt = f"""Create an intelligent, concise audio summary of the content below in exactly 3 to 4 short sentences.
 Act as an expert podcast host explaining the core message.
 CRITICAL RULES:
 1. Explain the most crucial takeaway clearly and intelligently.
@@ -249,49 +277,293 @@ CRITICAL RULES:
 4. Keep the total length under 50 words to save tokens and ensure fast audio generation.
 
 Content:
-{context[:3000]}"""
-
+{pack_context(context, "studio_audio")}"""
+
+    try:
+        script_response = generate(script_prompt)
+        summary = script_response.content.strip()
+        # Clean any remaining markdown
+        summary = re.sub(r'[*#\[\]>_`~]', '', summary)
+        # Removed the arbitrary summary[:300] slice which caused abrupt endings
+    except Overloaded:
+        raise
+    except Exception:
+        summary = context[:200].replace('\n', ' ')
+        script_fallback = True
+    else:
+        script_fallback = False
+
+    # Step 2: Generate TTS audio using gTTS (Google TTS)
+    # Using gTTS because HuggingFace inference API is often rate-limited or requires pro tokens
+    try:
+        from gtts import gTTS
+
+        # Synthesise straight into memory and keep one MP3 per distinct script
+        audio_id = hash_key("gtts", "en", summary)[:32]
+        path = _audio_path(audio_id)
+        if not path.exists():
+            buffer = io.BytesIO()
+            gTTS(text=summary, lang='en', slow=False).write_to_fp(buffer)
+            _save_audio(path, buffer.getvalue())
+
+        payload = {
+            "audio_url": f"/studio/audio/{audio_id}.mp3",
+            "text": summary,
+            "format": "audio/mpeg"
+        }
+        if script_fallback:
+            payload["script_fallback"] = True
+        return payload
+
+    except ImportError:
+        return {
+            "text": summary,
+            "error": "gTTS library is missing. Please run `pip install gtts`."
+        }
+    except Exception as e:
+        print(f"[StudioAudioView] TTS Error: {e}")
+        return {
+            "text": summary,
+            "error": f"Audio generation temporarily unavailable: {str(e)}"
+        }
+
+
+def _audio_dir() -> Path:
+    from django.conf import settings
+    path = Path(getattr(settings, "CACHE_DIR", os.path.join(settings.MEDIA_ROOT, "cache"))) / "studio_audio"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _audio_path(audio_id: str) -> Path:
+    return _audio_dir() / f"{audio_id}.mp3"
+
+
+def _save_audio(path: Path, data: bytes):
+    """Atomic write, then drop the oldest files beyond STUDIO_AUDIO_MAX_FILES."""
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    files = sorted(path.parent.glob("*.mp3"), key=lambda f: f.stat().st_mtime)
+    for stale in files[:max(len(files) - STUDIO_AUDIO_MAX_FILES, 0)]:
+        stale.unlink(missing_ok=True)
+
+
+def _parse_range(header: str, size: int):
+    """(start, end) inclusive for a single 'bytes=' range, None if absent, False if unsatisfiable."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+GENERATORS = {
+    "study_guide": study_guide,
+    "briefing": briefing,
+    "flashcards": flashcards,
+    "key_topics": key_topics,
+    "faq": faq,
+    "audio": audio_overview,
+}
+
+
+def artifact_key(name: str, context: str) -> str:
+    """(generator, prompt version, hash of the context actually sent to the LLM)"""
+    packed = pack_context(context, CONTEXT_BUDGETS.get(name, "studio"))
+    return hash_key(name, PROMPT_VERSIONS[name], hash_key(packed))
+
+
+def _cacheable(payload: dict) -> bool:
+    """Fallbacks and partial results (e.g. audio without an MP3) are never cached."""
+    return (
+        "error" not in payload
+        and not payload.get("script_fallback")
+        and payload != KEY_TOPICS_FALLBACK
+    )
+
+
+def run_generator(name: str, context: str, regenerate: bool = False):
+    """
+    Returns (http_status, payload, cached) — never raises. Successful artefacts
+    are cached; regenerate skips the lookup and replaces the cached entry.
+    """
+    key = artifact_key(name, context) if STUDIO_CACHE_ENABLED else None
+    if key and not regenerate:
         try:
-            script_response = STUDIO_LLM.invoke(script_prompt)
-            summary = script_response.content.strip()
-            # Clean any remaining markdown
-            import re
-            summary = re.sub(r'[*#\[\]>_`~]', '', summary)
-            # Removed the arbitrary summary[:300] slice which caused abrupt endings
-        except Exception:
-            summary = context[:200].replace('\n', ' ')
-
-        # Step 2: Generate TTS audio using gTTS (Google TTS)
-        # Using gTTS because HuggingFace inference API is often rate-limited or requires pro tokens
+            payload = _artifact_cache.get(key)
+        except Exception as e:
+            print(f"[StudioCache] Lookup failed: {e}")
+            payload = None
+        if payload is not None and name == "audio" and payload.get("audio_url"):
+            if not _audio_path(payload["audio_url"].rsplit("/", 1)[-1][:-4]).exists():
+                payload = None
+        record_cache("studio", payload is not None)
+        if payload is not None:
+            return 200, payload, True
+
+    try:
+        payload = GENERATORS[name](context)
+    except Overloaded as e:
+        return 503, {"error": "Studio is busy right now, please retry shortly.", "retry_after": int(e.retry_after + 0.5)}, False
+    except StudioError as e:
+        return e.status_code, {"error": str(e)}, False
+    except Exception as e:
+        return 500, {"error": str(e)}, False
+
+    if key and _cacheable(payload):
         try:
-            from gtts import gTTS
-            import tempfile
-            import base64
-            
-            # Generate speech
-            tts = gTTS(text=summary, lang='en', slow=False)
-            
-            # Save to temporary file and read as base64
-            with tempfile.NamedTemporaryFile(delete=True, suffix=".mp3") as fp:
-                tts.save(fp.name)
-                fp.seek(0)
-                audio_bytes = fp.read()
-                audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-                
-            return Response({
-                "audio_base64": audio_b64,
-                "text": summary,
-                "format": "audio/mpeg"
-            })
-            
-        except ImportError:
-            return Response({
-                "text": summary,
-                "error": "gTTS library is missing. Please run `pip install gtts`."
-            }, status=200)
+            _artifact_cache.set(key, payload)
         except Exception as e:
-            print(f"[StudioAudioView] TTS Error: {e}")
-            return Response({
-                "text": summary,
-                "error": f"Audio generation temporarily unavailable: {str(e)}"
-            }, status=200)
+            print(f"[StudioCache] Store failed: {e}")
+    return 200, payload, False
+
+
+def _regenerate_flag(request) -> bool:
+    return str(request.data.get("regenerate", False)).lower() in ("1", "true")
+
+
+class StudioGeneratorView(APIView):
+    """POST {"context": ..., "regenerate": false} → one Studio artefact (X-Studio-Cache: hit | miss)."""
+    generator = ""
+
+    def post(self, request):
+        context = request.data.get("context", "").strip()
+        if not context:
+            return Response({"error": "No context provided"}, status=400)
+
+        status_code, payload, cached = run_generator(self.generator, context, _regenerate_flag(request))
+        response = Response(payload, status=status_code)
+        response["X-Studio-Cache"] = "hit" if cached else "miss"
+        if status_code == 503:
+            response["Retry-After"] = str(payload["retry_after"])
+        return response
+
+
+class StudioStudyGuideView(StudioGeneratorView):
+    generator = "study_guide"
+
+
+class StudioBriefingView(StudioGeneratorView):
+    generator = "briefing"
+
+
+class StudioFlashcardsView(StudioGeneratorView):
+    generator = "flashcards"
+
+
+class StudioKeyTopicsView(StudioGeneratorView):
+    generator = "key_topics"
+
+
+class StudioFAQView(StudioGeneratorView):
+    generator = "faq"
+
+
+class StudioAudioView(StudioGeneratorView):
+    """Returns the script text and an audio_url (relative to the API base) for the MP3."""
+    generator = "audio"
+
+
+class StudioAudioFileView(APIView):
+    """
+    GET /api/studio/audio/<audio_id>.mp3
+    Serves the MP3 as audio/mpeg with Content-Length and single-range
+    (206 Partial Content) support, so playback starts before the download ends.
+    """
+
+    def get(self, request, audio_id):
+        path = _audio_path(audio_id)
+        if not path.exists():
+            return Response({"error": "Audio not found"}, status=404)
+
+        size = path.stat().st_size
+        byte_range = _parse_range(request.headers.get("Range", ""), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        elif byte_range is None:
+            response = FileResponse(open(path, "rb"), content_type="audio/mpeg")
+            response["Content-Length"] = str(size)
+        else:
+            start, end = byte_range
+            with open(path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start + 1)
+            response = HttpResponse(data, status=206, content_type="audio/mpeg")
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(len(data))
+        response["Accept-Ranges"] = "bytes"
+        # Content-addressed: the same id always holds the same audio
+        response["Cache-Control"] = "public, max-age=86400, immutable"
+        return response
+
+
+# ─────────────────────────────────────────────
+# Generate All (batch)
+# ─────────────────────────────────────────────
+class StudioBatchView(APIView):
+    """
+    POST /api/studio/batch/
+    {"context": ..., "generators": ["study_guide", ...], "format": "ndjson" | "sse", "regenerate": false}
+    Runs the selected generators (default: all) concurrently on one upload of
+    the context and streams each artefact as soon as it is ready (cached
+    artefacts come back immediately):
+        {"type": "artifact", "generator": ..., "status": 200, "cached": false, "data": {...}}
+    followed by {"type": "done", ...}.
+    """
+
+    def post(self, request):
+        context = request.data.get("context", "").strip()
+        if not context:
+            return Response({"error": "No context provided"}, status=400)
+
+        names = request.data.get("generators") or list(GENERATORS)
+        unknown = [n for n in names if n not in GENERATORS]
+        if unknown:
+            return Response(
+                {"error": f"Unknown generators: {', '.join(unknown)}", "available": list(GENERATORS)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        names = list(dict.fromkeys(names))
+        use_sse = request.data.get("format", "ndjson") == "sse"
+        regenerate = _regenerate_flag(request)
+
+        def encode(event: dict) -> str:
+            body = json.dumps(event)
+            return f"data: {body}\n\n" if use_sse else body + "\n"
+
+        def event_stream():
+            start = time.time()
+            pool = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="mars-studio")
+            try:
+                futures = {
+                    pool.submit(contextvars.copy_context().run, run_generator, name, context, regenerate): name
+                    for name in names
+                }
+                for future in as_completed(futures):
+                    status_code, payload, cached = future.result()
+                    yield encode({
+                        "type": "artifact",
+                        "generator": futures[future],
+                        "status": status_code,
+                        "cached": cached,
+                        "data": payload,
+                    })
+                yield encode({"type": "done", "generators": names, "elapsed_time": round(time.time() - start, 2)})
+            finally:
+                pool.shutdown(wait=False)
+
+        content_type = "text/event-stream" if use_sse else "application/x-ndjson"
+        response = StreamingHttpResponse(event_stream(), content_type=content_type)
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -1,13 +1,13 @@
-from django.urls import path
+from django.urls import path, re_path
 from api.views import (
     ChatView, StreamingChatView, UploadView, ExportView, 
     NamespaceView, StatusView, AgentsView, StudyCardsView, 
-    ExamOracleView, DocumentView
+    ExamOracleView, QuestionPaperView, DocumentView, MetricsView
 )
 from api.studio_views import (
     StudioStudyGuideView, StudioBriefingView,
     StudioFlashcardsView, StudioKeyTopicsView, StudioAudioView,
-    StudioFAQView
+    StudioFAQView, StudioBatchView, StudioAudioFileView
 )
 
 urlpatterns = [
@@ -17,16 +17,20 @@ urlpatterns = [
     path('export/', ExportView.as_view(), name='export'),
     path('namespace/', NamespaceView.as_view(), name='namespace'),
     path('status/', StatusView.as_view(), name='status'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('agents/', AgentsView.as_view(), name='agents'),
     path('study-cards/', StudyCardsView.as_view(), name='study-cards'),
     path('exam-oracle/', ExamOracleView.as_view(), name='exam-oracle'),
+    path('exam-oracle/papers/', QuestionPaperView.as_view(), name='exam-oracle-papers'),
     # Studio (NotebookLM-style features)
     path('studio/study-guide/', StudioStudyGuideView.as_view(), name='studio-study-guide'),
     path('studio/briefing/', StudioBriefingView.as_view(), name='studio-briefing'),
     path('studio/flashcards/', StudioFlashcardsView.as_view(), name='studio-flashcards'),
     path('studio/key-topics/', StudioKeyTopicsView.as_view(), name='studio-key-topics'),
     path('studio/audio/', StudioAudioView.as_view(), name='studio-audio'),
+    re_path(r'^studio/audio/(?P<audio_id>[0-9a-f]{32})\.mp3$', StudioAudioFileView.as_view(), name='studio-audio-file'),
     path('studio/faq/', StudioFAQView.as_view(), name='studio-faq'),
+    path('studio/batch/', StudioBatchView.as_view(), name='studio-batch'),
     path('document/', DocumentView.as_view(), name='document'),
 ]
 
@@ -0,0 +1,99 @@
+"""
+Token-budgeted context packing for prompts.
+Replaces fixed character slices: sections are measured in real tokens,
+filled in relevance order, and trimmed on sentence boundaries.
+"""
+import re
+from typing import List, Optional, Sequence
+
+from api.utils.tokens import count_tokens, _get_encoding
+
+# Items that would be cut below this many tokens are dropped instead
+MIN_ITEM_TOKENS = 40
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split on sentence terminators and paragraph breaks."""
+    parts = _SENTENCE_END.split(text)
+    return [p for p in parts if p and p.strip()]
+
+
+def _hard_cut(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text at the last sentence boundary that fits in max_tokens, keeping the
+    original formatting. Falls back to a hard token cut only when the first
+    sentence alone is too long.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    # Binary search over sentence boundaries — token count grows with prefix length
+    boundaries = [m.start() for m in _SENTENCE_END.finditer(text)]
+    best = None
+    lo, hi = 0, len(boundaries) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if count_tokens(text[:boundaries[mid]]) <= max_tokens:
+            best = boundaries[mid]
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if not best:
+        return _hard_cut(text, max_tokens)
+    return text[:best]
+
+
+def pack_texts(texts: Sequence[str], max_tokens: int, per_item: Optional[int] = None) -> List[str]:
+    """
+    Fit texts (most relevant first) into max_tokens. Each item is capped at
+    per_item tokens; the first item that no longer fits is trimmed to the
+    remaining budget and packing stops there.
+    """
+    packed: List[str] = []
+    remaining = max_tokens
+    for text in texts:
+        if remaining < MIN_ITEM_TOKENS:
+            break
+        limit = min(per_item, remaining) if per_item else remaining
+        piece = truncate_to_tokens(text, limit)
+        cost = count_tokens(piece)
+        if cost < MIN_ITEM_TOKENS and cost < count_tokens(text):
+            break
+        packed.append(piece)
+        remaining -= cost
+    return packed
+
+
+def pack_history(messages: Sequence, max_tokens: int) -> str:
+    """
+    Newest-first packing of chat messages (objects with .role/.content) into
+    max_tokens; returned in chronological order as 'ROLE: content' lines.
+    """
+    lines: List[str] = []
+    remaining = max_tokens
+    for message in reversed(list(messages)):
+        if remaining < MIN_ITEM_TOKENS:
+            break
+        line = truncate_to_tokens(f"{message.role.upper()}: {message.content}", remaining)
+        if not line:
+            break
+        lines.append(line)
+        remaining -= count_tokens(line)
+    return "\n".join(reversed(lines))
+
+
+def remaining_budget(total_tokens: int, *used_texts: str) -> int:
+    """Tokens left for the variable sections after the fixed parts of a prompt."""
+    return max(total_tokens - sum(count_tokens(t) for t in used_texts), 0)
@@ -0,0 +1,95 @@
+"""
+Local grounding scorer for the Critic.
+Splits the draft answer into sentences, embeds them together with the
+retrieved chunks in one batch (the same fastembed model as the FAISS index),
+and marks a sentence as supported when it is semantically close to some chunk
+and shares enough of its wording. CPU only — no LLM call.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from api.utils.context import split_sentences
+from api.core.config import GROUNDING_SENTENCE_SIMILARITY, GROUNDING_NGRAM_OVERLAP
+
+# Sentences shorter than this (headings, "Sure!", list stubs) are not scored
+MIN_SENTENCE_WORDS = 4
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MARKDOWN = re.compile(r"[*#>`_|~\[\]]")
+_LIST_MARKER = re.compile(r"^\s*(?:[-•]+|\d{1,3}[.)])\s+")
+
+
+@dataclass
+class GroundingResult:
+    score: float                      # % of answer words in supported sentences, 0-100
+    sentences: int
+    supported: int
+    mean_similarity: float
+    unsupported: List[str] = field(default_factory=list)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _bigrams(words: Sequence[str]) -> set:
+    return set(zip(words, words[1:]))
+
+
+def _answer_sentences(answer: str) -> List[str]:
+    sentences = []
+    for line in answer.splitlines():
+        line = _LIST_MARKER.sub("", _MARKDOWN.sub(" ", line)).strip()
+        for sentence in split_sentences(line):
+            if len(_words(sentence)) >= MIN_SENTENCE_WORDS:
+                sentences.append(sentence.strip())
+    return sentences
+
+
+def score_grounding(answer: str, chunks: Sequence[str]) -> Optional[GroundingResult]:
+    """
+    Score how much of answer is supported by chunks (retrieved passages).
+    None when there is nothing to score on either side, so the caller falls
+    back to the LLM check instead of deciding locally.
+    """
+    sentences = _answer_sentences(answer)
+    chunks = [c for c in chunks if c and c.strip()]
+    if not sentences or not chunks:
+        return None
+
+    from api.storage.faiss_store import _get_embeddings
+
+    vectors = np.asarray(_get_embeddings().embed_documents(sentences + list(chunks)), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+    similarity = vectors[:len(sentences)] @ vectors[len(sentences):].T   # sentences × chunks
+    best_chunk = similarity.argmax(axis=1)
+    best_sim = similarity.max(axis=1)
+
+    chunk_bigrams = [_bigrams(_words(c)) for c in chunks]
+    supported_words = total_words = supported = 0
+    unsupported = []
+    for i, sentence in enumerate(sentences):
+        words = _words(sentence)
+        grams = _bigrams(words)
+        overlap = len(grams & chunk_bigrams[best_chunk[i]]) / len(grams) if grams else 0.0
+        # Near-verbatim sentences pass on similarity alone; paraphrases also need shared wording
+        ok = best_sim[i] >= GROUNDING_SENTENCE_SIMILARITY + 0.15 or (
+            best_sim[i] >= GROUNDING_SENTENCE_SIMILARITY and overlap >= GROUNDING_NGRAM_OVERLAP
+        )
+        total_words += len(words)
+        if ok:
+            supported += 1
+            supported_words += len(words)
+        else:
+            unsupported.append(sentence)
+
+    return GroundingResult(
+        score=round(100.0 * supported_words / total_words, 1),
+        sentences=len(sentences),
+        supported=supported,
+        mean_similarity=round(float(best_sim.mean()), 3),
+        unsupported=unsupported,
+    )
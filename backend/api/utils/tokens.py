@@ -0,0 +1,28 @@
+"""
+Token counting helpers for prompt budgeting.
+Uses tiktoken (installed with langchain-openai); falls back to a
+~4 characters-per-token estimate if the encoding cannot be loaded.
+"""
+from functools import lru_cache
+
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        print(f"[Tokens] tiktoken unavailable, using length estimate: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens in text."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
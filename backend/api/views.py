@@ -7,7 +7,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.http import FileResponse, StreamingHttpResponse
+from django.http import FileResponse, StreamingHttpResponse, HttpResponse
 import json
 
 from api.serializers import (
@@ -16,8 +16,12 @@ from api.serializers import (
     ExportRequestSerializer,
     NamespaceDeleteSerializer,
 )
-from api.core.state import MARSState, ChatMessage
+from api.core.state import MARSState, ChatMessage, RetrievedSource, AgentLog
 from api.graph.workflow import build_graph
+from api.core.deadline import new_deadline
+from api.core.limiter import LLM_LIMITER, INTERACTIVE, BATCH, Overloaded, llm_priority
+from api.core.tracing import start_trace, span, new_trace_id
+from api.core import metrics
 from api.storage.pdf_loader import load_pdf
 from api.storage.chunker import chunk_documents
 from api.storage.faiss_store import delete_namespace
@@ -90,8 +94,10 @@ WORKFLOW_GRAPH = {
         {"from": "planner", "to": "student_scout", "condition": "Student Mode + New Query"},
         {"from": "planner", "to": "research_scout", "condition": "Research Mode"},
         {"from": "planner", "to": "scribe", "condition": "Greeting / Feedback"},
-        {"from": "student_scout", "to": "analyst", "condition": "Always"},
-        {"from": "research_scout", "to": "analyst", "condition": "Always"},
+        {"from": "student_scout", "to": "analyst", "condition": "Context over token budget"},
+        {"from": "research_scout", "to": "analyst", "condition": "Context over token budget"},
+        {"from": "student_scout", "to": "scribe", "condition": "Fast path: small context"},
+        {"from": "research_scout", "to": "scribe", "condition": "Fast path: small context"},
         {"from": "analyst", "to": "scribe", "condition": "Always"},
         {"from": "scribe", "to": "critic", "condition": "Student Mode + New Query"},
         {"from": "scribe", "to": "end", "condition": "Research / Simple"},
@@ -100,6 +106,165 @@ WORKFLOW_GRAPH = {
 }
 
 
+def _lookup_cached_answer(state: MARSState):
+    """
+    Serves new queries from the answer caches: the semantic cache for Student Mode,
+    the normalized-query TTL cache for Research Mode.
+    Runs the Planner first (LLM-free, without building conversation memory — the
+    graph's Planner does that on a miss) so only cacheable intents are looked up.
+    Returns the final MARSState on a hit, None on a miss.
+    """
+    from api.council.planner import PlannerAgent
+    from api.cache import semantic, research
+
+    start = time.time()
+    planned = PlannerAgent().run(state.model_copy(deep=True), build_memory=False)
+    if planned.intent != "new_query":
+        return None
+
+    # Both caches key answers on the question alone, so only questions asked without
+    # earlier conversation (which the answer could depend on) are served or stored
+    if planned.mode == "student" and planned.namespace:
+        if planned.chat_history:
+            return None
+        entry = semantic.lookup(planned.namespace, planned.user_query)
+        if entry is None:
+            return None
+        log = AgentLog(
+            agent="Answer Cache", icon="bolt", status="completed",
+            duration_ms=int((time.time() - start) * 1000),
+            thinking=f"Matched cached question '{entry['query'][:80]}' (similarity {entry['similarity']:.3f})",
+            output_preview="Served cached answer — skipped Scout, Analyst, Scribe and Critic",
+            details={
+                "cache": "semantic",
+                "similarity": round(entry["similarity"], 4),
+                "cached_query": entry["query"][:200],
+                "hits": entry["hits"],
+            }
+        )
+    elif planned.mode == "research":
+        if planned.chat_history:
+            return None
+        entry = research.lookup(planned.user_query, deep=planned.deep_research)
+        if entry is None:
+            return None
+        age_min = int((time.time() - entry["created_at"]) / 60)
+        log = AgentLog(
+            agent="Answer Cache", icon="bolt", status="completed",
+            duration_ms=int((time.time() - start) * 1000),
+            thinking=f"Research answer for '{entry['query'][:80]}' cached {age_min} min ago",
+            output_preview="Served cached research answer — skipped source search and synthesis",
+            details={
+                "cache": "research",
+                "cached_query": entry["query"][:200],
+                "age_minutes": age_min,
+            }
+        )
+    else:
+        return None
+
+    planned.draft_answer = entry["answer"]
+    planned.retrieved_sources = [RetrievedSource(**s) for s in entry["sources"]]
+    planned.papers_metadata = entry.get("papers_metadata", [])
+    planned.grounding_score = entry.get("grounding_score")
+    planned.critic_status = entry.get("critic_status")
+    planned.critic_reason = entry.get("critic_reason")
+    planned.agent_logs.append(log)
+    return planned
+
+
+def _store_cached_answer(final_state: MARSState):
+    """Caches successful new-query answers for later repeats."""
+    from api.cache import semantic, research
+
+    if final_state.intent != "new_query" or not final_state.retrieved_sources or not final_state.draft_answer:
+        return
+    if any(log.status in ("error", "degraded") for log in final_state.agent_logs):
+        return
+
+    payload = {
+        "answer": final_state.draft_answer,
+        "sources": [s.model_dump() for s in final_state.retrieved_sources[:5]],
+        "grounding_score": final_state.grounding_score,
+        "critic_status": final_state.critic_status,
+        "critic_reason": final_state.critic_reason,
+    }
+    if final_state.mode == "student" and final_state.critic_status == "approved" and not final_state.chat_history:
+        semantic.store(final_state.namespace, final_state.user_query, payload)
+    elif final_state.mode == "research" and not final_state.chat_history:
+        payload["papers_metadata"] = final_state.papers_metadata or []
+        research.store(final_state.user_query, payload, deep=final_state.deep_research)
+
+
+def _record_metrics(final_state: MARSState, elapsed: float, cache_hit: bool):
+    metrics.REQUEST_LATENCY.observe(
+        elapsed, mode=final_state.mode, intent=final_state.intent, cache_hit=str(cache_hit).lower()
+    )
+    for log in final_state.agent_logs:
+        metrics.AGENT_DURATION.observe(log.duration_ms / 1000, agent=log.agent, status=log.status)
+
+
+def _overloaded_response(error: Overloaded) -> Response:
+    """503 with Retry-After when LLM admission control turns a request away."""
+    metrics.REQUEST_ERRORS.inc(endpoint="overloaded")
+    response = Response(
+        {"error": "MARS is busy right now, please retry shortly.", "retry_after": int(error.retry_after + 0.5)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response['Retry-After'] = str(int(error.retry_after + 0.5))
+    return response
+
+
+def _run_pipeline(state: MARSState, bypass_cache: bool = False):
+    """
+    Returns (final_state, cache_hit). Checks the answer caches before running the
+    LangGraph workflow, and caches the result afterwards. bypass_cache forces a
+    fresh run (the fresh answer still replaces the cached one).
+    """
+    cached = None
+    if not bypass_cache:
+        with span("answer_cache.lookup") as lookup_span:
+            try:
+                cached = _lookup_cached_answer(state)
+            except Exception as e:
+                print(f"[AnswerCache] Lookup failed: {e}")
+            lookup_span.set(hit=cached is not None)
+    if cached is not None:
+        return cached, True
+
+    graph = build_graph()
+    final_state_raw = graph.invoke(state.model_dump())
+
+    # Reconstruct state — handle both dict and MARSState returns
+    if isinstance(final_state_raw, dict):
+        # Extract only known fields to avoid issues
+        final_state = MARSState(
+            user_query=final_state_raw.get('user_query', state.user_query),
+            mode=final_state_raw.get('mode', state.mode),
+            namespace=final_state_raw.get('namespace', state.namespace),
+            deep_research=final_state_raw.get('deep_research', state.deep_research),
+            chat_history=final_state_raw.get('chat_history', state.chat_history),
+            intent=final_state_raw.get('intent'),
+            answer_type=final_state_raw.get('answer_type'),
+            retrieved_sources=final_state_raw.get('retrieved_sources', []),
+            refined_context=final_state_raw.get('refined_context'),
+            draft_answer=final_state_raw.get('draft_answer'),
+            critic_status=final_state_raw.get('critic_status'),
+            critic_reason=final_state_raw.get('critic_reason'),
+            grounding_score=final_state_raw.get('grounding_score'),
+            papers_metadata=final_state_raw.get('papers_metadata', []),
+            agent_logs=final_state_raw.get('agent_logs', []),
+        )
+    else:
+        final_state = final_state_raw
+
+    try:
+        _store_cached_answer(final_state)
+    except Exception as e:
+        print(f"[AnswerCache] Store failed: {e}")
+    return final_state, False
+
+
 class ChatView(APIView):
     """
     POST /api/chat/
@@ -116,6 +281,8 @@ class ChatView(APIView):
         mode = data['mode']
         namespace = data.get('namespace', '')
         history_data = data.get('chat_history', [])
+        bypass_cache = data.get('bypass_cache', False)
+        deep_research = data.get('deep_research', False)
 
         # Build chat history
         chat_history = [
@@ -128,38 +295,20 @@ class ChatView(APIView):
             user_query=query,
             mode=mode,
             namespace=namespace,
-            chat_history=chat_history
+            chat_history=chat_history,
+            deep_research=deep_research,
+            deadline=new_deadline(),
         )
 
         try:
-            # Execute the LangGraph workflow
+            # Execute the LangGraph workflow (or serve from the answer cache)
             start_time = time.time()
-            graph = build_graph()
-            final_state_raw = graph.invoke(state.model_dump())
-
-            # Reconstruct state — handle both dict and MARSState returns
-            if isinstance(final_state_raw, dict):
-                # Extract only known fields to avoid issues
-                final_state = MARSState(
-                    user_query=final_state_raw.get('user_query', query),
-                    mode=final_state_raw.get('mode', mode),
-                    namespace=final_state_raw.get('namespace', namespace),
-                    chat_history=final_state_raw.get('chat_history', chat_history),
-                    intent=final_state_raw.get('intent'),
-                    answer_type=final_state_raw.get('answer_type'),
-                    retrieved_sources=final_state_raw.get('retrieved_sources', []),
-                    refined_context=final_state_raw.get('refined_context'),
-                    draft_answer=final_state_raw.get('draft_answer'),
-                    critic_status=final_state_raw.get('critic_status'),
-                    critic_reason=final_state_raw.get('critic_reason'),
-                    grounding_score=final_state_raw.get('grounding_score'),
-                    papers_metadata=final_state_raw.get('papers_metadata', []),
-                    agent_logs=final_state_raw.get('agent_logs', []),
-                )
-            else:
-                final_state = final_state_raw
+            with start_trace("chat", mode=mode) as trace:
+                final_state, cache_hit = _run_pipeline(state, bypass_cache=bypass_cache)
+                trace.set(intent=final_state.intent, cache_hit=cache_hit)
 
             elapsed = time.time() - start_time
+            _record_metrics(final_state, elapsed, cache_hit)
 
             # Serialize sources
             sources = []
@@ -205,13 +354,20 @@ class ChatView(APIView):
                     for log in agent_logs
                 ],
                 "elapsed_time": round(elapsed, 2),
+                "cache_hit": cache_hit,
             }
 
-            return Response(response_data, status=status.HTTP_200_OK)
+            response = Response(response_data, status=status.HTTP_200_OK)
+            response['X-Trace-Id'] = trace.trace_id
+            return response
+
+        except Overloaded as e:
+            return _overloaded_response(e)
 
         except Exception as e:
             import traceback
             traceback.print_exc()
+            metrics.REQUEST_ERRORS.inc(endpoint="chat")
             return Response(
                 {"error": f"Processing failed: {str(e)}", "traceback": traceback.format_exc()},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -231,6 +387,8 @@ class StreamingChatView(APIView):
         mode = data.get('mode', 'student')
         namespace = data.get('namespace', '')
         history_data = data.get('chat_history', [])
+        bypass_cache = str(data.get('bypass_cache', False)).lower() in ('1', 'true')
+        deep_research = str(data.get('deep_research', False)).lower() in ('1', 'true')
 
         if not query:
             return Response({"error": "No query provided"}, status=status.HTTP_400_BAD_REQUEST)
@@ -244,36 +402,27 @@ class StreamingChatView(APIView):
             user_query=query,
             mode=mode,
             namespace=namespace,
-            chat_history=chat_history
+            chat_history=chat_history,
+            deep_research=deep_research,
+            deadline=new_deadline(),
         )
 
+        # Reject up front while the chat queue is full — once streaming starts the status is fixed
+        if LLM_LIMITER.is_full(INTERACTIVE):
+            return _overloaded_response(Overloaded(INTERACTIVE, LLM_LIMITER.retry_after(INTERACTIVE)))
+
+        trace_id = new_trace_id()
+
         def event_stream():
+            metrics.ACTIVE_STREAMS.inc()
             try:
                 start_time = time.time()
-                graph = build_graph()
-                final_state_raw = graph.invoke(state.model_dump())
-
-                if isinstance(final_state_raw, dict):
-                    final_state = MARSState(
-                        user_query=final_state_raw.get('user_query', query),
-                        mode=final_state_raw.get('mode', mode),
-                        namespace=final_state_raw.get('namespace', namespace),
-                        chat_history=final_state_raw.get('chat_history', chat_history),
-                        intent=final_state_raw.get('intent'),
-                        answer_type=final_state_raw.get('answer_type'),
-                        retrieved_sources=final_state_raw.get('retrieved_sources', []),
-                        refined_context=final_state_raw.get('refined_context'),
-                        draft_answer=final_state_raw.get('draft_answer'),
-                        critic_status=final_state_raw.get('critic_status'),
-                        critic_reason=final_state_raw.get('critic_reason'),
-                        grounding_score=final_state_raw.get('grounding_score'),
-                        papers_metadata=final_state_raw.get('papers_metadata', []),
-                        agent_logs=final_state_raw.get('agent_logs', []),
-                    )
-                else:
-                    final_state = final_state_raw
+                with start_trace("chat.stream", trace_id=trace_id, mode=mode) as trace:
+                    final_state, cache_hit = _run_pipeline(state, bypass_cache=bypass_cache)
+                    trace.set(intent=final_state.intent, cache_hit=cache_hit)
 
                 elapsed = time.time() - start_time
+                _record_metrics(final_state, elapsed, cache_hit)
 
                 # Stream agent logs first
                 agent_logs = []
@@ -314,16 +463,24 @@ class StreamingChatView(APIView):
                         for s in final_state.retrieved_sources[:5]
                     ]
 
-                yield f"data: {json.dumps({'type': 'done', 'metadata': {'mode': final_state.mode, 'intent': final_state.intent, 'grounding_score': final_state.grounding_score, 'critic_status': final_state.critic_status, 'elapsed_time': round(elapsed, 2), 'agent_logs': agent_logs, 'retrieved_sources': sources, 'papers_metadata': final_state.papers_metadata or []}})}\n\n"
+                yield f"data: {json.dumps({'type': 'done', 'metadata': {'mode': final_state.mode, 'intent': final_state.intent, 'grounding_score': final_state.grounding_score, 'critic_status': final_state.critic_status, 'elapsed_time': round(elapsed, 2), 'cache_hit': cache_hit, 'agent_logs': agent_logs, 'retrieved_sources': sources, 'papers_metadata': final_state.papers_metadata or []}})}\n\n"
+
+            except Overloaded as e:
+                metrics.REQUEST_ERRORS.inc(endpoint="overloaded")
+                yield f"data: {json.dumps({'type': 'error', 'message': str(e), 'retry_after': int(e.retry_after + 0.5)})}\n\n"
 
             except Exception as e:
                 import traceback
                 traceback.print_exc()
+                metrics.REQUEST_ERRORS.inc(endpoint="chat_stream")
                 yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            finally:
+                metrics.ACTIVE_STREAMS.dec()
 
         response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
         response['Cache-Control'] = 'no-cache'
         response['X-Accel-Buffering'] = 'no'
+        response['X-Trace-Id'] = trace_id
         return response
 
 
@@ -379,20 +536,24 @@ class ExportView(APIView):
 
         try:
             tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-            success = export_answer_to_pdf(
-                tmp.name,
-                data['question'],
-                data['answer'],
-                data.get('sources', [])
-            )
+            with start_trace("pdf_export", answer_chars=len(data['answer'])) as trace:
+                success = export_answer_to_pdf(
+                    tmp.name,
+                    data['question'],
+                    data['answer'],
+                    data.get('sources', [])
+                )
+                trace.set(success=success)
 
             if success:
-                return FileResponse(
+                response = FileResponse(
                     open(tmp.name, 'rb'),
                     content_type='application/pdf',
                     as_attachment=True,
                     filename=f"MARS_QA_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
                 )
+                response['X-Trace-Id'] = trace.trace_id
+                return response
             else:
                 return Response(
                     {"error": "Failed to generate PDF"},
@@ -450,6 +611,13 @@ class StatusView(APIView):
         })
 
 
+class MetricsView(APIView):
+    """GET /api/metrics/ — Prometheus text exposition of request, agent, LLM, cache and ingest metrics."""
+
+    def get(self, request):
+        return HttpResponse(metrics.render_latest(), content_type=metrics.CONTENT_TYPE)
+
+
 class AgentsView(APIView):
     """GET /api/agents/ — Return agent definitions and workflow graph."""
 
@@ -476,7 +644,8 @@ class StudyCardsView(APIView):
             state = MARSState(user_query="", mode="student", draft_answer=content)
             
             cartographer = CartographerAgent()
-            final_state = cartographer.run(state)
+            with llm_priority(BATCH):
+                final_state = cartographer.run(state)
             
             # Extract data from logs
             cards = []
@@ -494,6 +663,8 @@ class StudyCardsView(APIView):
                 "mind_map": mind_map
             }, status=status.HTTP_200_OK)
 
+        except Overloaded as e:
+            return _overloaded_response(e)
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -515,10 +686,12 @@ class ExamOracleView(APIView):
             state = MARSState(user_query=subject_code, mode="student")
             
             oracle = OracleAgent()
-            final_state = oracle.run(state)
+            with llm_priority(BATCH):
+                final_state = oracle.run(state)
             
             return Response({
                 "prediction": final_state.draft_answer,
+                "cached": any(log.details.get("cache") == "oracle" for log in final_state.agent_logs),
                 "logs": [
                     {
                         "agent": log.agent,
@@ -530,12 +703,71 @@ class ExamOracleView(APIView):
                 ]
             }, status=status.HTTP_200_OK)
 
+        except Overloaded as e:
+            return _overloaded_response(e)
         except Exception as e:
             import traceback
             traceback.print_exc()
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+
+class QuestionPaperView(APIView):
+    """
+    GET  /api/exam-oracle/papers/?subject_code=CS3491 — Papers and question clusters on file.
+    POST /api/exam-oracle/papers/ — Upload a past question paper PDF for the offline Oracle
+         (optional subject_code, regulation, session, year override what is detected).
+    """
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+
+    def get(self, request):
+        from api.models import QuestionPaper, QuestionCluster
+
+        subject_code = request.query_params.get('subject_code', '').upper().replace(' ', '')
+        papers = QuestionPaper.objects.all()
+        if subject_code:
+            papers = papers.filter(subject_code=subject_code)
+        data = [
+            {
+                "id": p.id,
+                "subject_code": p.subject_code,
+                "regulation": p.regulation,
+                "session": p.session,
+                "year": p.year,
+                "filename": p.filename,
+                "questions": p.question_count,
+                "created_at": p.created_at.isoformat(),
+            }
+            for p in papers
+        ]
+        clusters = QuestionCluster.objects.filter(subject_code=subject_code).count() if subject_code else None
+        return Response({"papers": data, "clusters": clusters}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
+        if not uploaded_file.name.lower().endswith('.pdf'):
+            return Response({"error": "Question papers must be PDF files"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            year = request.data.get('year')
+            from api.research.question_bank import ingest_question_paper
+            result = ingest_question_paper(
+                uploaded_file,
+                subject_code=request.data.get('subject_code', ''),
+                regulation=request.data.get('regulation', ''),
+                session=request.data.get('session', ''),
+                year=int(year) if year else None,
+            )
+            return Response(result, status=status.HTTP_200_OK if result["duplicate"] else status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class DocumentView(APIView):
     """
     GET /api/document/?namespace=<ns> 
@@ -197,7 +197,7 @@ function WelcomeScreen({ mode, onSuggestionClick }) {
 }
 
 export default function ChatPanel({ chat }) {
-  const { messages, isLoading, mode, lastResponse, send, upload, isUploading, uploadedFile } = chat;
+  const { messages, isLoading, mode, deepResearch, setDeepResearch, lastResponse, send, upload, isUploading, uploadedFile } = chat;
   const [input, setInput] = useState('');
   const bottomRef = useRef(null);
   const fileRef = useRef(null);
@@ -313,6 +313,16 @@ export default function ChatPanel({ chat }) {
               />
 
               <div className="flex items-center gap-1">
+                {mode === 'research' && (
+                  <button
+                    onClick={() => setDeepResearch(!deepResearch)}
+                    disabled={isLoading}
+                    className={`p-2.5 rounded-xl transition-colors flex items-center justify-center disabled:opacity-50 ${deepResearch ? 'bg-primary/10 text-primary' : 'hover:bg-slate-100 dark:hover:bg-slate-700/50 text-slate-500 dark:text-slate-400'}`}
+                    title={deepResearch ? 'Deep research on: reads the full text of top arXiv papers' : 'Deep research off: abstracts only'}
+                  >
+                    <span className="material-symbols-outlined">menu_book</span>
+                  </button>
+                )}
                 <button 
                   onClick={handleSend}
                   disabled={!input.trim() || isLoading}
@@ -326,7 +336,7 @@ export default function ChatPanel({ chat }) {
             <div className="flex justify-center mt-3">
               <p className="text-[10px] text-slate-400 dark:text-slate-500 flex items-center gap-1.5 uppercase font-bold tracking-widest">
                 <span className={`w-1.5 h-1.5 rounded-full ${isLoading ? 'bg-orange-500 animate-pulse' : 'bg-green-500'}`}></span>
-                {mode === 'student' ? 'Student' : 'Research'} Mode • Gemini Flash
+                {mode === 'student' ? 'Student' : deepResearch ? 'Deep Research' : 'Research'} Mode • Gemini Flash
               </p>
             </div>
           </div>
@@ -14,6 +14,32 @@ async function callStudio(endpoint, payload) {
   return res.json();
 }
 
+// One request for several generators; onArtifact fires as each one finishes (NDJSON stream)
+async function streamStudioBatch(payload, onArtifact) {
+  const res = await fetch(`${API_BASE}/studio/batch/`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ...payload, format: 'ndjson' }),
+  });
+  if (!res.ok) throw new Error(await res.text());
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === 'artifact') onArtifact(event);
+    }
+  }
+}
+
 /* ────────────────────────────────────────────── */
 /* Flashcard Component (NotebookLM-style flip)   */
 /* ────────────────────────────────────────────── */
@@ -108,14 +134,16 @@ function FAQList({ faqs }) {
 /* ────────────────────────────────────────────── */
 /* Audio Player Component (NotebookLM-style)     */
 /* ────────────────────────────────────────────── */
-function AudioPlayer({ audioBase64, text, format }) {
+function AudioPlayer({ audioUrl, text }) {
   return (
     <div className="space-y-3">
-      {audioBase64 && (
+      {audioUrl && (
+        // Streams from the server (range requests), so playback starts before the download ends
         <audio
           controls
+          preload="metadata"
           className="w-full rounded-lg"
-          src={`data:${format || 'audio/flac'};base64,${audioBase64}`}
+          src={`${API_BASE}${audioUrl}`}
         />
       )}
       {text && (
@@ -162,6 +190,9 @@ export default function StudioPanel({ messages, uploadedFile, mode, lastResponse
   const [resultType, setResultType] = useState('');
   const [loading, setLoading] = useState(null);
   const [error, setError] = useState('');
+  // Artefacts from "Generate all", keyed by generator — shown instantly on click
+  const [batchResults, setBatchResults] = useState({});
+  const [batchPending, setBatchPending] = useState([]);
 
   const lastAssistant = [...messages].reverse().find(m => m.role === 'assistant');
   const context = lastAssistant?.content || '';
@@ -171,6 +202,9 @@ export default function StudioPanel({ messages, uploadedFile, mode, lastResponse
     if (!hasContent && !uploadedFile) {
       setError('Start a conversation first to generate content.'); return;
     }
+    if (batchResults[key] && batchResults[key].context === context) {
+      setError(''); setResultType(key); setResult(batchResults[key].data); return;
+    }
     setLoading(key); setError(''); setResult(null);
     try {
       const data = await callStudio(endpoint, payload);
@@ -183,6 +217,33 @@ export default function StudioPanel({ messages, uploadedFile, mode, lastResponse
     }
   };
 
+  const runAll = async () => {
+    if (!hasContent && !uploadedFile) {
+      setError('Start a conversation first to generate content.'); return;
+    }
+    const keys = actions.map(a => a.key);
+    setError(''); setBatchPending(keys); setBatchResults({});
+    setResult(null); setResultType('');
+    let shown = false;
+    try {
+      await streamStudioBatch({ context, generators: keys }, (event) => {
+        setBatchPending(prev => prev.filter(k => k !== event.generator));
+        if (event.status !== 200) return;
+        setBatchResults(prev => ({ ...prev, [event.generator]: { context, data: event.data } }));
+        // Show the first artefact that arrives
+        if (!shown) {
+          shown = true;
+          setResultType(event.generator);
+          setResult(event.data);
+        }
+      });
+    } catch (e) {
+      setError(e.message || 'Something went wrong.');
+    } finally {
+      setBatchPending([]);
+    }
+  };
+
   const actions = [
     {
       key: 'study_guide', icon: '📖', title: 'Study Guide',
@@ -251,8 +312,15 @@ export default function StudioPanel({ messages, uploadedFile, mode, lastResponse
             )}
 
             {/* Action buttons */}
-            <div className="text-[10px] font-bold uppercase tracking-wider text-slate-400 mb-2 px-1">
-              Generate
+            <div className="flex items-center justify-between mb-2 px-1">
+              <span className="text-[10px] font-bold uppercase tracking-wider text-slate-400">Generate</span>
+              <button
+                onClick={runAll}
+                disabled={batchPending.length > 0}
+                className="text-[10px] font-bold text-primary hover:underline disabled:opacity-50"
+              >
+                {batchPending.length > 0 ? `Generating… (${batchPending.length} left)` : 'Generate all'}
+              </button>
             </div>
             <div className="flex flex-col gap-2 mb-4">
               {actions.map(a => (
@@ -262,7 +330,7 @@ export default function StudioPanel({ messages, uploadedFile, mode, lastResponse
                   title={a.title}
                   description={a.description}
                   onClick={a.action}
-                  loading={loading === a.key}
+                  loading={loading === a.key || batchPending.includes(a.key)}
                   active={resultType === a.key}
                 />
               ))}
@@ -309,8 +377,8 @@ export default function StudioPanel({ messages, uploadedFile, mode, lastResponse
                   )}
 
                   {/* Audio Player */}
-                  {(result.audio_base64 || result.text) && resultType === 'audio' && (
-                    <AudioPlayer audioBase64={result.audio_base64} text={result.text} format={result.format} />
+                  {(result.audio_url || result.text) && resultType === 'audio' && (
+                    <AudioPlayer audioUrl={result.audio_url} text={result.text} />
                   )}
 
                   {/* Key topics */}
@@ -7,6 +7,7 @@ export function useChat() {
   const [messages, setMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const [mode, setMode] = useState('student');
+  const [deepResearch, setDeepResearch] = useState(false);
   const [namespace, setNamespace] = useState(() => crypto.randomUUID());
   const [uploadedFile, setUploadedFile] = useState(null);
   const [isUploading, setIsUploading] = useState(false);
@@ -42,6 +43,7 @@ export function useChat() {
           mode,
           namespace,
           chat_history: chatHistory,
+          deep_research: mode === 'research' && deepResearch,
         }),
         signal: controller.signal,
       });
@@ -165,7 +167,7 @@ export function useChat() {
       setStreamingContent('');
       abortRef.current = null;
     }
-  }, [messages, mode, namespace, isLoading]);
+  }, [messages, mode, deepResearch, namespace, isLoading]);
 
   const upload = useCallback(async (file) => {
     setIsUploading(true);
@@ -206,6 +208,7 @@ export function useChat() {
     messages,
     isLoading,
     mode,
+    deepResearch,
     namespace,
     uploadedFile,
     isUploading,
@@ -216,5 +219,6 @@ export function useChat() {
     upload,
     clearChat,
     changeMode,
+    setDeepResearch,
   };
 }